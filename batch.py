@@ -0,0 +1,330 @@
+import random
+
+import numpy as np
+
+from dealing import generate_deals
+from poker import HAND_TYPES, MAX_NUM_JOKERS, NUM_CARDS, WILD_RULES
+
+
+"""
+Batch
+
+Evaluate many hands at once with numpy arrays, instead of one hand per loop
+iteration. simulate_hands deals them with dealing.generate_deals, so the same
+seed deals the same hands as the rest of the simulations
+
+Represent a batch of n hands of the same size as an (n, hand_size) array of
+cards, and the natural cards of each hand as an (n, 4, 13) boolean array,
+indexed by suit and (rank - 2). Each function takes in the name of its wild
+rule in WILD_RULES, and jokers, which are always wild, are never natural
+
+Represent the best hands of a batch as parallel arrays:
+- hand_type_codes: (n,) index of each hand's hand_type in HAND_TYPES
+- tie_break_ranks: (n, 2) the tie_break_dict values in the order of the
+    hand_type's tie_break_keys, with 0 in the second column for a hand_type
+    with only one
+- sortkeys: (n,) the same floats that get_hand_sortkey gives
+
+get_hand_codes packs the first two into the hand_code's that get_hand_code gives
+
+Each batch finder takes in the natural cards, rank counts (n, 13), suit counts
+(n, 4), and number of wilds (n,) of a batch, and returns a tuple of
+(found_hands: (n,) boolean, first_ranks: (n,), second_ranks: (n,)), following
+the same rules as the hand_type's finder for each hand in the batch
+"""
+
+def get_wild_cards(wild_rule='twos'):
+    # indexed by card, jokers included
+    wild_mask = WILD_RULES[wild_rule]['wild_mask']
+    cards = range(NUM_CARDS + MAX_NUM_JOKERS)
+    return np.array([(wild_mask >> card) & 1 for card in cards], dtype=bool)
+
+def get_top_ranks(rank_mask):
+    has_rank = rank_mask.any(axis=-1)
+    top_rank_index = 12 - np.argmax(rank_mask[..., ::-1], axis=-1)
+    return np.where(has_rank, top_rank_index + 2, 0)
+
+def get_straight_top_ranks(rank_mask, num_wilds):
+    # number of ranks present among the lowest k ranks, for k in 0 through 13
+    cumulative_counts = np.zeros(rank_mask.shape[:-1] + (14,), dtype=int)
+    cumulative_counts[..., 1:] = np.cumsum(rank_mask, axis=-1)
+
+    # as in straight_finder, a 5-high straight includes a rank 1 that no card
+    # has. go from low to high so the highest straight wins
+    top_ranks = np.zeros(rank_mask.shape[:-1], dtype=int)
+    for top_rank in range(5, 15):
+        window_count = (
+            cumulative_counts[..., top_rank - 1] -
+            cumulative_counts[..., max(top_rank - 6, 0)]
+        )
+        found_straight = 5 - window_count <= num_wilds
+        top_ranks = np.where(found_straight, top_rank, top_ranks)
+    return top_ranks
+
+## BATCH FINDERS
+
+def _count_batch_finder(rank_counts, num_wilds, count):
+    # the highest rank with enough cards, with the wilds filling in. with
+    # enough wilds, every rank is enough and the highest is an ace
+    rank_mask = rank_counts >= (count - num_wilds)[:, None]
+    ranks = get_top_ranks(rank_mask)
+    return ranks > 0, ranks, np.zeros_like(ranks)
+
+def high_card_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    return _count_batch_finder(rank_counts, num_wilds, 1)
+
+def one_pair_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    return _count_batch_finder(rank_counts, num_wilds, 2)
+
+def two_pair_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    num_hands = rank_counts.shape[0]
+    first_pair_mask = rank_counts >= 2
+    second_pair_mask = rank_counts >= 4
+    solo_mask = rank_counts % 2 == 1
+    num_pairs = first_pair_mask.sum(axis=1) + second_pair_mask.sum(axis=1)
+
+    # same choices for the wilds as in two_pair_finder, one step at a time for
+    # every hand that still has wilds to place
+    num_ace_pairs = np.zeros(num_hands, dtype=int)
+    num_wilds_left = num_wilds.copy()
+    placing = num_wilds_left >= 1
+    while placing.any():
+        add_ace_pair = placing & (num_pairs >= 1) & (num_wilds_left >= 2)
+        add_two_ace_pairs = placing & ~add_ace_pair & (num_wilds_left >= 4)
+        pair_solo = (
+            placing &
+            ~add_ace_pair &
+            ~add_two_ace_pairs &
+            solo_mask.any(axis=1)
+        )
+
+        num_ace_pairs += add_ace_pair + (2 * add_two_ace_pairs)
+        num_pairs += add_ace_pair + (2 * add_two_ace_pairs) + pair_solo
+        num_wilds_left -= (
+            (2 * add_ace_pair) + (4 * add_two_ace_pairs) + pair_solo
+        )
+
+        solo_hands = np.nonzero(pair_solo)[0]
+        solo_rank_indexes = get_top_ranks(solo_mask[solo_hands]) - 2
+        solo_mask[solo_hands, solo_rank_indexes] = False
+        has_pair = first_pair_mask[solo_hands, solo_rank_indexes]
+        second_pair_mask[
+            solo_hands[has_pair],
+            solo_rank_indexes[has_pair]
+        ] = True
+        first_pair_mask[
+            solo_hands[~has_pair],
+            solo_rank_indexes[~has_pair]
+        ] = True
+
+        placing = (
+            (add_ace_pair | add_two_ace_pairs | pair_solo) &
+            (num_wilds_left >= 1)
+        )
+
+    top_pair_ranks = get_top_ranks(first_pair_mask)
+    top_pair_indexes = np.maximum(top_pair_ranks - 2, 0)
+    hand_indexes = np.arange(num_hands)
+    top_pair_is_double = second_pair_mask[hand_indexes, top_pair_indexes]
+    first_pair_mask[hand_indexes, top_pair_indexes] = False
+    next_pair_ranks = get_top_ranks(first_pair_mask)
+
+    high_ranks = np.where(num_ace_pairs >= 1, 14, top_pair_ranks)
+    low_ranks = np.where(
+        num_ace_pairs >= 2,
+        14,
+        np.where(
+            num_ace_pairs == 1,
+            top_pair_ranks,
+            np.where(top_pair_is_double, top_pair_ranks, next_pair_ranks)
+        )
+    )
+    return num_pairs >= 2, high_ranks, low_ranks
+
+def three_of_a_kind_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    return _count_batch_finder(rank_counts, num_wilds, 3)
+
+def straight_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    top_ranks = get_straight_top_ranks(rank_counts > 0, num_wilds)
+    return top_ranks > 0, top_ranks, np.zeros_like(top_ranks)
+
+def flush_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    found_flushes = suit_counts.max(axis=1) + num_wilds >= 5
+    flush_rank_mask = (natural & (suit_counts >= 5)[:, :, None]).any(axis=1)
+    top_ranks = np.where(num_wilds >= 1, 14, get_top_ranks(flush_rank_mask))
+    return found_flushes, top_ranks, np.zeros_like(top_ranks)
+
+def full_house_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    num_hands = rank_counts.shape[0]
+    found_full_houses = np.zeros(num_hands, dtype=bool)
+    triplet_ranks = np.zeros(num_hands, dtype=int)
+    pair_ranks = np.zeros(num_hands, dtype=int)
+
+    # same as full_house_finder, try each triplet rank from the highest down,
+    # for the hands that have enough of it and no full house yet
+    few_wilds = num_wilds <= 2
+    for triplet_rank_index in range(12, -1, -1):
+        hands = np.nonzero(
+            few_wilds &
+            ~found_full_houses &
+            (rank_counts[:, triplet_rank_index] >= 3 - num_wilds)
+        )[0]
+        hand_rank_counts = rank_counts[hands]
+        triplet_counts = hand_rank_counts[:, triplet_rank_index]
+        wilds_left = num_wilds[hands] - np.maximum(0, 3 - triplet_counts)
+        pair_rank_mask = hand_rank_counts + wilds_left[:, None] >= 2
+        pair_rank_mask[:, triplet_rank_index] = (
+            triplet_counts + wilds_left >= 5
+        )
+        candidate_pair_ranks = get_top_ranks(pair_rank_mask)
+        found = candidate_pair_ranks > 0
+        triplet_ranks[hands[found]] = triplet_rank_index + 2
+        pair_ranks[hands[found]] = candidate_pair_ranks[found]
+        found_full_houses[hands[found]] = True
+
+    for wilds, pair_count in [(3, 2), (4, 1)]:
+        candidate_pair_ranks = get_top_ranks(rank_counts >= pair_count)
+        found = (num_wilds == wilds) & (candidate_pair_ranks > 0)
+        triplet_ranks[found] = 14
+        pair_ranks[found] = candidate_pair_ranks[found]
+        found_full_houses |= found
+
+    found = num_wilds >= 5
+    triplet_ranks[found] = 14
+    pair_ranks[found] = 14
+    found_full_houses |= found
+
+    return found_full_houses, triplet_ranks, pair_ranks
+
+def four_of_a_kind_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    return _count_batch_finder(rank_counts, num_wilds, 4)
+
+def straight_flush_batch_finder(natural, rank_counts, suit_counts, num_wilds):
+    top_ranks = get_straight_top_ranks(natural, num_wilds[:, None]).max(axis=1)
+    return top_ranks > 0, top_ranks, np.zeros_like(top_ranks)
+
+BATCH_FINDERS = {
+    'high_card': high_card_batch_finder,
+    'one_pair': one_pair_batch_finder,
+    'two_pair': two_pair_batch_finder,
+    'three_of_a_kind': three_of_a_kind_batch_finder,
+    'straight': straight_batch_finder,
+    'flush': flush_batch_finder,
+    'full_house': full_house_batch_finder,
+    'four_of_a_kind': four_of_a_kind_batch_finder,
+    'straight_flush': straight_flush_batch_finder,
+}
+
+## PUTTING IT ALL TOGETHER
+
+def get_sortkeys(hand_type_codes, tie_break_ranks):
+    num_ranks = 14.0
+    has_two_ranks = np.array([
+        len(hand_type_obj['tie_break_keys']) == 2
+        for hand_type_obj in HAND_TYPES
+    ])[hand_type_codes]
+    first_ranks = tie_break_ranks[:, 0]
+    second_ranks = tie_break_ranks[:, 1]
+    tie_break_vals = np.where(
+        has_two_ranks,
+        ((first_ranks * num_ranks) + second_ranks) / ((num_ranks + 1)**2),
+        first_ranks / num_ranks
+    )
+    return hand_type_codes + (tie_break_vals * 0.95)
+
+def get_hand_codes(hand_type_codes, tie_break_ranks):
+    return (
+        (hand_type_codes.astype(np.int16) << 8) |
+        (tie_break_ranks[:, 0].astype(np.int16) << 4) |
+        tie_break_ranks[:, 1]
+    )
+
+def find_best_hands(
+    natural,
+    rank_counts,
+    suit_counts,
+    num_wilds,
+    hand_types=None
+):
+    # go through the hand_types from the top down, same as get_best_hand, and
+    # only through the given ones if there are any. hands with none of them
+    # get a hand_type_code of -1
+    num_hands = rank_counts.shape[0]
+    hand_type_codes = np.full(num_hands, -1, dtype=np.int8)
+    tie_break_ranks = np.zeros((num_hands, 2), dtype=np.int8)
+    for code in range(len(HAND_TYPES) - 1, -1, -1):
+        hand_type = HAND_TYPES[code]['hand_type']
+        if hand_types is not None and hand_type not in hand_types:
+            continue
+        found_hands, first_ranks, second_ranks = BATCH_FINDERS[hand_type](
+            natural,
+            rank_counts,
+            suit_counts,
+            num_wilds
+        )
+        new_hands = found_hands & (hand_type_codes < 0)
+        hand_type_codes[new_hands] = code
+        tie_break_ranks[new_hands, 0] = first_ranks[new_hands]
+        tie_break_ranks[new_hands, 1] = second_ranks[new_hands]
+
+    return hand_type_codes, tie_break_ranks
+
+def get_best_hands(cards, wild_rule='twos'):
+    num_hands = cards.shape[0]
+    wild_cards = get_wild_cards(wild_rule)
+    num_wilds = wild_cards[cards].sum(axis=1)
+    natural = np.zeros((num_hands, len(wild_cards)), dtype=bool)
+    natural[np.arange(num_hands)[:, None], cards] = True
+    natural &= ~wild_cards
+    natural = natural[:, :NUM_CARDS].reshape(num_hands, 4, 13)
+    rank_counts = natural.sum(axis=1)
+    suit_counts = natural.sum(axis=2)
+
+    hand_type_codes, tie_break_ranks = find_best_hands(
+        natural,
+        rank_counts,
+        suit_counts,
+        num_wilds
+    )
+    sortkeys = get_sortkeys(hand_type_codes, tie_break_ranks)
+    return hand_type_codes, tie_break_ranks, sortkeys
+
+def get_hand_tuples(hand_type_codes, tie_break_ranks):
+    hands = []
+    for code, ranks in zip(hand_type_codes, tie_break_ranks):
+        hand_type_obj = HAND_TYPES[code]
+        tie_break_dict = dict(
+            (key, int(rank))
+            for key, rank in zip(hand_type_obj['tie_break_keys'], ranks)
+        )
+        hands.append((hand_type_obj['hand_type'], tie_break_dict))
+    return hands
+
+def simulate_hands(
+    hand_size,
+    num_trials,
+    seed=None,
+    wild_rule='twos',
+    chunk_size=100000
+):
+    # the same seed and chunk_size always deal the same hands
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    chunks = [
+        get_best_hands(cards, wild_rule=wild_rule)
+        for cards in generate_deals(
+            WILD_RULES[wild_rule]['deck'],
+            hand_size,
+            num_trials,
+            seed,
+            chunk_size=chunk_size
+        )
+    ]
+
+    hand_type_codes, tie_break_ranks, sortkeys = zip(*chunks)
+    return (
+        np.concatenate(hand_type_codes),
+        np.concatenate(tie_break_ranks),
+        np.concatenate(sortkeys),
+    )
@@ -0,0 +1,79 @@
+import batch
+import dealing
+import poker
+
+import numpy as np
+import unittest
+
+
+class TestBatch(unittest.TestCase):
+    def assertMatchesGetBestHand(self, cards, wild_rule):
+        hand_type_codes, tie_break_ranks, sortkeys = batch.get_best_hands(
+            cards,
+            wild_rule=wild_rule
+        )
+        hands = batch.get_hand_tuples(hand_type_codes, tie_break_ranks)
+        hand_codes = batch.get_hand_codes(hand_type_codes, tie_break_ranks)
+        for hand_cards, hand, hand_code, sortkey in zip(
+            cards,
+            hands,
+            hand_codes,
+            sortkeys
+        ):
+            expected_hand = poker.get_best_hand(
+                list(hand_cards),
+                poker.WILD_RULES[wild_rule]['is_wild_func'],
+                engine='bitmask'
+            )
+            self.assertEqual(hand, expected_hand)
+            self.assertEqual(sortkey, poker.get_hand_sortkey(*expected_hand))
+            self.assertEqual(hand_code, poker.get_hand_code(*expected_hand))
+
+    def test_get_best_hands(self):
+        random_state = np.random.RandomState(0)
+        for wild_rule, wild_rule_obj in sorted(poker.WILD_RULES.items()):
+            for hand_size in range(2, 29):
+                cards = dealing.deal_hands(
+                    wild_rule_obj['deck'],
+                    hand_size,
+                    20,
+                    random_state
+                )
+                self.assertMatchesGetBestHand(cards, wild_rule)
+
+    def test_simulate_hands(self):
+        hand_type_codes, tie_break_ranks, sortkeys = batch.simulate_hands(
+            5,
+            250,
+            seed=0,
+            chunk_size=100
+        )
+        self.assertEqual(hand_type_codes.shape, (250,))
+        self.assertEqual(tie_break_ranks.shape, (250, 2))
+        self.assertEqual(sortkeys.shape, (250,))
+
+        # the hands are the ones dealing deals for the same seed and chunk_size
+        dealt_sortkeys = [
+            batch.get_best_hands(cards)[2]
+            for cards in dealing.generate_deals(
+                poker.WILD_RULES['twos']['deck'],
+                5,
+                250,
+                0,
+                chunk_size=100
+            )
+        ]
+        self.assertTrue((sortkeys == np.concatenate(dealt_sortkeys)).all())
+
+        # the jokers rule deals from its 54 cards
+        hand_type_codes = batch.simulate_hands(
+            28,
+            250,
+            seed=0,
+            wild_rule='jokers'
+        )[0]
+        self.assertEqual(hand_type_codes.shape, (250,))
+
+
+if __name__ == '__main__':
+    unittest.main()
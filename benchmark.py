@@ -0,0 +1,402 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+
+from poker import (
+    ENGINES,
+    HAND_TYPES,
+    get_best_hand,
+    twos_are_wild,
+)
+from simulation import HAND_SIZES, get_shard_seed, simulate_hands
+
+
+"""
+Benchmarks
+
+Time each hand_type's finder, get_best_hand with each engine, and
+simulate_hands with each engine, across hand sizes and numbers of wilds. Every
+benchmark deals its hands from a fixed seed, so two runs time the same work,
+runs its calls a few times untimed to warm up, then times them over several
+repeats and keeps the median, which is less noisy than the mean.
+
+Represent a benchmark's result with a dict of its name, hand_size, num_wilds
+(None for simulate_hands, whose hands have however many wilds they're dealt),
+num_calls, and seconds_per_call for each repeat, along with their best and
+median. A run of benchmarks is saved as JSON, as a dict of meta (the settings
+and the machine) and results (a list of result dicts).
+
+Run them with `python benchmark.py run`, and compare a run against a saved
+baseline with `python benchmark.py compare baseline.json current.json`, which
+flags each benchmark whose median got slower by more than the threshold.
+"""
+
+WILD_COUNTS = range(5)
+
+DEFAULT_SEED = 0
+DEFAULT_NUM_HANDS = 200
+DEFAULT_NUM_REPEATS = 5
+DEFAULT_NUM_WARMUPS = 1
+DEFAULT_THRESHOLD = 0.1
+
+def deal_hands(
+    hand_size,
+    num_wilds,
+    num_hands,
+    rand,
+    is_wild_func=twos_are_wild
+):
+    # hands with exactly num_wilds wilds, or None if there can't be any
+    wild_cards = [card for card in range(52) if is_wild_func(card)]
+    natural_cards = [card for card in range(52) if not is_wild_func(card)]
+    if (
+        num_wilds > min(hand_size, len(wild_cards)) or
+        hand_size - num_wilds > len(natural_cards)
+    ):
+        return None
+    hands = []
+    for _ in range(num_hands):
+        cards = (
+            rand.sample(wild_cards, num_wilds) +
+            rand.sample(natural_cards, hand_size - num_wilds)
+        )
+        rand.shuffle(cards)
+        hands.append(cards)
+    return hands
+
+def time_calls(func, args_list, num_repeats, num_warmups):
+    # seconds per call, for each repeat
+    for _ in range(num_warmups):
+        for args in args_list:
+            func(*args)
+    seconds_per_call = []
+    for _ in range(num_repeats):
+        start = timeit.default_timer()
+        for args in args_list:
+            func(*args)
+        seconds_per_call.append(
+            (timeit.default_timer() - start) / len(args_list)
+        )
+    return seconds_per_call
+
+def get_median(values):
+    sorted_values = sorted(values)
+    middle = len(sorted_values) / 2
+    if len(sorted_values) % 2:
+        return sorted_values[middle]
+    return (sorted_values[middle - 1] + sorted_values[middle]) / 2.0
+
+def get_result(name, hand_size, num_wilds, num_calls, seconds_per_call):
+    return {
+        'name': name,
+        'hand_size': hand_size,
+        'num_wilds': num_wilds,
+        'num_calls': num_calls,
+        'seconds_per_call': seconds_per_call,
+        'best': min(seconds_per_call),
+        'median': get_median(seconds_per_call),
+    }
+
+def get_result_key(result):
+    return (result['name'], result['hand_size'], result['num_wilds'])
+
+def get_result_label(result):
+    if result['num_wilds'] is None:
+        return '{} size={}'.format(result['name'], result['hand_size'])
+    return '{} size={} wilds={}'.format(
+        result['name'],
+        result['hand_size'],
+        result['num_wilds']
+    )
+
+## BENCHMARKS
+
+def benchmark_finders(hands, hand_size, num_wilds, num_repeats, num_warmups):
+    args_list = [
+        ([card for card in cards if not twos_are_wild(card)], num_wilds)
+        for cards in hands
+    ]
+    results = []
+    for hand_type_obj in HAND_TYPES:
+        finder = hand_type_obj['finder']
+        results.append(get_result(
+            'finder:{}'.format(hand_type_obj['hand_type']),
+            hand_size,
+            num_wilds,
+            len(args_list),
+            time_calls(
+                lambda natural_cards, num_wilds: finder(
+                    natural_cards,
+                    num_wilds=num_wilds
+                ),
+                args_list,
+                num_repeats,
+                num_warmups
+            )
+        ))
+    return results
+
+def benchmark_get_best_hand(
+    hands,
+    hand_size,
+    num_wilds,
+    engines,
+    num_repeats,
+    num_warmups
+):
+    args_list = [(cards, twos_are_wild) for cards in hands]
+    results = []
+    for engine in engines:
+        results.append(get_result(
+            'get_best_hand:{}'.format(engine),
+            hand_size,
+            num_wilds,
+            len(args_list),
+            time_calls(
+                lambda cards, is_wild_func: get_best_hand(
+                    cards,
+                    is_wild_func,
+                    engine=engine
+                ),
+                args_list,
+                num_repeats,
+                num_warmups
+            )
+        ))
+    return results
+
+def benchmark_simulate_hands(
+    hand_size,
+    engines,
+    num_hands,
+    seed,
+    num_repeats,
+    num_warmups
+):
+    # one call simulates num_hands hands, timed per hand
+    results = []
+    for engine in engines:
+        seconds_per_call = time_calls(
+            lambda: simulate_hands(
+                hand_size,
+                num_hands,
+                engine=engine,
+                rand=random.Random(seed)
+            ),
+            [()],
+            num_repeats,
+            num_warmups
+        )
+        results.append(get_result(
+            'simulate_hands:{}'.format(engine),
+            hand_size,
+            None,
+            num_hands,
+            [seconds / num_hands for seconds in seconds_per_call]
+        ))
+    return results
+
+def run_benchmarks(
+    hand_sizes=HAND_SIZES,
+    wild_counts=WILD_COUNTS,
+    engines=None,
+    num_hands=DEFAULT_NUM_HANDS,
+    seed=DEFAULT_SEED,
+    num_repeats=DEFAULT_NUM_REPEATS,
+    num_warmups=DEFAULT_NUM_WARMUPS
+):
+    if engines is None:
+        engines = sorted(ENGINES.keys())
+
+    results = []
+    for hand_size in hand_sizes:
+        for num_wilds in wild_counts:
+            hands = deal_hands(
+                hand_size,
+                num_wilds,
+                num_hands,
+                random.Random(get_shard_seed(seed, hand_size, num_wilds))
+            )
+            if hands is None:
+                continue
+            results.extend(benchmark_finders(
+                hands,
+                hand_size,
+                num_wilds,
+                num_repeats,
+                num_warmups
+            ))
+            results.extend(benchmark_get_best_hand(
+                hands,
+                hand_size,
+                num_wilds,
+                engines,
+                num_repeats,
+                num_warmups
+            ))
+        results.extend(benchmark_simulate_hands(
+            hand_size,
+            engines,
+            num_hands,
+            seed,
+            num_repeats,
+            num_warmups
+        ))
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'hand_sizes': list(hand_sizes),
+            'wild_counts': list(wild_counts),
+            'engines': list(engines),
+            'num_hands': num_hands,
+            'seed': seed,
+            'num_repeats': num_repeats,
+            'num_warmups': num_warmups,
+        },
+        'results': results,
+    }
+
+## COMPARING
+
+def save_benchmarks(benchmarks, path):
+    with open(path, 'w') as f:
+        json.dump(benchmarks, f, indent=2, sort_keys=True)
+
+def load_benchmarks(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare_benchmarks(baseline, current, threshold=DEFAULT_THRESHOLD):
+    # a list of (result_label, baseline_median, current_median, ratio,
+    # is_regression) for each benchmark in both runs, where a regression's
+    # ratio is over 1 + threshold
+    baseline_results = dict(
+        (get_result_key(result), result)
+        for result in baseline['results']
+    )
+    comparisons = []
+    for result in current['results']:
+        baseline_result = baseline_results.get(get_result_key(result))
+        if baseline_result is None:
+            continue
+        ratio = result['median'] / baseline_result['median']
+        comparisons.append((
+            get_result_label(result),
+            baseline_result['median'],
+            result['median'],
+            ratio,
+            ratio > 1 + threshold,
+        ))
+    return comparisons
+
+def get_regressions(comparisons):
+    return [comparison for comparison in comparisons if comparison[-1]]
+
+def print_comparisons(comparisons):
+    for (
+        label,
+        baseline_median,
+        current_median,
+        ratio,
+        is_regression
+    ) in comparisons:
+        print('{:<45} {:>12.2f}us {:>12.2f}us {:>7.2f}x{}'.format(
+            label,
+            baseline_median * 1e6,
+            current_median * 1e6,
+            ratio,
+            '  REGRESSION' if is_regression else ''
+        ))
+    print('{} regressions out of {} benchmarks'.format(
+        len(get_regressions(comparisons)),
+        len(comparisons)
+    ))
+
+## COMMAND LINE
+
+def get_int_list(value):
+    return [int(part) for part in value.split(',')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='poker benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--output', default='benchmark.json')
+    run_parser.add_argument(
+        '--hand-sizes',
+        type=get_int_list,
+        default=HAND_SIZES
+    )
+    run_parser.add_argument(
+        '--wild-counts',
+        type=get_int_list,
+        default=WILD_COUNTS
+    )
+    run_parser.add_argument(
+        '--engines',
+        type=lambda value: value.split(','),
+        default=None
+    )
+    run_parser.add_argument('--num-hands', type=int, default=DEFAULT_NUM_HANDS)
+    run_parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    run_parser.add_argument(
+        '--num-repeats',
+        type=int,
+        default=DEFAULT_NUM_REPEATS
+    )
+    run_parser.add_argument(
+        '--num-warmups',
+        type=int,
+        default=DEFAULT_NUM_WARMUPS
+    )
+
+    compare_parser = subparsers.add_parser(
+        'compare',
+        help='flag regressions against a baseline'
+    )
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument(
+        '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        benchmarks = run_benchmarks(
+            hand_sizes=args.hand_sizes,
+            wild_counts=args.wild_counts,
+            engines=args.engines,
+            num_hands=args.num_hands,
+            seed=args.seed,
+            num_repeats=args.num_repeats,
+            num_warmups=args.num_warmups
+        )
+        save_benchmarks(benchmarks, args.output)
+        print('saved {} results to {}'.format(
+            len(benchmarks['results']),
+            args.output
+        ))
+        return 0
+    else:
+        comparisons = compare_benchmarks(
+            load_benchmarks(args.baseline),
+            load_benchmarks(args.current),
+            threshold=args.threshold
+        )
+        print_comparisons(comparisons)
+        return 1 if get_regressions(comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import benchmark
+import poker
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_deal_hands(self):
+        hands = benchmark.deal_hands(7, 3, 20, random.Random(0))
+        self.assertEqual(len(hands), 20)
+        for cards in hands:
+            self.assertEqual(len(set(cards)), 7)
+            self.assertEqual(
+                len([card for card in cards if poker.twos_are_wild(card)]),
+                3
+            )
+        self.assertIsNone(benchmark.deal_hands(3, 4, 20, random.Random(0)))
+        self.assertIsNone(benchmark.deal_hands(28, 5, 20, random.Random(0)))
+
+    def test_run_and_compare_benchmarks(self):
+        benchmarks = benchmark.run_benchmarks(
+            hand_sizes=[2, 9],
+            wild_counts=[0, 2],
+            engines=['bitmask'],
+            num_hands=5,
+            num_repeats=2
+        )
+        names = set(result['name'] for result in benchmarks['results'])
+        self.assertEqual(
+            names,
+            set(
+                ['finder:{}'.format(hand_type_obj['hand_type'])
+                for hand_type_obj in poker.HAND_TYPES] +
+                ['get_best_hand:bitmask', 'simulate_hands:bitmask']
+            )
+        )
+        self.assertEqual(
+            len(benchmarks['results']),
+            2 * 2 * (len(poker.HAND_TYPES) + 1) + 2
+        )
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'benchmark.json')
+            benchmark.save_benchmarks(benchmarks, path)
+            baseline = benchmark.load_benchmarks(path)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        comparisons = benchmark.compare_benchmarks(baseline, benchmarks)
+        self.assertEqual(len(comparisons), len(benchmarks['results']))
+        self.assertEqual(benchmark.get_regressions(comparisons), [])
+
+        # twice as slow is flagged, and only for the slower benchmark
+        slower_result = dict(benchmarks['results'][0])
+        slower_result['median'] *= 2
+        current = {
+            'meta': benchmarks['meta'],
+            'results': [slower_result] + benchmarks['results'][1:],
+        }
+        regressions = benchmark.get_regressions(
+            benchmark.compare_benchmarks(baseline, current)
+        )
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(
+            regressions[0][0],
+            benchmark.get_result_label(slower_result)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import hashlib
+
+import numpy as np
+
+
+"""
+Dealing
+
+Deal many hands at once with numpy, from seeds that split into independent
+streams, so that the same seed always deals the same hands and a big run can be
+cut up any way without two parts dealing from the same stream.
+
+A seed is an int below 2**64. split_seed derives a new one from a seed and any
+keys, such as a hand size and a trial index, by hashing them together, and
+make_random_state turns one into a numpy RandomState.
+
+Represent a deck with a list of cards, as from poker.make_deck, and a batch of
+n hands dealt from it with an (n, hand_size) array of cards. deal_hands does a
+partial Fisher-Yates shuffle of every hand's deck at once, one column at a
+time, so dealing a hand takes hand_size steps instead of sorting the deck.
+Copies of a card in the deck are dealt independently like any other cards.
+
+generate_deals deals num_trials hands in chunks of chunk_size, each chunk from
+its own seed derived from the seed, the hand size and the chunk's first trial
+index, so it takes the same memory for any number of trials. The same seed and
+chunk_size always give the same hands.
+"""
+
+DEAL_CHUNK_SIZE = 10000
+
+def split_seed(seed, *keys):
+    seed_key = ':'.join(str(key) for key in (seed,) + keys)
+    return int(hashlib.sha256(seed_key.encode('utf-8')).hexdigest()[:16], 16)
+
+def make_random_state(seed):
+    return np.random.RandomState([seed & 0xFFFFFFFF, seed >> 32])
+
+def deal_hands(deck, hand_size, num_hands, random_state):
+    deck = np.asarray(deck)
+    deck_size = len(deck)
+    if hand_size > deck_size:
+        raise ValueError(
+            'hand_size {} is more than the {} cards in the deck'.format(
+                hand_size,
+                deck_size
+            )
+        )
+
+    # each row is a hand's positions in the deck, and step i swaps a random
+    # position from i on into column i
+    positions = np.tile(np.arange(deck_size), (num_hands, 1))
+    hand_indexes = np.arange(num_hands)
+    for i in range(hand_size):
+        swap_indexes = random_state.randint(i, deck_size, size=num_hands)
+        swapped_positions = positions[hand_indexes, swap_indexes]
+        positions[hand_indexes, swap_indexes] = positions[:, i]
+        positions[:, i] = swapped_positions
+    return deck[positions[:, :hand_size]]
+
+def generate_deals(
+    deck,
+    hand_size,
+    num_trials,
+    seed,
+    chunk_size=DEAL_CHUNK_SIZE
+):
+    for chunk_start in range(0, num_trials, chunk_size):
+        yield deal_hands(
+            deck,
+            hand_size,
+            min(chunk_size, num_trials - chunk_start),
+            make_random_state(split_seed(seed, hand_size, chunk_start))
+        )
@@ -0,0 +1,79 @@
+import dealing
+import poker
+
+from collections import Counter
+import numpy as np
+import unittest
+
+
+class TestDealing(unittest.TestCase):
+    def test_split_seed(self):
+        seed = dealing.split_seed(0, 5, 1000)
+        self.assertEqual(dealing.split_seed(0, 5, 1000), seed)
+        self.assertTrue(0 <= seed < 2**64)
+        self.assertEqual(
+            len(set([
+                seed,
+                dealing.split_seed(1, 5, 1000),
+                dealing.split_seed(0, 6, 1000),
+                dealing.split_seed(0, 5, 0),
+                dealing.split_seed(0),
+            ])),
+            5
+        )
+
+    def test_deal_hands(self):
+        random_state = dealing.make_random_state(dealing.split_seed(0))
+        deck = poker.make_deck()
+        for hand_size in [1, 2, 5, 13, 28, 52]:
+            hands = dealing.deal_hands(deck, hand_size, 200, random_state)
+            self.assertEqual(hands.shape, (200, hand_size))
+            for cards in hands.tolist():
+                self.assertEqual(len(set(cards)), hand_size)
+                self.assertTrue(all(0 <= card < 52 for card in cards))
+
+        # each card is as likely as any other to be dealt
+        hands = dealing.deal_hands(deck, 5, 52000, random_state)
+        card_counts = np.bincount(hands.ravel(), minlength=52)
+        self.assertTrue((np.abs(card_counts - 5000) < 400).all())
+
+        # a card in the deck twice can be dealt twice, but never more
+        deck = poker.make_deck(wild_rule='jokers', num_decks=2)
+        hands = dealing.deal_hands(deck, 28, 200, random_state)
+        self.assertTrue(any(len(set(cards)) < 28 for cards in hands.tolist()))
+        for cards in hands.tolist():
+            self.assertTrue(max(Counter(cards).values()) <= 2)
+
+        self.assertRaises(
+            ValueError,
+            dealing.deal_hands,
+            range(5),
+            6,
+            10,
+            random_state
+        )
+
+    def test_generate_deals(self):
+        deck = poker.make_deck()
+        chunks = list(dealing.generate_deals(deck, 7, 250, 0, chunk_size=100))
+        self.assertEqual(
+            [chunk.shape for chunk in chunks],
+            [(100, 7), (100, 7), (50, 7)]
+        )
+
+        same_seed_chunks = dealing.generate_deals(
+            deck,
+            7,
+            250,
+            0,
+            chunk_size=100
+        )
+        for chunk, same_seed_chunk in zip(chunks, same_seed_chunks):
+            self.assertTrue((chunk == same_seed_chunk).all())
+
+        other_seed_chunk = next(dealing.generate_deals(deck, 7, 100, 1))
+        self.assertFalse((chunks[0] == other_seed_chunk).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,837 @@
+from collections import Counter, defaultdict
+
+from poker import (
+    HAND_TYPES,
+    HAND_TYPE_INDEXES,
+    NUM_SUITS,
+    POPCOUNTS,
+    get_card_rank,
+    get_card_suit,
+    get_hand_code,
+    twos_are_wild,
+)
+
+
+"""
+Exact Hand Counts
+
+Count exactly how many hands of each hand size have each best hand, instead of
+estimating it from random trials.
+
+Going through all C(52, n) hands is out of the question for most hand sizes, so
+build the hands up one rank at a time, aces first, and keep only what the rest
+of the hand could still need to know about the ranks so far. Hands that agree
+on that are an equivalence class, and each class carries how many hands are in
+it for each number of cards. Since the suits are interchangeable, a class keeps
+its suits' states in sorted order, so relabeling the suits lands in the same
+class.
+
+Going from the top rank down, the first rank that gets a pair, a triplet, a
+straight, etc. is already the highest one the finished hand will have, so each
+of them is settled the moment it shows up. What a class has to remember is then
+small:
+- for the ranks: the highest rank with at least 1, 2, 3 and 4 cards, the second
+    highest with at least 2, and, for straights, which of the last 4 ranks had a
+    card and the highest straight found so far
+- for each suit: how many cards it has, and, for straight flushes, which of the
+    last 4 ranks it had
+
+and whatever can no longer change the best hand is dropped (a four of a kind
+forgets about pairs, a rank too far from the others to make a straight is
+cleared, etc.), which is what keeps the number of classes down.
+
+Flushes take one more trick. A suit gets a label the moment its first card
+shows up, for whether it's the first suit to end up with enough cards for a
+flush or not, and each hand is counted under the one labeling that turns out
+right (a class is dropped as soon as its cards break its labels). Hands with no
+flush never need to know about straight flushes, and hands with a flush never
+need to know about the hands a flush beats, so the two kinds are counted
+separately, each with far fewer classes than both together. The top rank of a
+flush without wilds is the first card of the suit labeled as the flush.
+
+Wild cards are all alike, so count the natural cards for each number of wilds,
+and multiply by the number of ways to pick that many wilds.
+
+Represent the counts with a dict of hand_size to a Counter of hand_code's, the
+same as simulation.simulate_hand_sizes, but with every hand of each size
+counted once.
+"""
+
+## POLYNOMIALS
+
+# a class's counts for each number of natural cards are packed into one long
+# integer, 64 bits per count, so adding n cards to all of them is one shift
+COUNT_BITS = 64
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+def get_poly_coefficient(poly, num_cards):
+    return (poly >> (COUNT_BITS * num_cards)) & COUNT_MASK
+
+def choose(n, k):
+    if k < 0 or k > n:
+        return 0
+    num_ways = 1
+    for i in range(min(k, n - k)):
+        num_ways = num_ways * (n - i) / (i + 1)
+    return num_ways
+
+## DECKS
+
+def get_natural_suit_masks(deck, is_wild_func):
+    # natural_suit_masks[rank] has bit n set if the deck has a natural card of
+    # that rank in suit n
+    natural_suit_masks = [0] * 15
+    for card in deck:
+        if not is_wild_func(card):
+            natural_suit_masks[get_card_rank(card)] |= 1 << get_card_suit(card)
+    return natural_suit_masks
+
+def get_useful_window_masks(natural_ranks, num_cards_needed):
+    # a window_mask has bit n set if rank + n had a card, right after going
+    # through rank. useful_window_masks[rank][window_mask] keeps only the bits
+    # that could still be in a straight, i.e. a 5 rank window with at least
+    # num_cards_needed cards, given the ranks below that could still have one.
+    # as in the finders, a 5-high straight's window starts at a rank 1 that no
+    # card has, so only wilds fill it
+    useful_window_masks = {}
+    for rank in range(1, 15):
+        useful_window_masks[rank] = []
+        for window_mask in range(16):
+            useful_window_mask = 0
+            for bit in range(4):
+                if not (window_mask >> bit) & 1:
+                    continue
+                for bottom_rank in range(
+                    max(rank + bit - 4, 1),
+                    min(rank, 11)
+                ):
+                    num_cards_had = len([
+                        other_bit
+                        for other_bit in range(4)
+                        if (window_mask >> other_bit) & 1
+                        and rank + other_bit <= bottom_rank + 4
+                    ])
+                    num_cards_left = len([
+                        other_rank
+                        for other_rank in range(bottom_rank, rank)
+                        if other_rank in natural_ranks
+                    ])
+                    if num_cards_had + num_cards_left >= num_cards_needed:
+                        useful_window_mask |= 1 << bit
+                        break
+            useful_window_masks[rank].append(useful_window_mask)
+    return useful_window_masks
+
+def get_deck_info(natural_suit_masks, num_wilds):
+    num_cards_needed = 5 - num_wilds
+    suits_natural_ranks = [
+        set(
+            rank
+            for rank in range(2, 15)
+            if (natural_suit_masks[rank] >> suit) & 1
+        )
+        for suit in range(NUM_SUITS)
+    ]
+    natural_ranks = set().union(*suits_natural_ranks)
+    return {
+        'num_wilds': num_wilds,
+        'num_cards_needed': num_cards_needed,
+        'natural_suit_masks': natural_suit_masks,
+        # with every rank in all suits or none, the suits are interchangeable
+        'is_symmetric': all(
+            suit_mask in (0, (1 << NUM_SUITS) - 1)
+            for suit_mask in natural_suit_masks
+        ),
+        # num_cards_left[rank][suit] is how many more cards the suit could get
+        # below rank
+        'num_cards_left': dict(
+            (
+                rank,
+                [
+                    len([r for r in suit_natural_ranks if r < rank])
+                    for suit_natural_ranks in suits_natural_ranks
+                ]
+            )
+            for rank in range(1, 15)
+        ),
+        'useful_window_masks': get_useful_window_masks(
+            natural_ranks,
+            num_cards_needed
+        ),
+        'suits_useful_window_masks': [
+            get_useful_window_masks(suit_natural_ranks, num_cards_needed)
+            for suit_natural_ranks in suits_natural_ranks
+        ],
+    }
+
+## SUIT STATES
+
+"""
+Represent a suit's state with a tuple of (label, num_cards, window_mask).
+window_mask (which of the last 4 ranks the suit had) is only kept for a suit
+that could still have a straight flush, and num_cards only for one whose label
+it has to check.
+
+In a hand with a flush, the suit labeled FLUSHED is the first suit to start of
+the ones with enough cards for a flush (going by suit for suits starting at the
+same rank). The suits that start before it are CAPPED, and the suits that start
+after it are LATER, which don't have to check anything since the flush is
+already settled, and only matter for straight flushes. In a hand without a
+flush, every suit is CAPPED.
+
+Moving a class's suit states through a rank gives a list of suit moves, each a
+tuple of ((next_suit_states, num_cards, started_flush, straight_flush_top_rank),
+num_ways), for each set of cards the rank could add.
+"""
+
+UNSTARTED = 0
+CAPPED = 1
+FLUSHED = 2
+LATER = 3
+
+UNSTARTED_SUIT = (UNSTARTED, 0, 0)
+# a capped suit that couldn't get enough cards for a flush anymore anyway
+SAFE_SUIT = (CAPPED, 0, 0)
+
+def get_next_suit_states(
+    suit_state,
+    suit,
+    has_card,
+    rank,
+    deck_info,
+    has_flush,
+    has_flushed_suit
+):
+    # a list of the suit states it could go to, since a suit starting here could
+    # get either label
+    label, num_cards, window_mask = suit_state
+    num_cards_needed = deck_info['num_cards_needed']
+    num_cards_left = deck_info['num_cards_left'][rank][suit]
+
+    if label == UNSTARTED:
+        if has_flushed_suit:
+            return [_get_later_suit_state(
+                window_mask,
+                suit,
+                has_card,
+                rank,
+                deck_info
+            )]
+        if not has_card:
+            if num_cards_left < num_cards_needed:
+                return [SAFE_SUIT]
+            return [suit_state]
+        next_suit_states = []
+        if 1 < num_cards_needed:
+            next_suit_states.append(
+                SAFE_SUIT
+                if 1 + num_cards_left < num_cards_needed else
+                (CAPPED, 1, 0)
+            )
+        if has_flush and 1 + num_cards_left >= num_cards_needed:
+            next_suit_states.append(
+                _get_flushed_suit_state(0, 0, suit, 1, rank, deck_info)
+            )
+        return next_suit_states
+    elif label == CAPPED:
+        if suit_state == SAFE_SUIT:
+            return [suit_state]
+        num_cards += has_card
+        if num_cards >= num_cards_needed:
+            return []
+        elif num_cards + num_cards_left < num_cards_needed:
+            return [SAFE_SUIT]
+        else:
+            return [(CAPPED, num_cards, 0)]
+    elif label == FLUSHED:
+        if num_cards + has_card + num_cards_left < num_cards_needed:
+            return []
+        return [_get_flushed_suit_state(
+            num_cards,
+            window_mask,
+            suit,
+            has_card,
+            rank,
+            deck_info
+        )]
+    else:
+        return [_get_later_suit_state(
+            window_mask,
+            suit,
+            has_card,
+            rank,
+            deck_info
+        )]
+
+def _get_next_window_mask(window_mask, suit, has_card, rank, deck_info):
+    suit_useful_window_masks = deck_info['suits_useful_window_masks'][suit]
+    return suit_useful_window_masks[rank][((window_mask << 1) | has_card) & 0xF]
+
+def _get_flushed_suit_state(
+    num_cards,
+    window_mask,
+    suit,
+    has_card,
+    rank,
+    deck_info
+):
+    return (
+        FLUSHED,
+        min(num_cards + has_card, deck_info['num_cards_needed']),
+        _get_next_window_mask(window_mask, suit, has_card, rank, deck_info),
+    )
+
+def _get_later_suit_state(window_mask, suit, has_card, rank, deck_info):
+    return (
+        LATER,
+        0,
+        _get_next_window_mask(window_mask, suit, has_card, rank, deck_info),
+    )
+
+def get_suit_moves(suit_states, rank, deck_info, has_flush):
+    num_cards_needed = deck_info['num_cards_needed']
+    natural_suit_mask = deck_info['natural_suit_masks'][rank]
+    had_flushed_suit = any(
+        suit_state[0] == FLUSHED
+        for suit_state in suit_states
+    )
+
+    # each suit's options for each of has_card and has_flushed_suit (whether a
+    # suit before it has the FLUSHED label), each a tuple of (next_suit_state,
+    # started_flush, has_straight_flush). only FLUSHED and LATER suits can have
+    # a straight flush, since it needs at least as many cards as a flush
+    suits_options = []
+    for suit, suit_state in enumerate(suit_states):
+        suit_options = []
+        for has_card in (0, 1):
+            has_card_options = []
+            for has_flushed_suit in (False, True):
+                has_card_options.append([
+                    (
+                        next_suit_state,
+                        (
+                            suit_state[0] == UNSTARTED and
+                            next_suit_state[0] == FLUSHED
+                        ),
+                        (
+                            rank <= 10 and
+                            next_suit_state[0] in (FLUSHED, LATER) and
+                            POPCOUNTS[suit_state[2]] + has_card >=
+                            num_cards_needed
+                        ),
+                    )
+                    for next_suit_state in get_next_suit_states(
+                        suit_state,
+                        suit,
+                        has_card,
+                        rank,
+                        deck_info,
+                        has_flush,
+                        had_flushed_suit or has_flushed_suit
+                    )
+                ])
+            suit_options.append(has_card_options)
+        suits_options.append(suit_options)
+
+    suit_moves = defaultdict(int)
+    for suits_mask in range(1 << NUM_SUITS):
+        if suits_mask & ~natural_suit_mask:
+            continue
+
+        # one option for each way of labeling the suits that start here, each a
+        # tuple of (next_suit_states, started_flush, has_straight_flush)
+        options = [((), False, False)]
+        for suit, suit_options in enumerate(suits_options):
+            has_card_options = suit_options[(suits_mask >> suit) & 1]
+            options = [
+                (
+                    next_suit_states + (next_suit_state,),
+                    started_flush or starts_flush,
+                    has_straight_flush or makes_straight_flush,
+                )
+                for next_suit_states, started_flush, has_straight_flush
+                in options
+                for next_suit_state, starts_flush, makes_straight_flush
+                in has_card_options[started_flush]
+            ]
+
+        num_cards = POPCOUNTS[suits_mask]
+        for next_suit_states, started_flush, has_straight_flush in options:
+            if has_flush and not any(
+                suit_state[0] in (UNSTARTED, FLUSHED)
+                for suit_state in next_suit_states
+            ):
+                continue
+            if has_straight_flush:
+                next_suit_states = get_settled_suit_states(next_suit_states)
+            if deck_info['is_symmetric']:
+                next_suit_states = tuple(sorted(next_suit_states))
+            suit_moves[(
+                next_suit_states,
+                num_cards,
+                started_flush,
+                rank + 4 if has_straight_flush else 0,
+            )] += 1
+
+    return suit_moves.items()
+
+def get_settled_suit_states(suit_states):
+    # once a hand has a straight flush, its suits only need what it takes to
+    # check their labels
+    return tuple(
+        (label, num_cards, 0)
+        for label, num_cards, _ in suit_states
+    )
+
+def get_five_high_straight_flush_top_rank(suit_states, deck_info):
+    # a 5-high straight flush, checked after all the ranks, with a wild for its
+    # rank 1
+    for label, _, window_mask in suit_states:
+        if (
+            label in (FLUSHED, LATER) and
+            POPCOUNTS[window_mask] >= deck_info['num_cards_needed']
+        ):
+            return 5
+    return 0
+
+def is_valid_ending(suit_states, deck_info, has_flush):
+    flushed_suit_states = [
+        suit_state
+        for suit_state in suit_states
+        if suit_state[0] == FLUSHED
+    ]
+    if has_flush:
+        return (
+            len(flushed_suit_states) == 1 and
+            flushed_suit_states[0][1] >= deck_info['num_cards_needed']
+        )
+    else:
+        return len(flushed_suit_states) == 0
+
+## RANK STATES
+
+"""
+Represent what a class knows about its ranks with a tuple of
+
+(top_rank_1, top_rank_2, second_rank_2, top_rank_3, top_rank_4,
+    straight_window_mask, straight_top_rank, flush_top_rank,
+    straight_flush_top_rank)
+
+where top_rank_n is the highest rank with at least n cards, second_rank_2 is
+the second highest rank with at least 2 cards, and any of them is 0 if there's
+none yet (or if it no longer matters).
+"""
+
+EMPTY_RANK_STATE = (0,) * 9
+
+def get_rank_state(
+    num_wilds,
+    has_flush,
+    top_rank_1,
+    top_rank_2,
+    second_rank_2,
+    top_rank_3,
+    top_rank_4,
+    straight_window_mask,
+    straight_top_rank,
+    flush_top_rank
+):
+    # drop whatever can't change the best hand anymore, using the same
+    # reasoning as the mask finders, with the number of wilds filling in for
+    # the cards a hand_type is missing
+    if num_wilds == 0:
+        pair_rank = (
+            top_rank_2 if top_rank_2 != top_rank_3 else second_rank_2
+        )
+        if top_rank_4:
+            return (0, 0, 0, 0, top_rank_4, 0, 0, 0, 0)
+        elif top_rank_3 and pair_rank:
+            return (0, pair_rank, 0, top_rank_3, 0, 0, 0, 0, 0)
+        elif has_flush:
+            return (0, top_rank_2, 0, top_rank_3, 0, 0, 0, flush_top_rank, 0)
+        elif straight_top_rank:
+            return (0, top_rank_2, 0, top_rank_3, 0, 0, straight_top_rank, 0, 0)
+        elif top_rank_2:
+            return (
+                0,
+                top_rank_2,
+                second_rank_2,
+                top_rank_3,
+                0,
+                straight_window_mask,
+                0,
+                0,
+                0,
+            )
+        else:
+            return (
+                top_rank_1,
+                0,
+                0,
+                0,
+                0,
+                straight_window_mask,
+                0,
+                0,
+                0,
+            )
+    elif num_wilds == 1:
+        if top_rank_3:
+            return (0, 0, 0, top_rank_3, 0, 0, 0, 0, 0)
+        elif top_rank_2 and second_rank_2:
+            return (0, top_rank_2, second_rank_2, 0, 0, 0, 0, 0, 0)
+        elif has_flush:
+            return (0, top_rank_2, 0, 0, 0, 0, 0, 0, 0)
+        elif straight_top_rank:
+            return (0, top_rank_2, 0, 0, 0, 0, straight_top_rank, 0, 0)
+        elif top_rank_2:
+            return (
+                0,
+                top_rank_2,
+                0,
+                0,
+                0,
+                straight_window_mask,
+                0,
+                0,
+                0,
+            )
+        else:
+            return (
+                top_rank_1,
+                0,
+                0,
+                0,
+                0,
+                straight_window_mask,
+                0,
+                0,
+                0,
+            )
+    elif num_wilds == 2:
+        if top_rank_2:
+            return (0, top_rank_2, 0, 0, 0, 0, 0, 0, 0)
+        elif has_flush:
+            return EMPTY_RANK_STATE
+        elif straight_top_rank:
+            return (0, 0, 0, 0, 0, 0, straight_top_rank, 0, 0)
+        else:
+            return (
+                top_rank_1,
+                0,
+                0,
+                0,
+                0,
+                straight_window_mask,
+                0,
+                0,
+                0,
+            )
+    elif num_wilds == 3:
+        return (top_rank_1, 0, 0, 0, 0, 0, 0, 0, 0)
+    else:
+        return EMPTY_RANK_STATE
+
+def get_next_rank_state(
+    rank_state,
+    rank,
+    num_cards,
+    started_flush,
+    deck_info,
+    has_flush
+):
+    (
+        top_rank_1,
+        top_rank_2,
+        second_rank_2,
+        top_rank_3,
+        top_rank_4,
+        straight_window_mask,
+        straight_top_rank,
+        flush_top_rank,
+        _,
+    ) = rank_state
+    has_card = int(num_cards >= 1)
+
+    if (
+        rank <= 10 and
+        not straight_top_rank and
+        POPCOUNTS[straight_window_mask] + has_card >=
+        deck_info['num_cards_needed']
+    ):
+        straight_top_rank = rank + 4
+
+    return get_rank_state(
+        deck_info['num_wilds'],
+        has_flush,
+        top_rank_1 or (rank if num_cards >= 1 else 0),
+        top_rank_2 or (rank if num_cards >= 2 else 0),
+        second_rank_2 or (rank if num_cards >= 2 and top_rank_2 else 0),
+        top_rank_3 or (rank if num_cards >= 3 else 0),
+        top_rank_4 or (rank if num_cards >= 4 else 0),
+        deck_info['useful_window_masks'][rank][
+            ((straight_window_mask << 1) | has_card) & 0xF
+        ],
+        straight_top_rank,
+        flush_top_rank or (rank if started_flush else 0),
+    )
+
+def get_five_high_rank_state(rank_state, deck_info, has_flush):
+    # a 5-high straight, checked after all the ranks, with a wild for its rank
+    # 1
+    (
+        top_rank_1,
+        top_rank_2,
+        second_rank_2,
+        top_rank_3,
+        top_rank_4,
+        straight_window_mask,
+        straight_top_rank,
+        flush_top_rank,
+        _,
+    ) = rank_state
+    if (
+        not straight_top_rank and
+        POPCOUNTS[straight_window_mask] >= deck_info['num_cards_needed']
+    ):
+        straight_top_rank = 5
+    return get_rank_state(
+        deck_info['num_wilds'],
+        has_flush,
+        top_rank_1,
+        top_rank_2,
+        second_rank_2,
+        top_rank_3,
+        top_rank_4,
+        0,
+        straight_top_rank,
+        flush_top_rank
+    )
+
+def _get_hand_code_from_ranks(hand_type, *tie_break_ranks):
+    tie_break_keys = HAND_TYPES[HAND_TYPE_INDEXES[hand_type]]['tie_break_keys']
+    return get_hand_code(hand_type, dict(zip(tie_break_keys, tie_break_ranks)))
+
+def get_rank_state_hand_code(rank_state, num_wilds, has_flush):
+    (
+        top_rank_1,
+        top_rank_2,
+        second_rank_2,
+        top_rank_3,
+        top_rank_4,
+        _,
+        straight_top_rank,
+        flush_top_rank,
+        straight_flush_top_rank,
+    ) = rank_state
+
+    if straight_flush_top_rank:
+        return _get_hand_code_from_ranks(
+            'straight_flush',
+            straight_flush_top_rank
+        )
+
+    if num_wilds == 0:
+        pair_rank = (
+            top_rank_2 if top_rank_2 != top_rank_3 else second_rank_2
+        )
+        if top_rank_4:
+            return _get_hand_code_from_ranks('four_of_a_kind', top_rank_4)
+        elif top_rank_3 and pair_rank:
+            return _get_hand_code_from_ranks(
+                'full_house',
+                top_rank_3,
+                pair_rank
+            )
+        elif has_flush:
+            return _get_hand_code_from_ranks('flush', flush_top_rank)
+        elif straight_top_rank:
+            return _get_hand_code_from_ranks('straight', straight_top_rank)
+        elif top_rank_3:
+            return _get_hand_code_from_ranks('three_of_a_kind', top_rank_3)
+        elif top_rank_2 and second_rank_2:
+            return _get_hand_code_from_ranks(
+                'two_pair',
+                top_rank_2,
+                second_rank_2
+            )
+        elif top_rank_2:
+            return _get_hand_code_from_ranks('one_pair', top_rank_2)
+        else:
+            return _get_hand_code_from_ranks('high_card', top_rank_1)
+    elif num_wilds == 1:
+        if top_rank_3:
+            return _get_hand_code_from_ranks('four_of_a_kind', top_rank_3)
+        elif top_rank_2 and second_rank_2:
+            return _get_hand_code_from_ranks(
+                'full_house',
+                top_rank_2,
+                second_rank_2
+            )
+        elif has_flush:
+            return _get_hand_code_from_ranks('flush', 14)
+        elif straight_top_rank:
+            return _get_hand_code_from_ranks('straight', straight_top_rank)
+        elif top_rank_2:
+            return _get_hand_code_from_ranks('three_of_a_kind', top_rank_2)
+        elif top_rank_1:
+            return _get_hand_code_from_ranks('one_pair', top_rank_1)
+        else:
+            return _get_hand_code_from_ranks('high_card', 14)
+    elif num_wilds == 2:
+        if top_rank_2:
+            return _get_hand_code_from_ranks('four_of_a_kind', top_rank_2)
+        elif has_flush:
+            return _get_hand_code_from_ranks('flush', 14)
+        elif straight_top_rank:
+            return _get_hand_code_from_ranks('straight', straight_top_rank)
+        elif top_rank_1:
+            return _get_hand_code_from_ranks('three_of_a_kind', top_rank_1)
+        else:
+            return _get_hand_code_from_ranks('one_pair', 14)
+    elif num_wilds == 3:
+        if top_rank_1:
+            return _get_hand_code_from_ranks('four_of_a_kind', top_rank_1)
+        else:
+            return _get_hand_code_from_ranks('three_of_a_kind', 14)
+    else:
+        return _get_hand_code_from_ranks('four_of_a_kind', 14)
+
+## COUNTING
+
+def count_natural_hands(num_wilds, natural_suit_masks, max_num_naturals):
+    # returns a dict of hand_code to a poly of how many sets of natural cards,
+    # for each number of them, have that best hand alongside num_wilds wilds
+    if num_wilds >= 5:
+        # 5 wilds are a straight flush to the ace by themselves
+        num_natural_cards = sum(
+            POPCOUNTS[suit_mask]
+            for suit_mask in natural_suit_masks
+        )
+        poly = 0
+        for num_naturals in range(max_num_naturals + 1):
+            poly |= (
+                choose(num_natural_cards, num_naturals) <<
+                (COUNT_BITS * num_naturals)
+            )
+        return {_get_hand_code_from_ranks('straight_flush', 14): poly}
+
+    deck_info = get_deck_info(natural_suit_masks, num_wilds)
+    poly_mask = (1 << (COUNT_BITS * (max_num_naturals + 1))) - 1
+
+    hand_code_polys = defaultdict(int)
+    for has_flush in (False, True):
+        classes = {((UNSTARTED_SUIT,) * NUM_SUITS, EMPTY_RANK_STATE): 1}
+        for rank in range(14, 1, -1):
+            next_classes = defaultdict(int)
+            suit_moves_cache = {}
+            next_rank_states_cache = {}
+            for (suit_states, rank_state), poly in classes.iteritems():
+                suit_moves = suit_moves_cache.get(suit_states)
+                if suit_moves is None:
+                    suit_moves = get_suit_moves(
+                        suit_states,
+                        rank,
+                        deck_info,
+                        has_flush
+                    )
+                    suit_moves_cache[suit_states] = suit_moves
+
+                is_settled = rank_state[-1] != 0
+                for (
+                    (next_suit_states, num_cards, started_flush, top_rank),
+                    num_ways
+                ) in suit_moves:
+                    next_poly = (
+                        (poly * num_ways) << (COUNT_BITS * num_cards)
+                    ) & poly_mask
+                    if not next_poly:
+                        continue
+
+                    if is_settled:
+                        next_suit_states = get_settled_suit_states(
+                            next_suit_states
+                        )
+                        next_rank_state = rank_state
+                    elif top_rank:
+                        next_rank_state = (0,) * 8 + (top_rank,)
+                    else:
+                        rank_move = (rank_state, num_cards, started_flush)
+                        next_rank_state = next_rank_states_cache.get(rank_move)
+                        if next_rank_state is None:
+                            next_rank_state = get_next_rank_state(
+                                rank_state,
+                                rank,
+                                num_cards,
+                                started_flush,
+                                deck_info,
+                                has_flush
+                            )
+                            next_rank_states_cache[rank_move] = next_rank_state
+                    next_classes[(next_suit_states, next_rank_state)] += (
+                        next_poly
+                    )
+            classes = next_classes
+
+        for (suit_states, rank_state), poly in classes.iteritems():
+            if not is_valid_ending(suit_states, deck_info, has_flush):
+                continue
+            if not rank_state[-1]:
+                top_rank = get_five_high_straight_flush_top_rank(
+                    suit_states,
+                    deck_info
+                )
+                if top_rank:
+                    rank_state = (0,) * 8 + (top_rank,)
+                else:
+                    rank_state = get_five_high_rank_state(
+                        rank_state,
+                        deck_info,
+                        has_flush
+                    )
+            hand_code = get_rank_state_hand_code(
+                rank_state,
+                num_wilds,
+                has_flush
+            )
+            hand_code_polys[hand_code] += poly
+
+    return hand_code_polys
+
+def count_hand_sizes(hand_sizes, is_wild_func=twos_are_wild, deck=None):
+    if deck is None:
+        deck = range(52)
+
+    natural_suit_masks = get_natural_suit_masks(deck, is_wild_func)
+    num_wild_cards = len([card for card in deck if is_wild_func(card)])
+    max_hand_size = max(hand_sizes)
+
+    hand_counts_by_hand_size = dict(
+        (hand_size, Counter())
+        for hand_size in hand_sizes
+    )
+    for num_wilds in range(min(num_wild_cards, max_hand_size) + 1):
+        num_wilds_ways = choose(num_wild_cards, num_wilds)
+        hand_code_polys = count_natural_hands(
+            num_wilds,
+            natural_suit_masks,
+            max_hand_size - num_wilds
+        )
+        for hand_code, poly in hand_code_polys.iteritems():
+            for hand_size in hand_sizes:
+                if hand_size < num_wilds:
+                    continue
+                num_hands = get_poly_coefficient(poly, hand_size - num_wilds)
+                if num_hands:
+                    hand_counts_by_hand_size[hand_size][hand_code] += (
+                        num_wilds_ways * num_hands
+                    )
+
+    return hand_counts_by_hand_size
+
+def count_hands(hand_size, is_wild_func=twos_are_wild, deck=None):
+    return count_hand_sizes(
+        [hand_size],
+        is_wild_func=is_wild_func,
+        deck=deck
+    )[hand_size]
@@ -0,0 +1,201 @@
+import batch
+import exact
+import poker
+import simulation
+
+from collections import Counter
+import itertools
+import math
+import random
+import unittest
+
+import numpy as np
+
+
+def count_five_card_hands(wild_rule):
+    # every hand of 5 cards from the wild rule's deck, one batch for each
+    # lowest card
+    deck = poker.WILD_RULES[wild_rule]['deck']
+    other_cards = np.array(list(itertools.combinations(deck, 4)))
+    hand_code_counts = np.zeros(poker.NUM_HAND_CODES, dtype=np.int64)
+    for card in deck:
+        higher_cards = other_cards[other_cards[:, 0] > card]
+        if len(higher_cards) == 0:
+            continue
+        cards = np.hstack([
+            np.full((len(higher_cards), 1), card, dtype=higher_cards.dtype),
+            higher_cards,
+        ])
+        hand_type_codes, tie_break_ranks, _ = batch.get_best_hands(
+            cards,
+            wild_rule=wild_rule
+        )
+        hand_code_counts += np.bincount(
+            batch.get_hand_codes(hand_type_codes, tie_break_ranks),
+            minlength=poker.NUM_HAND_CODES
+        )
+    return Counter(dict(
+        (hand_code, int(count))
+        for hand_code, count in enumerate(hand_code_counts)
+        if count
+    ))
+
+
+class TestExact(unittest.TestCase):
+    def test_count_hand_sizes(self):
+        for is_wild_func in [
+            poker.twos_are_wild,
+            poker.deuces_and_treys_are_wild
+        ]:
+            hand_counts_by_hand_size = exact.count_hand_sizes(
+                [1, 2, 3],
+                is_wild_func=is_wild_func
+            )
+            for hand_size in [1, 2, 3]:
+                self.assertEqual(
+                    hand_counts_by_hand_size[hand_size],
+                    Counter(
+                        poker.get_best_hand_code(
+                            list(cards),
+                            is_wild_func,
+                            engine='bitmask'
+                        )
+                        for cards in itertools.combinations(
+                            range(52),
+                            hand_size
+                        )
+                    )
+                )
+
+    def test_count_five_card_hands(self):
+        # every 5-card hand, under every wild rule
+        for wild_rule, wild_rule_obj in sorted(poker.WILD_RULES.items()):
+            self.assertEqual(
+                exact.count_hands(
+                    5,
+                    is_wild_func=wild_rule_obj['is_wild_func'],
+                    deck=wild_rule_obj['deck']
+                ),
+                count_five_card_hands(wild_rule)
+            )
+
+    def test_count_hands_matches_simulated(self):
+        # each best hand's share of 7 cards dealt with jokers, within 5
+        # standard errors of its simulated share
+        wild_rule_obj = poker.WILD_RULES['jokers']
+        hand_counts = exact.count_hands(
+            7,
+            is_wild_func=wild_rule_obj['is_wild_func'],
+            deck=wild_rule_obj['deck']
+        )
+        num_hands = sum(hand_counts.values())
+        self.assertEqual(num_hands, exact.choose(54, 7))
+
+        num_trials = 20000
+        simulated_hand_counts = simulation.simulate_hand_sizes(
+            [7],
+            num_trials,
+            seed=0,
+            engine='bitmask',
+            wild_rule='jokers'
+        )[7]
+        self.assertTrue(
+            set(simulated_hand_counts.keys()) <= set(hand_counts.keys())
+        )
+        for hand_code, count in hand_counts.items():
+            fraction = float(count) / num_hands
+            self.assertAlmostEqual(
+                float(simulated_hand_counts[hand_code]) / num_trials,
+                fraction,
+                delta=(
+                    5 * math.sqrt(fraction * (1 - fraction) / num_trials) +
+                    0.0005
+                )
+            )
+
+    def test_count_low_straights(self):
+        # every hand from a deck of the aces through 5s, where straights and
+        # straight flushes are 5-high, and need a wild for their rank 1
+        low_deck = [
+            card
+            for card in range(52)
+            if poker.get_card_rank(card) in (14, 2, 3, 4, 5)
+        ]
+        for is_wild_func in [
+            poker.twos_are_wild,
+            poker.deuces_and_treys_are_wild,
+            poker.one_eyed_jacks_are_wild,
+        ]:
+            hand_counts_by_hand_size = exact.count_hand_sizes(
+                [4, 5, 6],
+                is_wild_func=is_wild_func,
+                deck=low_deck
+            )
+            for hand_size in [4, 5, 6]:
+                self.assertEqual(
+                    hand_counts_by_hand_size[hand_size],
+                    Counter(
+                        poker.get_best_hand_code(
+                            list(cards),
+                            is_wild_func,
+                            engine='bitmask'
+                        )
+                        for cards in itertools.combinations(
+                            low_deck,
+                            hand_size
+                        )
+                    )
+                )
+
+        # an ace is no rank 1, so A-2-3-4 and A-3-4-5 of clubs, or of mixed
+        # suits, with a 6 or a wild make a flush or a pair of aces, not a
+        # straight flush or a straight
+        for deck, hand_code in [
+            ([0, 1, 2, 3, 12], 0x5e0),
+            ([0, 1, 2, 3, 25], 0x1e0),
+            ([1, 2, 3, 12, 0], 0x5e0),
+            ([1, 2, 3, 12, 4], 0x5e0),
+            ([1, 2, 3, 25, 13], 0x1e0),
+        ]:
+            self.assertEqual(
+                exact.count_hands(5, deck=deck),
+                Counter([hand_code])
+            )
+
+    def test_count_hands_of_one_hand(self):
+        # a deck of just the hand's cards has that one hand, so this checks the
+        # counting against each best hand, for every hand size
+        rand = random.Random(0)
+        for hand_size in range(1, 29):
+            for _ in range(2):
+                cards = rand.sample(range(52), hand_size)
+                for is_wild_func in [
+                    poker.twos_are_wild,
+                    poker.deuces_and_treys_are_wild,
+                ]:
+                    self.assertEqual(
+                        exact.count_hands(
+                            hand_size,
+                            is_wild_func=is_wild_func,
+                            deck=cards
+                        ),
+                        Counter([
+                            poker.get_best_hand_code(
+                                cards,
+                                is_wild_func,
+                                engine='bitmask'
+                            )
+                        ])
+                    )
+
+    def test_count_hands_totals(self):
+        hand_counts = exact.count_hands(5)
+        self.assertEqual(sum(hand_counts.values()), exact.choose(52, 5))
+        self.assertTrue(all(
+            num_hands > 0
+            for num_hands in hand_counts.values()
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
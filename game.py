@@ -0,0 +1,389 @@
+from collections import defaultdict
+import itertools
+
+import numpy as np
+
+import batch
+from dealing import deal_hands, make_random_state, split_seed
+from poker import (
+    NUM_HAND_CODES,
+    NUM_SUITS,
+    WILD_RULES,
+    get_best_hand_code,
+    get_card_rank,
+    get_card_suit,
+    get_hand_code,
+)
+from survival_table import MAX_HAND_SIZE
+
+
+"""
+Games
+
+Simulate games of BS poker. Each round, every player still in is dealt their
+number of cards from one shuffled deck, and starting from the round's first
+player, the players take turns either bidding a hand higher than the last bid,
+or calling BS on it. Then all the cards are shown. If the best hand among all of
+them is at least the last bid, the caller loses the round, and otherwise the
+bidder does. The loser gets one more card from then on, and a player who'd have
+more than max_cards cards is out. The loser starts the next round, or the next
+player still in if the loser is out, and the last player left wins.
+
+Run many games in lockstep, with numpy arrays of one row per game instead of an
+object per game, so each step of every game is a few array operations. The best
+hand of each round's cards comes from batch.get_best_hands by default, which
+finds the same hands as get_best_hand for a whole batch at once, one batch per
+total number of cards in play, or from get_best_hand_code with any of its
+engines, one game at a time.
+
+Represent a bid with its hand_code, and calling BS with CALL. The bids worth
+making under a wild rule are the hand_code's some hand has as its best hand,
+which get_bid_codes finds once per wild rule. Aces play high, so there's no
+5-high straight, and under twos no pair of twos, for example.
+
+Represent the state of many games with a dict of:
+- num_cards: (num_games, num_players) each player's number of cards, 0 once
+    they're out
+- first_players: (num_games,) the player who starts the next round
+- num_rounds: (num_games,) the number of rounds played so far
+- winners: (num_games,) the winning player, -1 while the game is going
+
+A policy decides the turns of one player, for every game where it's their turn
+at once. It takes in a turn, which is a dict of, for each of n games:
+- games: (n,) the index of the game
+- players: (n,) the player whose turn it is
+- bids: (n,) the last bid, -1 if there isn't one yet
+- total_cards: (n,) the number of cards in play
+- num_cards: (n, num_players) each player's number of cards
+- own_cards: (n, max_cards) the player's cards, padded with -1
+and returns an (n,) array of a bid higher than the last bid or CALL for each.
+The first turn of a round has no bid to call, and nothing beats the top hand.
+"""
+
+CALL = -1
+NO_BID = -1
+
+def generate_bid_hands(wild_rule):
+    # a hand for every number of wilds and natural ranks of up to 5 cards, with
+    # the natural cards spread over the suits, and a hand for every set of
+    # natural cards of one suit that the wilds fill in to 5 cards. every best
+    # hand takes at most 5 cards, so these have every best hand there is
+    deck = WILD_RULES[wild_rule]['deck']
+    wild_mask = WILD_RULES[wild_rule]['wild_mask']
+    wild_cards = [card for card in deck if (wild_mask >> card) & 1]
+    natural_cards_by_rank = dict(
+        (rank, [
+            card
+            for card in deck
+            if not (wild_mask >> card) & 1 and get_card_rank(card) == rank
+        ])
+        for rank in range(2, 15)
+    )
+
+    for num_naturals in range(6):
+        for num_wilds in range(min(5 - num_naturals, len(wild_cards)) + 1):
+            if num_naturals + num_wilds == 0:
+                continue
+            for ranks in itertools.combinations_with_replacement(
+                range(2, 15),
+                num_naturals
+            ):
+                # the i-th natural card takes the first suit it can from i on
+                cards = list(wild_cards[:num_wilds])
+                for i, rank in enumerate(ranks):
+                    natural_cards = sorted(
+                        (
+                            card
+                            for card in natural_cards_by_rank[rank]
+                            if card not in cards
+                        ),
+                        key=lambda card: (get_card_suit(card) - i) % NUM_SUITS
+                    )
+                    if not natural_cards:
+                        break
+                    cards.append(natural_cards[0])
+                else:
+                    yield cards
+
+    for suit in range(NUM_SUITS):
+        suit_cards = [
+            card
+            for rank in range(2, 15)
+            for card in natural_cards_by_rank[rank]
+            if get_card_suit(card) == suit
+        ]
+        for num_naturals in range(max(5 - len(wild_cards), 1), 6):
+            for natural_cards in itertools.combinations(
+                suit_cards,
+                num_naturals
+            ):
+                yield wild_cards[:5 - num_naturals] + list(natural_cards)
+
+_bid_codes = {}
+
+def get_bid_codes(wild_rule='twos'):
+    # every hand_code there is a hand for under wild_rule, in order
+    if wild_rule not in _bid_codes:
+        hands_by_hand_size = defaultdict(list)
+        for cards in generate_bid_hands(wild_rule):
+            hands_by_hand_size[len(cards)].append(cards)
+        bid_codes = set()
+        for hands in hands_by_hand_size.values():
+            hand_type_codes, tie_break_ranks, _ = batch.get_best_hands(
+                np.array(hands),
+                wild_rule=wild_rule
+            )
+            bid_codes.update(
+                batch.get_hand_codes(hand_type_codes, tie_break_ranks).tolist()
+            )
+        _bid_codes[wild_rule] = np.array(sorted(bid_codes))
+    return _bid_codes[wild_rule]
+
+TOP_BID_CODE = get_hand_code('straight_flush', {'top_rank': 14})
+
+def get_next_bids(bids, wild_rule='twos'):
+    # the lowest bid higher than each bid, or TOP_BID_CODE past the top
+    bid_codes = get_bid_codes(wild_rule)
+    next_bid_indexes = np.searchsorted(bid_codes, bids, side='right')
+    return bid_codes[np.minimum(next_bid_indexes, len(bid_codes) - 1)]
+
+## POLICIES
+
+def make_survival_policy(
+    survival_table,
+    call_threshold=0.5,
+    wild_rule='twos'
+):
+    # call BS when the chance that the best hand of all the cards in play is
+    # at least the last bid is below call_threshold, and otherwise raise to
+    # the next bid. past MAX_HAND_SIZE cards it looks up MAX_HAND_SIZE, which
+    # only underestimates, since more cards never make a worse hand
+    call_probabilities = np.frombuffer(survival_table, dtype=np.float64)
+    call_probabilities = call_probabilities.reshape(-1, NUM_HAND_CODES)
+
+    def survival_policy(turn):
+        bids = turn['bids']
+        hand_sizes = np.minimum(turn['total_cards'], MAX_HAND_SIZE)
+        bid_probabilities = call_probabilities[
+            hand_sizes,
+            np.maximum(bids, 0)
+        ]
+        calls = (bids != NO_BID) & (
+            (bid_probabilities < call_threshold) | (bids >= TOP_BID_CODE)
+        )
+        return np.where(calls, CALL, get_next_bids(bids, wild_rule=wild_rule))
+
+    return survival_policy
+
+## PLAYING
+
+def make_games(num_games, num_players, random_state, starting_cards=1):
+    return {
+        'num_cards': np.full((num_games, num_players), starting_cards),
+        'first_players': random_state.randint(num_players, size=num_games),
+        'num_rounds': np.zeros(num_games, dtype=int),
+        'winners': np.full(num_games, -1),
+    }
+
+def get_next_players(num_cards, players):
+    # the next player after each player who's still in
+    num_players = num_cards.shape[1]
+    candidates = (
+        (players[:, None] + np.arange(1, num_players + 1)) % num_players
+    )
+    still_in = num_cards[np.arange(len(players))[:, None], candidates] > 0
+    return candidates[np.arange(len(players)), np.argmax(still_in, axis=1)]
+
+def get_best_hand_codes(cards, total_cards, wild_rule, engine='batch'):
+    # the hand_code of the best hand of each game's first total_cards cards
+    hand_codes = np.zeros(len(total_cards), dtype=int)
+    if engine != 'batch':
+        is_wild_func = WILD_RULES[wild_rule]['is_wild_func']
+        for game_index, (game_cards, hand_size) in enumerate(
+            zip(cards.tolist(), total_cards)
+        ):
+            hand_codes[game_index] = get_best_hand_code(
+                game_cards[:hand_size],
+                is_wild_func,
+                engine=engine
+            )
+        return hand_codes
+
+    for hand_size in np.unique(total_cards):
+        games = np.nonzero(total_cards == hand_size)[0]
+        hand_type_codes, tie_break_ranks, _ = batch.get_best_hands(
+            cards[games, :hand_size],
+            wild_rule=wild_rule
+        )
+        hand_codes[games] = batch.get_hand_codes(
+            hand_type_codes,
+            tie_break_ranks
+        )
+    return hand_codes
+
+def get_own_cards(cards, offsets, num_cards, max_cards):
+    card_indexes = np.arange(max_cards)
+    positions = np.minimum(
+        offsets[:, None] + card_indexes,
+        cards.shape[1] - 1
+    )
+    own_cards = cards[np.arange(len(offsets))[:, None], positions]
+    return np.where(card_indexes < num_cards[:, None], own_cards, -1)
+
+def play_round(
+    games,
+    policies,
+    random_state,
+    max_cards=5,
+    wild_rule='twos',
+    engine='batch'
+):
+    # play a round of every game that's still going, and returns the losers,
+    # -1 for games that were already over
+    deck = WILD_RULES[wild_rule]['deck']
+    num_cards = games['num_cards']
+    num_games, num_players = num_cards.shape
+    playing = np.nonzero(games['winners'] < 0)[0]
+    losers = np.full(num_games, -1)
+    if len(playing) == 0:
+        return losers
+
+    # deal each player's cards in turn, from one deck per game
+    playing_num_cards = num_cards[playing]
+    total_cards = playing_num_cards.sum(axis=1)
+    cards = deal_hands(deck, total_cards.max(), len(playing), random_state)
+    offsets = np.cumsum(playing_num_cards, axis=1) - playing_num_cards
+    best_hand_codes = get_best_hand_codes(
+        cards,
+        total_cards,
+        wild_rule,
+        engine=engine
+    )
+
+    players = games['first_players'][playing].copy()
+    bids = np.full(len(playing), NO_BID)
+    bidders = np.full(len(playing), -1)
+    callers = np.full(len(playing), -1)
+    bidding = np.ones(len(playing), dtype=bool)
+    while bidding.any():
+        for player in range(num_players):
+            turn_games = np.nonzero(bidding & (players == player))[0]
+            if len(turn_games) == 0:
+                continue
+            actions = np.asarray(policies[player]({
+                'games': playing[turn_games],
+                'players': players[turn_games],
+                'bids': bids[turn_games],
+                'total_cards': total_cards[turn_games],
+                'num_cards': playing_num_cards[turn_games],
+                'own_cards': get_own_cards(
+                    cards[turn_games],
+                    offsets[turn_games, player],
+                    playing_num_cards[turn_games, player],
+                    max_cards
+                ),
+            }))
+
+            calls = actions == CALL
+            if (calls & (bids[turn_games] == NO_BID)).any():
+                raise ValueError(
+                    'player {} called BS with no bid'.format(player)
+                )
+            if (~calls & (
+                (actions <= bids[turn_games]) | (actions > TOP_BID_CODE)
+            )).any():
+                raise ValueError(
+                    'player {} bid no higher than the last bid'.format(player)
+                )
+
+            calling_games = turn_games[calls]
+            callers[calling_games] = player
+            bidding[calling_games] = False
+
+            bidding_games = turn_games[~calls]
+            bids[bidding_games] = actions[~calls]
+            bidders[bidding_games] = player
+            players[bidding_games] = get_next_players(
+                playing_num_cards[bidding_games],
+                players[bidding_games]
+            )
+
+    playing_losers = np.where(best_hand_codes >= bids, callers, bidders)
+    losers[playing] = playing_losers
+
+    # the loser gets a card, or is out past max_cards
+    playing_num_cards[np.arange(len(playing)), playing_losers] += 1
+    playing_num_cards[playing_num_cards > max_cards] = 0
+    num_cards[playing] = playing_num_cards
+    games['num_rounds'][playing] += 1
+
+    loser_still_in = playing_num_cards[
+        np.arange(len(playing)),
+        playing_losers
+    ] > 0
+    games['first_players'][playing] = np.where(
+        loser_still_in,
+        playing_losers,
+        get_next_players(playing_num_cards, playing_losers)
+    )
+
+    game_over = (playing_num_cards > 0).sum(axis=1) == 1
+    games['winners'][playing[game_over]] = np.argmax(
+        playing_num_cards[game_over] > 0,
+        axis=1
+    )
+    return losers
+
+def play_games(
+    num_games,
+    policies,
+    seed,
+    starting_cards=1,
+    max_cards=5,
+    wild_rule='twos',
+    engine='batch'
+):
+    # play num_games full games, with a policy for each player, to the end
+    num_players = len(policies)
+    if num_players * max_cards > len(WILD_RULES[wild_rule]['deck']):
+        raise ValueError(
+            '{} players with up to {} cards is more than one deck'.format(
+                num_players,
+                max_cards
+            )
+        )
+
+    random_state = make_random_state(split_seed(seed, 'games'))
+    games = make_games(
+        num_games,
+        num_players,
+        random_state,
+        starting_cards=starting_cards
+    )
+    while (games['winners'] < 0).any():
+        play_round(
+            games,
+            policies,
+            random_state,
+            max_cards=max_cards,
+            wild_rule=wild_rule,
+            engine=engine
+        )
+    return games
+
+## STATS
+
+def get_game_stats(games):
+    num_players = games['num_cards'].shape[1]
+    num_rounds = games['num_rounds']
+    return {
+        'num_games': len(num_rounds),
+        'num_rounds': int(num_rounds.sum()),
+        'win_rates': (
+            np.bincount(games['winners'], minlength=num_players) /
+            float(len(num_rounds))
+        ).tolist(),
+        'mean_num_rounds': float(num_rounds.mean()),
+        'median_num_rounds': float(np.median(num_rounds)),
+        'max_num_rounds': int(num_rounds.max()),
+    }
@@ -0,0 +1,198 @@
+import exact
+import game
+import poker
+import survival_table
+
+from collections import defaultdict
+import numpy as np
+import unittest
+
+
+ONE_PAIR_OF_ACES = poker.get_hand_code('one_pair', {'rank': 14})
+TOP_BID_CODE = poker.get_hand_code('straight_flush', {'top_rank': 14})
+
+def make_bid_then_call_policy(bid, own_cards_by_game=None):
+    # bid the given hand to start a round, and call BS on any bid
+    def bid_then_call_policy(turn):
+        if own_cards_by_game is not None:
+            for game_index, own_cards in zip(turn['games'], turn['own_cards']):
+                own_cards_by_game[game_index].extend(
+                    card for card in own_cards if card >= 0
+                )
+        return np.where(turn['bids'] == game.NO_BID, bid, game.CALL)
+
+    return bid_then_call_policy
+
+
+class TestGame(unittest.TestCase):
+    def test_bid_codes(self):
+        # every best hand of up to 5 cards, which is every best hand there is
+        for wild_rule, wild_rule_obj in sorted(poker.WILD_RULES.items()):
+            hand_counts_by_hand_size = exact.count_hand_sizes(
+                range(1, 6),
+                is_wild_func=wild_rule_obj['is_wild_func'],
+                deck=wild_rule_obj['deck']
+            )
+            self.assertEqual(
+                game.get_bid_codes(wild_rule).tolist(),
+                sorted(set(
+                    hand_code
+                    for hand_counts in hand_counts_by_hand_size.values()
+                    for hand_code, count in hand_counts.items()
+                    if count
+                ))
+            )
+            self.assertEqual(game.get_bid_codes(wild_rule)[-1], TOP_BID_CODE)
+
+        bid_codes = game.get_bid_codes()
+        self.assertEqual(
+            bid_codes[0],
+            poker.get_hand_code('high_card', {'rank': 3})
+        )
+        self.assertEqual(game.TOP_BID_CODE, TOP_BID_CODE)
+        for hand_type, tie_break_dict in [
+            ('one_pair', {'rank': 2}),
+            ('two_pair', {'high_rank': 3, 'low_rank': 3}),
+            ('straight', {'top_rank': 5}),
+            ('flush', {'top_rank': 6}),
+            ('full_house', {'triplet_rank': 14, 'pair_rank': 14}),
+        ]:
+            self.assertNotIn(
+                poker.get_hand_code(hand_type, tie_break_dict),
+                bid_codes
+            )
+        next_bids = game.get_next_bids(
+            np.array([game.NO_BID, ONE_PAIR_OF_ACES])
+        )
+        self.assertEqual(
+            next_bids.tolist(),
+            [
+                bid_codes[0],
+                poker.get_hand_code(
+                    'two_pair',
+                    {'high_rank': 4, 'low_rank': 3}
+                ),
+            ]
+        )
+        self.assertEqual(
+            game.get_next_bids(np.array([game.NO_BID]), wild_rule='none')[0],
+            poker.get_hand_code('high_card', {'rank': 2})
+        )
+
+    def test_play_round(self):
+        # whoever calls BS on the lowest hand loses
+        random_state = np.random.RandomState(0)
+        games = game.make_games(100, 3, random_state)
+        first_players = games['first_players'].copy()
+        lowest_bid_policy = make_bid_then_call_policy(
+            game.get_bid_codes()[0]
+        )
+        losers = game.play_round(games, [lowest_bid_policy] * 3, random_state)
+        self.assertEqual(losers.tolist(), ((first_players + 1) % 3).tolist())
+        self.assertEqual(
+            games['num_cards'].tolist(),
+            [
+                [2 if player == loser else 1 for player in range(3)]
+                for loser in losers
+            ]
+        )
+        self.assertEqual(games['first_players'].tolist(), losers.tolist())
+
+        # the loser is the caller when the bid hand is among all the cards,
+        # and otherwise the bidder
+        own_cards_by_game = defaultdict(list)
+        games = game.make_games(200, 2, random_state, starting_cards=3)
+        first_players = games['first_players'].copy()
+        policy = make_bid_then_call_policy(ONE_PAIR_OF_ACES, own_cards_by_game)
+        losers = game.play_round(games, [policy] * 2, random_state)
+        for game_index, loser in enumerate(losers):
+            cards = own_cards_by_game[game_index]
+            self.assertEqual(len(set(cards)), 6)
+            bid_exists = (
+                poker.get_best_hand_code(cards, poker.twos_are_wild) >=
+                ONE_PAIR_OF_ACES
+            )
+            bidder = first_players[game_index]
+            self.assertEqual(loser, (bidder + 1) % 2 if bid_exists else bidder)
+
+        games = game.make_games(10, 2, random_state)
+        self.assertRaises(
+            ValueError,
+            game.play_round,
+            games,
+            [lambda turn: np.full(len(turn['bids']), game.CALL)] * 2,
+            random_state
+        )
+        self.assertRaises(
+            ValueError,
+            game.play_round,
+            games,
+            [make_bid_then_call_policy(game.TOP_BID_CODE + 1)] * 2,
+            random_state
+        )
+
+    def test_play_games(self):
+        table = survival_table.generate_survival_table(
+            hand_sizes=range(2, 13),
+            num_trials=200,
+            seed=0
+        )
+        policies = [
+            game.make_survival_policy(table, call_threshold=0.5),
+            game.make_survival_policy(table, call_threshold=0.3),
+            game.make_survival_policy(table, call_threshold=0.5),
+        ]
+        games = game.play_games(300, policies, seed=0, max_cards=4)
+        self.assertTrue((games['winners'] >= 0).all())
+        self.assertEqual(
+            (games['num_cards'] > 0).sum(axis=1).tolist(),
+            [1] * 300
+        )
+        self.assertTrue(
+            (games['num_cards'][np.arange(300), games['winners']] > 0).all()
+        )
+        # two players are out, after at least 4 losses each
+        self.assertTrue((games['num_rounds'] >= 8).all())
+
+        same_seed_games = game.play_games(300, policies, seed=0, max_cards=4)
+        self.assertEqual(
+            same_seed_games['winners'].tolist(),
+            games['winners'].tolist()
+        )
+
+        game_stats = game.get_game_stats(games)
+        self.assertEqual(game_stats['num_games'], 300)
+        self.assertEqual(game_stats['num_rounds'], games['num_rounds'].sum())
+        self.assertAlmostEqual(sum(game_stats['win_rates']), 1)
+
+        # poker's engines adjudicate the same, with or without jokers
+        lookup_games = game.play_games(
+            50,
+            policies,
+            seed=0,
+            max_cards=4,
+            engine='lookup'
+        )
+        batch_games = game.play_games(50, policies, seed=0, max_cards=4)
+        self.assertEqual(
+            lookup_games['winners'].tolist(),
+            batch_games['winners'].tolist()
+        )
+        joker_games = [
+            game.play_games(
+                10,
+                policies,
+                seed=0,
+                wild_rule='jokers',
+                engine=engine
+            )
+            for engine in ('batch', 'bitmask')
+        ]
+        self.assertTrue((joker_games[0]['winners'] >= 0).all())
+        self.assertEqual(
+            joker_games[0]['winners'].tolist(),
+            joker_games[1]['winners'].tolist()
+        )
+
+if __name__ == '__main__':
+    unittest.main()
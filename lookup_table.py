@@ -0,0 +1,75 @@
+import array
+
+import numpy as np
+
+import batch
+from poker import (
+    ALL_RANKS_MASK,
+    LOOKUP_TABLE_MAX_WILDS,
+    LOOKUP_TABLE_PATH,
+    NON_SUIT_HAND_TYPES,
+    RANK_COUNTS_TABLE_SIZE,
+    RANKS_PER_SUIT,
+)
+
+
+"""
+Lookup Table Builder
+
+Fill in the lookup table that get_best_hand's lookup engine reads, by running
+the non-suit batch finders over every capped rank count histogram at once, for
+each number of wilds the table covers. With 2 wilds, the histograms are the
+rank masks, with at most 1 of each rank.
+
+Save it with `python lookup_table.py`, which is the only thing that writes it.
+"""
+
+def get_capped_rank_counts(first_key, num_keys):
+    keys = np.arange(first_key, first_key + num_keys)
+    digit_values = 3 ** np.arange(RANKS_PER_SUIT)
+    return ((keys[:, None] // digit_values) % 3).astype(np.int8)
+
+def get_rank_mask_rank_counts(first_key, num_keys):
+    keys = np.arange(first_key, first_key + num_keys)
+    return ((keys[:, None] >> np.arange(RANKS_PER_SUIT)) & 1).astype(np.int8)
+
+def get_lookup_table_hand_codes(rank_counts, num_wilds):
+    hand_type_codes, tie_break_ranks = batch.find_best_hands(
+        None,
+        rank_counts,
+        None,
+        np.full(len(rank_counts), num_wilds, dtype=int),
+        hand_types=NON_SUIT_HAND_TYPES
+    )
+    # with no cards at all there's no hand, which never gets looked up
+    return np.where(
+        hand_type_codes >= 0,
+        batch.get_hand_codes(hand_type_codes, tie_break_ranks),
+        0
+    )
+
+def build_lookup_table(chunk_size=3**10):
+    lookup_table = array.array('H')
+    for num_wilds in range(LOOKUP_TABLE_MAX_WILDS + 1):
+        if num_wilds == 2:
+            table_size = ALL_RANKS_MASK + 1
+            get_rank_counts = get_rank_mask_rank_counts
+        else:
+            table_size = RANK_COUNTS_TABLE_SIZE
+            get_rank_counts = get_capped_rank_counts
+        for first_key in range(0, table_size, chunk_size):
+            num_keys = min(chunk_size, table_size - first_key)
+            hand_codes = get_lookup_table_hand_codes(
+                get_rank_counts(first_key, num_keys),
+                num_wilds
+            )
+            lookup_table.extend(hand_codes.astype(np.uint16).tolist())
+    return lookup_table
+
+def save_lookup_table(lookup_table, path=LOOKUP_TABLE_PATH):
+    with open(path, 'wb') as f:
+        lookup_table.tofile(f)
+
+
+if __name__ == '__main__':
+    save_lookup_table(build_lookup_table())
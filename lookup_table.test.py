@@ -0,0 +1,77 @@
+import lookup_table
+import poker
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+
+class TestLookupTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.lookup_table = lookup_table.build_lookup_table()
+
+    def test_get_best_hand_code_with_lookup_table(self):
+        rand = random.Random(0)
+        for hand_size in range(1, 29):
+            for _ in range(50):
+                cards = rand.sample(range(52), hand_size)
+                for is_wild_func in [
+                    poker.twos_are_wild,
+                    poker.deuces_and_treys_are_wild,
+                ]:
+                    self.assertEqual(
+                        poker.get_best_hand_code_with_lookup_table(
+                            cards,
+                            is_wild_func,
+                            lookup_table=self.lookup_table
+                        ),
+                        poker.get_best_hand_code(
+                            cards,
+                            is_wild_func,
+                            engine='bitmask'
+                        )
+                    )
+
+    def test_every_wild_rule(self):
+        # every number of wilds, from every wild rule's deck, and big hands
+        # with triplets and four of a kinds
+        rand = random.Random(0)
+        for wild_rule in poker.WILD_RULES.values():
+            for hand_size in [3, 5, 8, 12, 20, 28]:
+                for _ in range(30):
+                    cards = rand.sample(wild_rule['deck'], hand_size)
+                    self.assertEqual(
+                        poker.get_best_hand_code_with_lookup_table(
+                            cards,
+                            wild_rule['is_wild_func'],
+                            lookup_table=self.lookup_table
+                        ),
+                        poker.get_best_hand_code(
+                            cards,
+                            wild_rule['is_wild_func'],
+                            engine='bitmask'
+                        )
+                    )
+
+    def test_save_and_load_lookup_table(self):
+        self.assertEqual(len(self.lookup_table), poker.LOOKUP_TABLE_SIZE)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'lookup_table.bin')
+            # without a saved table, it's built, and not saved
+            self.assertEqual(poker.load_lookup_table(path), self.lookup_table)
+            self.assertFalse(os.path.exists(path))
+
+            poker._lookup_tables.pop(path)
+            lookup_table.save_lookup_table(self.lookup_table, path=path)
+            self.assertEqual(poker.load_lookup_table(path), self.lookup_table)
+        finally:
+            poker._lookup_tables.pop(path, None)
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,8 @@
-from collections import Counter, defaultdict
+import array
+from collections import Counter, OrderedDict, defaultdict
+import functools
+import os
+import timeit
 
 import misc_helpers as mh
 
@@ -50,6 +54,8 @@ def rank_repr(rank):
     return FACE_CARD_NAMES.get(rank, rank)
 
 def card_repr(card):
+    if is_joker(card):
+        return 'joker'
     suit = get_card_suit(card)
     suit_display = suit_repr(suit)
     rank = get_card_rank(card)
@@ -62,10 +68,105 @@ def print_card(card):
 
 """
 Wilds
+
+A wild rule decides which cards are wild with an is_wild_func. Since that never
+changes, it's compiled once into a wild_mask, a card mask (see Card Masks) of
+the wild cards, so counting a hand's wilds and taking out its natural cards are
+bit operations instead of a call per card. get_wild_mask keeps the wild_mask's
+of the WILD_MASKS_MAX_SIZE most recently used is_wild_func's, so a program
+that makes new ones, like lambdas, as it goes doesn't pile them up.
+
+Jokers are the cards after 51 (52, 53, ...), which are always wild, and only in
+the deck of a wild rule that adds them.
+
+Represent a wild rule with a dict of its is_wild_func, num_jokers, deck (the
+cards it's played with), and wild_mask. WILD_RULES has them by name.
 """
 
+NUM_CARDS = 52
+MAX_NUM_JOKERS = 2
+
+def is_joker(card):
+    return card >= NUM_CARDS
+
 def twos_are_wild(card):
-    return get_card_rank(card) == 2
+    return is_joker(card) or get_card_rank(card) == 2
+
+def deuces_and_treys_are_wild(card):
+    return is_joker(card) or get_card_rank(card) in (2, 3)
+
+def one_eyed_jacks_are_wild(card):
+    # the jacks of hearts and spades are drawn in profile
+    return is_joker(card) or (
+        get_card_rank(card) == 11 and
+        SUIT_NAMES[get_card_suit(card)] in ('hearts', 'spades')
+    )
+
+WILD_MASKS_MAX_SIZE = 32
+
+# is_wild_func to wild_mask, in order of least recently used
+_wild_masks = OrderedDict()
+
+def get_wild_mask(is_wild_func):
+    wild_mask = _wild_masks.pop(is_wild_func, None)
+    if wild_mask is None:
+        wild_mask = 0
+        for card in range(NUM_CARDS + MAX_NUM_JOKERS):
+            if is_wild_func(card):
+                wild_mask |= 1 << card
+        if len(_wild_masks) >= WILD_MASKS_MAX_SIZE:
+            _wild_masks.popitem(last=False)
+    _wild_masks[is_wild_func] = wild_mask
+    return wild_mask
+
+def make_wild_rule(is_wild_func, num_jokers=0):
+    return {
+        'is_wild_func': is_wild_func,
+        'num_jokers': num_jokers,
+        'deck': range(NUM_CARDS + num_jokers),
+        'wild_mask': get_wild_mask(is_wild_func),
+    }
+
+WILD_RULES = {
+    'none': make_wild_rule(is_joker),
+    'twos': make_wild_rule(twos_are_wild),
+    'deuces_and_treys': make_wild_rule(deuces_and_treys_are_wild),
+    'one_eyed_jacks': make_wild_rule(one_eyed_jacks_are_wild),
+    'jokers': make_wild_rule(is_joker, num_jokers=2),
+}
+
+
+"""
+Decks
+
+Represent a deck with a list of cards, which has each card more than once when
+it's several decks shuffled together, and leaves out the cards of any ranks
+it's stripped of. Any list of cards, from a deck like that, is read as a
+multiset:
+- every copy counts toward its rank, so two decks can have 8 of a rank, and a
+    rank with 5 or more cards fills both groups of a full house
+- every copy counts toward its suit for a flush, so the ace of hearts twice,
+    with the king, queen and 9 of hearts, is a flush to the ace
+- a straight or straight flush takes 5 different ranks, so copies don't add to
+    it, and the 10 of hearts twice with the jack, queen and king of hearts is
+    only a flush
+
+The finders work on any such list. The bitmask and lookup engines use card
+masks, which hold each card once, so they hand cards with a card more than once
+over to the finders, and the hand cache doesn't keep them. hand_exists and hand
+states take a single deck's cards.
+
+Dealing a hand is a random.sample of the deck's list, which picks positions, so
+copies of a card are dealt independently like any other cards.
+"""
+
+def make_deck(wild_rule='twos', num_decks=1, stripped_ranks=()):
+    # each deck brings its own jokers
+    return [
+        card
+        for card in WILD_RULES[wild_rule]['deck']
+        if is_joker(card) or get_card_rank(card) not in stripped_ranks
+    ] * num_decks
 
 
 """
@@ -87,6 +188,9 @@ Order of hand_type's, along with their tie_break_dict parameters:
 - four_of_a_kind { rank: number }
 - straight_flush { top_rank: number }
 
+Each hand_type's tie_break_keys lists its tie_break_dict parameters, most
+important first
+
 Each hand_type's finder takes in a non-empty list of cards and a number of
 wilds, and returns a tuple of (found_hand: boolean, tie_break_dict)
 
@@ -188,19 +292,20 @@ def three_of_a_kind_finder(natural_cards, num_wilds=0):
         rank = max(triplet_ranks)
         return True, { 'rank': rank }
 
-def straight_finder(natural_cards, num_wilds=0):
-    ranks = set(get_card_rank(card) for card in natural_cards)
-
-    straight_top_ranks = []
-    for top_rank in range(14, 4, -1):
-        missing_ranks = set(range(top_rank-4, top_rank+1)) - ranks
-        if len(missing_ranks) <= num_wilds:
-            straight_top_ranks.append(top_rank)
+def straight_finder(natural_cards, num_wilds=0, ace_low=False):
+    # looks up the rank mask in the straight tables below
+    rank_mask = 0
+    for card in natural_cards:
+        rank_mask |= get_rank_bit(get_card_rank(card))
+    top_rank = get_straight_top_rank(
+        rank_mask,
+        num_wilds=num_wilds,
+        ace_low=ace_low
+    )
 
-    if len(straight_top_ranks) == 0:
+    if top_rank is None:
         return False, {}
     else:
-        top_rank = max(straight_top_ranks)
         return True, { 'top_rank': top_rank }
 
 def flush_finder(natural_cards, num_wilds=0):
@@ -231,75 +336,34 @@ def flush_finder(natural_cards, num_wilds=0):
 
 def full_house_finder(natural_cards, num_wilds=0):
     rank_counts = Counter(get_card_rank(card) for card in natural_cards)
-    triplet_rank_counts = defaultdict(int)
-    pair_rank_counts = defaultdict(int)
-    solo_rank_counts = defaultdict(int)
-    for rank, count in rank_counts.items():
-        if count >= 3:
-            triplet_rank_counts[rank] = count / 3
-        if count % 3 == 2:
-            pair_rank_counts[rank] = 1
-        if count % 3 == 1:
-            solo_rank_counts[rank] = 1
 
-    if num_wilds == 0:
-        enough_triplets = len(triplet_rank_counts) >= 1
-        enough_pairs = len(triplet_rank_counts) + len(pair_rank_counts) >= 2
-        if not enough_triplets or not enough_pairs:
-            return False, {}
-        else:
-            triplet_rank = max(triplet_rank_counts.keys())
-            mh.decrementCounter(triplet_rank_counts, triplet_rank, 1)
-            pair_rank = max(
-                triplet_rank_counts.keys() + pair_rank_counts.keys()
-            )
-            return True, {
-                'triplet_rank': triplet_rank,
-                'pair_rank': pair_rank,
-            }
-    # TODO: this recursive technique is the most time consuming part of all the
-    #       hand finders. instead of recursing, directly handle each case of
-    #       num_wilds / rank_counts
-    elif num_wilds == 1 or num_wilds == 2:
-        candidates = [
-            full_house_finder(natural_cards + [card], num_wilds=num_wilds-1)
-            for card in range(13)
-        ]
-        candidate_tie_break_dicts = [
-            tie_break_dict
-            for found_full_house, tie_break_dict in candidates
-            if found_full_house
-        ]
-        if len(candidate_tie_break_dicts) == 0:
-            return False, {}
-        else:
-            best_tie_break_dict = { 'triplet_rank': -1, 'pair_rank': -1 }
-            for tie_break_dict in candidate_tie_break_dicts:
-                better_triplet_rank = (
-                    tie_break_dict['triplet_rank'] >
-                    best_tie_break_dict['triplet_rank']
-                )
-                same_triplet_rank = (
-                    tie_break_dict['triplet_rank'] ==
-                    best_tie_break_dict['triplet_rank']
-                )
-                better_pair_rank = (
-                    tie_break_dict['pair_rank'] >
-                    best_tie_break_dict['pair_rank']
-                )
-                if (
-                    better_triplet_rank or
-                    (same_triplet_rank and better_pair_rank)
-                ):
-                    best_tie_break_dict = tie_break_dict
-            return True, best_tie_break_dict
+    if num_wilds <= 2:
+        # take the highest triplet rank that can be filled in and still have a
+        # pair. wilds go to the triplet first, and any left over go to the pair,
+        # which can be the triplet's own rank if that rank gets to 5 cards
+        for triplet_rank in sorted(rank_counts.keys(), reverse=True):
+            wilds_left = num_wilds - max(0, 3 - rank_counts[triplet_rank])
+            if wilds_left < 0:
+                continue
+            pair_ranks = [
+                rank
+                for rank in range(2, 15)
+                if rank != triplet_rank and rank_counts[rank] + wilds_left >= 2
+            ]
+            if rank_counts[triplet_rank] + wilds_left >= 5:
+                pair_ranks.append(triplet_rank)
+            if len(pair_ranks) >= 1:
+                return True, {
+                    'triplet_rank': triplet_rank,
+                    'pair_rank': max(pair_ranks),
+                }
+        return False, {}
     elif num_wilds == 3:
-        if len(triplet_rank_counts) + len(pair_rank_counts) == 0:
+        pair_ranks = [rank for rank, count in rank_counts.items() if count >= 2]
+        if len(pair_ranks) == 0:
             return False, {}
         else:
-            pair_rank = max(
-                triplet_rank_counts.keys() + pair_rank_counts.keys()
-            )
+            pair_rank = max(pair_ranks)
             return True, { 'triplet_rank': 14, 'pair_rank': pair_rank }
     elif num_wilds == 4:
         if len(natural_cards) == 0:
@@ -342,19 +406,22 @@ def four_of_a_kind_finder(natural_cards, num_wilds=0):
         rank = max(quartet_ranks)
         return True, { 'rank': rank }
 
-def straight_flush_finder(natural_cards, num_wilds=0):
-    cards_by_suit = [
-        [card for card in natural_cards if get_card_suit(card) == suit]
-        for suit in range(4)
-    ]
-    tie_break_dicts = [
-        straight_finder(suit_cards, num_wilds=num_wilds)[1]
-        for suit_cards in cards_by_suit
-    ]
+def straight_flush_finder(natural_cards, num_wilds=0, ace_low=False):
+    # a rank mask for each suit, looked up like straight_finder's
+    suit_masks = [0] * NUM_SUITS
+    for card in natural_cards:
+        suit_masks[get_card_suit(card)] |= get_rank_bit(get_card_rank(card))
     straight_flush_top_ranks = [
-        tie_break_dict['top_rank']
-        for tie_break_dict in tie_break_dicts
-        if 'top_rank' in tie_break_dict
+        top_rank
+        for top_rank in (
+            get_straight_top_rank(
+                suit_mask,
+                num_wilds=num_wilds,
+                ace_low=ace_low
+            )
+            for suit_mask in suit_masks
+        )
+        if top_rank is not None
     ]
     if len(straight_flush_top_ranks) == 0:
         return False, {}
@@ -362,6 +429,445 @@ def straight_flush_finder(natural_cards, num_wilds=0):
         top_rank = max(straight_flush_top_ranks)
         return True, { 'top_rank': top_rank }
 
+"""
+Card Masks
+
+Represent a collection of cards as a 52-bit integer, with bit n set if card n is
+in the collection (and more bits for any jokers). Since the cards of each suit
+are 13 consecutive numbers, shifting the card mask right by 13 * suit gives a
+13-bit rank mask for that suit, with bit (rank - 2) set if the suit has that
+rank.
+
+From the 4 suit masks, build count masks: count_masks[n] is a 13-bit rank mask,
+with bit (rank - 2) set if the rank appears at least n times. count_masks[0]
+has every rank set, and count_masks[5] is there for wild cards to fill in (a
+single deck never has 5 of a rank).
+
+Each hand_type's mask_finder takes in the suit masks and count masks of the
+natural cards and a number of wilds, and returns a tuple of
+(found_hand: boolean, tie_break_ranks), where tie_break_ranks is a tuple of the
+values its finder's tie_break_dict would have, in the order of tie_break_keys.
+It gets them from bit operations instead of rebuilding rank and suit counts.
+"""
+
+NUM_SUITS = 4
+RANKS_PER_SUIT = 13
+ALL_RANKS_MASK = (1 << RANKS_PER_SUIT) - 1
+
+POPCOUNTS = [bin(mask).count('1') for mask in range(ALL_RANKS_MASK + 1)]
+
+def get_cards_mask(cards):
+    cards_mask = 0
+    for card in cards:
+        cards_mask |= 1 << card
+    return cards_mask
+
+def split_wild_cards(cards, is_wild_func):
+    # returns a tuple of (num_wilds, natural_cards_mask), or None if the cards
+    # have a card more than once, which a card mask can't hold
+    wild_mask = get_wild_mask(is_wild_func)
+    cards_mask = get_cards_mask(cards)
+    if bin(cards_mask).count('1') != len(cards):
+        return None
+    return (
+        bin(cards_mask & wild_mask).count('1'),
+        cards_mask & ~wild_mask,
+    )
+
+def get_suit_masks(cards_mask):
+    return [
+        (cards_mask >> (RANKS_PER_SUIT * suit)) & ALL_RANKS_MASK
+        for suit in range(NUM_SUITS)
+    ]
+
+def get_count_masks(suit_masks):
+    clubs, diamonds, hearts, spades = suit_masks
+    return [
+        ALL_RANKS_MASK,
+        clubs | diamonds | hearts | spades,
+        (
+            (clubs & diamonds) |
+            (hearts & spades) |
+            ((clubs | diamonds) & (hearts | spades))
+        ),
+        (
+            (clubs & diamonds & (hearts | spades)) |
+            (hearts & spades & (clubs | diamonds))
+        ),
+        clubs & diamonds & hearts & spades,
+        0,
+    ]
+
+def get_rank_bit(rank):
+    return 1 << (rank - 2)
+
+def get_top_rank(rank_mask):
+    return rank_mask.bit_length() + 1
+
+"""
+Straight Tables
+
+Find the best straight in a 13-bit rank mask with a single lookup, in a table
+of the top_rank of the best straight for every rank mask and number of wilds,
+0 for none, indexed by (num_wilds << 13) | rank_mask. It takes each of
+straight_finder, straight_flush_finder (once per suit mask), and their
+mask_finders. 5 wilds make an ace-high straight on their own, so more count as
+5.
+
+A straight's window is the mask of its ranks. A 5-high straight has a rank 1
+below the 2, which takes a wild, since no card has it. When aces play low, the
+ace is that rank 1, and there's a second table for that rule. Pass
+ace_low=True to get_best_hand, get_best_hand_code or hand_exists, with any
+engine, to play it, or to the straight and straight_flush finders,
+mask_finders and exists_funcs directly.
+
+Hand states, batch.py, exact.py, simulations, the survival table and games
+play aces high only, so the ace-low variant can't be simulated or played in
+games yet.
+"""
+
+# the window of each top_rank a straight can have, highest first
+STRAIGHT_WINDOWS = [
+    (top_rank, ALL_RANKS_MASK & (0b11111 << (top_rank - 6)))
+    if top_rank >= 6 else
+    (top_rank, 0b11111 >> (6 - top_rank))
+    for top_rank in range(14, 4, -1)
+]
+ACE_LOW_STRAIGHT_WINDOWS = STRAIGHT_WINDOWS[:-1] + [
+    (5, STRAIGHT_WINDOWS[-1][1] | get_rank_bit(14)),
+]
+
+STRAIGHT_TABLE_MAX_WILDS = 5
+
+def build_straight_top_rank_table(straight_windows):
+    # going down the windows, each one is the best straight for every number
+    # of wilds from what it needs up to where a higher window already is
+    straight_top_rank_table = [0] * (
+        (STRAIGHT_TABLE_MAX_WILDS + 1) << RANKS_PER_SUIT
+    )
+    for rank_mask in range(ALL_RANKS_MASK + 1):
+        num_wilds = STRAIGHT_TABLE_MAX_WILDS
+        for top_rank, window_mask in straight_windows:
+            wilds_needed = 5 - POPCOUNTS[rank_mask & window_mask]
+            while num_wilds >= wilds_needed:
+                straight_top_rank_table[
+                    (num_wilds << RANKS_PER_SUIT) | rank_mask
+                ] = top_rank
+                num_wilds -= 1
+            if num_wilds < 0:
+                break
+    return straight_top_rank_table
+
+STRAIGHT_TOP_RANK_TABLE = build_straight_top_rank_table(STRAIGHT_WINDOWS)
+ACE_LOW_STRAIGHT_TOP_RANK_TABLE = build_straight_top_rank_table(
+    ACE_LOW_STRAIGHT_WINDOWS
+)
+
+def get_straight_top_rank(rank_mask, num_wilds=0, ace_low=False):
+    # None for no straight
+    if ace_low:
+        straight_top_rank_table = ACE_LOW_STRAIGHT_TOP_RANK_TABLE
+    else:
+        straight_top_rank_table = STRAIGHT_TOP_RANK_TABLE
+    top_rank = straight_top_rank_table[
+        (min(num_wilds, STRAIGHT_TABLE_MAX_WILDS) << RANKS_PER_SUIT) |
+        rank_mask
+    ]
+    return top_rank or None
+
+## MASK FINDERS
+
+def high_card_mask_finder(suit_masks, count_masks, num_wilds=0):
+    if num_wilds == 0:
+        rank = get_top_rank(count_masks[1])
+    elif num_wilds >= 1:
+        rank = 14
+
+    return True, (rank,)
+
+def one_pair_mask_finder(suit_masks, count_masks, num_wilds=0):
+    if num_wilds == 0:
+        pair_mask = count_masks[2]
+    elif num_wilds == 1:
+        pair_mask = count_masks[1]
+    elif num_wilds >= 2:
+        pair_mask = get_rank_bit(14)
+
+    if pair_mask == 0:
+        return False, ()
+    else:
+        return True, (get_top_rank(pair_mask),)
+
+def two_pair_mask_finder(suit_masks, count_masks, num_wilds=0):
+    # pairs of a rank: the first from count_masks[2], a second from
+    # count_masks[4], and a rank with an odd count has a solo card left over
+    first_pair_mask = count_masks[2]
+    second_pair_mask = count_masks[4]
+    solo_mask = (
+        (count_masks[1] & ~count_masks[2]) |
+        (count_masks[3] & ~count_masks[4])
+    )
+    num_pairs = POPCOUNTS[first_pair_mask] + POPCOUNTS[second_pair_mask]
+
+    # same choices for the wilds as in two_pair_finder
+    num_ace_pairs = 0
+    num_wilds_left = num_wilds
+    while num_wilds_left >= 1:
+        if num_pairs >= 1 and num_wilds_left >= 2:
+            num_ace_pairs += 1
+            num_pairs += 1
+            num_wilds_left -= 2
+        elif num_wilds_left >= 4:
+            num_ace_pairs += 2
+            num_pairs += 2
+            num_wilds_left -= 4
+        elif solo_mask != 0:
+            solo_bit = 1 << (solo_mask.bit_length() - 1)
+            solo_mask ^= solo_bit
+            if first_pair_mask & solo_bit:
+                second_pair_mask |= solo_bit
+            else:
+                first_pair_mask |= solo_bit
+            num_pairs += 1
+            num_wilds_left -= 1
+        else:
+            break
+
+    if num_pairs < 2:
+        return False, ()
+    else:
+        pair_ranks = [14] * min(num_ace_pairs, 2)
+        while len(pair_ranks) < 2:
+            pair_bit = 1 << (first_pair_mask.bit_length() - 1)
+            pair_ranks.append(get_top_rank(first_pair_mask))
+            if second_pair_mask & pair_bit:
+                second_pair_mask ^= pair_bit
+            else:
+                first_pair_mask ^= pair_bit
+        return True, tuple(pair_ranks)
+
+def three_of_a_kind_mask_finder(suit_masks, count_masks, num_wilds=0):
+    if num_wilds <= 2:
+        triplet_mask = count_masks[3 - num_wilds]
+    elif num_wilds >= 3:
+        triplet_mask = get_rank_bit(14)
+
+    if triplet_mask == 0:
+        return False, ()
+    else:
+        return True, (get_top_rank(triplet_mask),)
+
+def straight_mask_finder(suit_masks, count_masks, num_wilds=0, ace_low=False):
+    top_rank = get_straight_top_rank(
+        count_masks[1],
+        num_wilds=num_wilds,
+        ace_low=ace_low
+    )
+
+    if top_rank is None:
+        return False, ()
+    else:
+        return True, (top_rank,)
+
+def flush_mask_finder(suit_masks, count_masks, num_wilds=0):
+    wilds_needed = 5 - max(POPCOUNTS[suit_mask] for suit_mask in suit_masks)
+    found_flush = num_wilds >= wilds_needed
+
+    if not found_flush:
+        return False, ()
+    else:
+        if num_wilds == 0:
+            flush_ranks_mask = 0
+            for suit_mask in suit_masks:
+                if POPCOUNTS[suit_mask] >= 5:
+                    flush_ranks_mask |= suit_mask
+            top_rank = get_top_rank(flush_ranks_mask)
+        elif num_wilds >= 1:
+            top_rank = 14
+
+        return True, (top_rank,)
+
+def full_house_mask_finder(suit_masks, count_masks, num_wilds=0):
+    # same as full_house_finder, with the triplet's count capped at 3 since
+    # that's all it needs
+    if num_wilds <= 2:
+        triplet_mask = count_masks[3 - num_wilds]
+        while triplet_mask != 0:
+            triplet_rank = get_top_rank(triplet_mask)
+            triplet_bit = get_rank_bit(triplet_rank)
+            triplet_mask ^= triplet_bit
+            triplet_count = 3
+            while not count_masks[triplet_count] & triplet_bit:
+                triplet_count -= 1
+            wilds_left = num_wilds - (3 - triplet_count)
+            pair_mask = (
+                (count_masks[2 - wilds_left] & ~triplet_bit) |
+                (count_masks[5 - wilds_left] & triplet_bit)
+            )
+            if pair_mask != 0:
+                return True, (triplet_rank, get_top_rank(pair_mask))
+        return False, ()
+    elif num_wilds == 3:
+        if count_masks[2] == 0:
+            return False, ()
+        else:
+            pair_rank = get_top_rank(count_masks[2])
+            return True, (14, pair_rank)
+    elif num_wilds == 4:
+        if count_masks[1] == 0:
+            return False, ()
+        else:
+            pair_rank = get_top_rank(count_masks[1])
+            return True, (14, pair_rank)
+    elif num_wilds >= 5:
+        return True, (14, 14)
+
+def four_of_a_kind_mask_finder(suit_masks, count_masks, num_wilds=0):
+    if num_wilds <= 3:
+        quartet_mask = count_masks[4 - num_wilds]
+    elif num_wilds >= 4:
+        quartet_mask = get_rank_bit(14)
+
+    if quartet_mask == 0:
+        return False, ()
+    else:
+        return True, (get_top_rank(quartet_mask),)
+
+def straight_flush_mask_finder(
+    suit_masks,
+    count_masks,
+    num_wilds=0,
+    ace_low=False
+):
+    straight_flush_top_ranks = [
+        top_rank
+        for top_rank in (
+            get_straight_top_rank(
+                suit_mask,
+                num_wilds=num_wilds,
+                ace_low=ace_low
+            )
+            for suit_mask in suit_masks
+        )
+        if top_rank is not None
+    ]
+    if len(straight_flush_top_ranks) == 0:
+        return False, ()
+    else:
+        top_rank = max(straight_flush_top_ranks)
+        return True, (top_rank,)
+
+## EXISTS FUNCS
+
+"""
+Each hand_type's exists_func takes in the suit masks of the natural cards, the
+tie_break_ranks of a specific hand of that hand_type, and a number of wilds,
+and returns whether the cards have that exact hand, with each wild standing in
+for whichever card it's missing. This is the question a BS call asks, and it
+needs only the few ranks or suits the hand is made of, not the best hand.
+
+As in the finders, a rank can be used for two groups of the same hand if it has
+enough cards for both (a two pair of 9s and 9s takes four 9s), and a 5-high
+straight needs a wild for its rank 1.
+"""
+
+STRAIGHT_WINDOW_MASKS = dict(STRAIGHT_WINDOWS)
+ACE_LOW_STRAIGHT_WINDOW_MASKS = dict(ACE_LOW_STRAIGHT_WINDOWS)
+
+def get_straight_window_mask(top_rank, ace_low=False):
+    if ace_low:
+        return ACE_LOW_STRAIGHT_WINDOW_MASKS.get(top_rank)
+    return STRAIGHT_WINDOW_MASKS.get(top_rank)
+
+def get_rank_count(suit_masks, rank):
+    rank_bit = get_rank_bit(rank)
+    return sum(1 for suit_mask in suit_masks if suit_mask & rank_bit)
+
+def get_wilds_needed(suit_masks, ranks_needed):
+    # the wilds it takes to fill out each (rank, count) of ranks_needed, with a
+    # rank's counts added together if it appears more than once
+    counts_needed = Counter()
+    for rank, count in ranks_needed:
+        counts_needed[rank] += count
+    return sum(
+        max(0, count - get_rank_count(suit_masks, rank))
+        for rank, count in counts_needed.items()
+    )
+
+def high_card_exists_func(suit_masks, tie_break_ranks, num_wilds=0):
+    rank, = tie_break_ranks
+    return get_wilds_needed(suit_masks, [(rank, 1)]) <= num_wilds
+
+def one_pair_exists_func(suit_masks, tie_break_ranks, num_wilds=0):
+    rank, = tie_break_ranks
+    return get_wilds_needed(suit_masks, [(rank, 2)]) <= num_wilds
+
+def two_pair_exists_func(suit_masks, tie_break_ranks, num_wilds=0):
+    high_rank, low_rank = tie_break_ranks
+    return (
+        get_wilds_needed(suit_masks, [(high_rank, 2), (low_rank, 2)]) <=
+        num_wilds
+    )
+
+def three_of_a_kind_exists_func(suit_masks, tie_break_ranks, num_wilds=0):
+    rank, = tie_break_ranks
+    return get_wilds_needed(suit_masks, [(rank, 3)]) <= num_wilds
+
+def straight_exists_func(
+    suit_masks,
+    tie_break_ranks,
+    num_wilds=0,
+    ace_low=False
+):
+    top_rank, = tie_break_ranks
+    window_mask = get_straight_window_mask(top_rank, ace_low=ace_low)
+    if window_mask is None:
+        return False
+    ranks_mask = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+    return 5 - POPCOUNTS[ranks_mask & window_mask] <= num_wilds
+
+def flush_exists_func(suit_masks, tie_break_ranks, num_wilds=0):
+    # the top rank, and 4 more cards of the suit below it
+    top_rank, = tie_break_ranks
+    if top_rank < 6:
+        return False
+    top_rank_bit = get_rank_bit(top_rank)
+    lower_ranks_mask = top_rank_bit - 1
+    for suit_mask in suit_masks:
+        wilds_needed = (
+            (0 if suit_mask & top_rank_bit else 1) +
+            max(0, 4 - POPCOUNTS[suit_mask & lower_ranks_mask])
+        )
+        if wilds_needed <= num_wilds:
+            return True
+    return False
+
+def full_house_exists_func(suit_masks, tie_break_ranks, num_wilds=0):
+    triplet_rank, pair_rank = tie_break_ranks
+    return (
+        get_wilds_needed(suit_masks, [(triplet_rank, 3), (pair_rank, 2)]) <=
+        num_wilds
+    )
+
+def four_of_a_kind_exists_func(suit_masks, tie_break_ranks, num_wilds=0):
+    rank, = tie_break_ranks
+    return get_wilds_needed(suit_masks, [(rank, 4)]) <= num_wilds
+
+def straight_flush_exists_func(
+    suit_masks,
+    tie_break_ranks,
+    num_wilds=0,
+    ace_low=False
+):
+    top_rank, = tie_break_ranks
+    window_mask = get_straight_window_mask(top_rank, ace_low=ace_low)
+    if window_mask is None:
+        return False
+    return any(
+        5 - POPCOUNTS[suit_mask & window_mask] <= num_wilds
+        for suit_mask in suit_masks
+    )
+
 ## SORTKEY FUNCS
 
 NUM_RANKS = 14.0
@@ -422,55 +928,127 @@ def straight_flush_sortkey_func(tie_break_dict):
 HAND_TYPES = [
     {
         'hand_type': 'high_card',
+        'tie_break_keys': ['rank'],
         'finder': high_card_finder,
+        'mask_finder': high_card_mask_finder,
+        'exists_func': high_card_exists_func,
         'sortkey_func': high_card_sortkey_func,
     },
     {
         'hand_type': 'one_pair',
+        'tie_break_keys': ['rank'],
         'finder': one_pair_finder,
+        'mask_finder': one_pair_mask_finder,
+        'exists_func': one_pair_exists_func,
         'sortkey_func': one_pair_sortkey_func,
     },
     {
         'hand_type': 'two_pair',
+        'tie_break_keys': ['high_rank', 'low_rank'],
         'finder': two_pair_finder,
+        'mask_finder': two_pair_mask_finder,
+        'exists_func': two_pair_exists_func,
         'sortkey_func': two_pair_sortkey_func,
     },
     {
         'hand_type': 'three_of_a_kind',
+        'tie_break_keys': ['rank'],
         'finder': three_of_a_kind_finder,
+        'mask_finder': three_of_a_kind_mask_finder,
+        'exists_func': three_of_a_kind_exists_func,
         'sortkey_func': three_of_a_kind_sortkey_func,
     },
     {
         'hand_type': 'straight',
+        'tie_break_keys': ['top_rank'],
         'finder': straight_finder,
+        'mask_finder': straight_mask_finder,
+        'exists_func': straight_exists_func,
         'sortkey_func': straight_sortkey_func,
     },
     {
         'hand_type': 'flush',
+        'tie_break_keys': ['top_rank'],
         'finder': flush_finder,
+        'mask_finder': flush_mask_finder,
+        'exists_func': flush_exists_func,
         'sortkey_func': flush_sortkey_func,
     },
     {
         'hand_type': 'full_house',
+        'tie_break_keys': ['triplet_rank', 'pair_rank'],
         'finder': full_house_finder,
+        'mask_finder': full_house_mask_finder,
+        'exists_func': full_house_exists_func,
         'sortkey_func': full_house_sortkey_func,
     },
     {
         'hand_type': 'four_of_a_kind',
+        'tie_break_keys': ['rank'],
         'finder': four_of_a_kind_finder,
+        'mask_finder': four_of_a_kind_mask_finder,
+        'exists_func': four_of_a_kind_exists_func,
         'sortkey_func': four_of_a_kind_sortkey_func,
     },
     {
         'hand_type': 'straight_flush',
+        'tie_break_keys': ['top_rank'],
         'finder': straight_flush_finder,
+        'mask_finder': straight_flush_mask_finder,
+        'exists_func': straight_flush_exists_func,
         'sortkey_func': straight_flush_sortkey_func,
     },
 ]
 
-def get_best_hand(cards, is_wild_func):
-    num_wilds = sum(1 for card in cards if is_wild_func(card))
-    natural_cards = [card for card in cards if not is_wild_func(card)]
-    for hand_type_obj in HAND_TYPES[::-1]:
+def make_ace_low_hand_type_obj(hand_type_obj):
+    # the same hand_type, with ace_low=True for its finders. they're looked up
+    # in hand_type_obj on each call, so that a finder profile sees them
+    ace_low_hand_type_obj = dict(hand_type_obj)
+    ace_low_hand_type_obj['finder'] = (
+        lambda natural_cards, num_wilds=0: hand_type_obj['finder'](
+            natural_cards,
+            num_wilds=num_wilds,
+            ace_low=True
+        )
+    )
+    ace_low_hand_type_obj['mask_finder'] = (
+        lambda suit_masks, count_masks, num_wilds=0: (
+            hand_type_obj['mask_finder'](
+                suit_masks,
+                count_masks,
+                num_wilds=num_wilds,
+                ace_low=True
+            )
+        )
+    )
+    ace_low_hand_type_obj['exists_func'] = (
+        lambda suit_masks, tie_break_ranks, num_wilds=0: (
+            hand_type_obj['exists_func'](
+                suit_masks,
+                tie_break_ranks,
+                num_wilds=num_wilds,
+                ace_low=True
+            )
+        )
+    )
+    return ace_low_hand_type_obj
+
+# HAND_TYPES for the rule where aces play low
+ACE_LOW_HAND_TYPES = [
+    make_ace_low_hand_type_obj(hand_type_obj)
+    if hand_type_obj['hand_type'] in ('straight', 'straight_flush') else
+    hand_type_obj
+    for hand_type_obj in HAND_TYPES
+]
+
+def get_hand_types(ace_low=False):
+    return ACE_LOW_HAND_TYPES if ace_low else HAND_TYPES
+
+def get_best_hand_with_finders(cards, is_wild_func, ace_low=False):
+    wild_mask = get_wild_mask(is_wild_func)
+    natural_cards = [card for card in cards if not (wild_mask >> card) & 1]
+    num_wilds = len(cards) - len(natural_cards)
+    for hand_type_obj in get_hand_types(ace_low)[::-1]:
         hand_type = hand_type_obj['hand_type']
         hand_type_finder = hand_type_obj['finder']
         found_hand, tie_break_dict = hand_type_finder(
@@ -478,7 +1056,725 @@ def get_best_hand(cards, is_wild_func):
             num_wilds=num_wilds
         )
         if found_hand:
-            return hand_type, tie_break_dict
+            return get_hand_from_code(get_hand_code(hand_type, tie_break_dict))
+
+"""
+Hand Codes
+
+Represent a poker hand with an integer hand_code, with the index of its
+hand_type in HAND_TYPES in the high bits, and the ranks of its tie_break_dict,
+in the order of tie_break_keys, 4 bits each below (0 for a hand_type with only
+one). For example, a full house of 9s over 4s is 0x694.
+
+Comparing two hand_code's compares the poker hands, and a hand_code can be used
+directly as a dict key or an index
+"""
+
+HAND_TYPE_INDEXES = dict(
+    (hand_type_obj['hand_type'], hand_type_index)
+    for hand_type_index, hand_type_obj in enumerate(HAND_TYPES)
+)
+
+NUM_HAND_CODES = len(HAND_TYPES) << 8
+
+def _get_hand_code_from_ranks(hand_type_index, tie_break_ranks):
+    hand_code = hand_type_index
+    for rank in tie_break_ranks:
+        hand_code = (hand_code << 4) | rank
+    if len(tie_break_ranks) == 1:
+        hand_code <<= 4
+    return hand_code
+
+def get_hand_code(hand_type, tie_break_dict):
+    hand_type_index = HAND_TYPE_INDEXES[hand_type]
+    tie_break_keys = HAND_TYPES[hand_type_index]['tie_break_keys']
+    return _get_hand_code_from_ranks(
+        hand_type_index,
+        [tie_break_dict[key] for key in tie_break_keys]
+    )
+
+"""
+Hands
+
+Represent a best hand with a Hand, an immutable value holding only its
+hand_code. There's one Hand per hand_code, made the first time it's needed and
+kept in HANDS, so a list of best hands is a list of references to at most a
+few hundred objects. Hands compare and hash by their hand_code, so they sort
+without get_hand_sortkey and count directly as dict keys.
+
+A Hand still works as the (hand_type, tie_break_dict) tuple it replaces: it
+unpacks into and indexes as those two values, compares equal to that tuple, and
+prints as it. Its tie_break_dict is a new dict every time it's asked for, so
+changing it can't change the Hand.
+"""
+
+@functools.total_ordering
+class Hand(object):
+    __slots__ = ('hand_code',)
+
+    def __init__(self, hand_code):
+        object.__setattr__(self, 'hand_code', hand_code)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Hand is immutable')
+
+    def __reduce__(self):
+        return get_hand_from_code, (self.hand_code,)
+
+    @property
+    def hand_type(self):
+        return HAND_TYPES[self.hand_code >> 8]['hand_type']
+
+    @property
+    def tie_break_dict(self):
+        tie_break_keys = HAND_TYPES[self.hand_code >> 8]['tie_break_keys']
+        tie_break_ranks = [(self.hand_code >> 4) & 0xF, self.hand_code & 0xF]
+        return dict(zip(tie_break_keys, tie_break_ranks))
+
+    def __iter__(self):
+        yield self.hand_type
+        yield self.tie_break_dict
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Hand):
+            return self.hand_code == other.hand_code
+        if isinstance(other, tuple):
+            return tuple(self) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        is_equal = self.__eq__(other)
+        return is_equal if is_equal is NotImplemented else not is_equal
+
+    def __lt__(self, other):
+        if isinstance(other, Hand):
+            return self.hand_code < other.hand_code
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.hand_code)
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+HANDS = [None] * NUM_HAND_CODES
+
+def get_hand_from_code(hand_code):
+    hand = HANDS[hand_code]
+    if hand is None:
+        hand = Hand(hand_code)
+        HANDS[hand_code] = hand
+    return hand
+
+def get_best_hand_code_with_finders(cards, is_wild_func, ace_low=False):
+    return get_best_hand_with_finders(
+        cards,
+        is_wild_func,
+        ace_low=ace_low
+    ).hand_code
+
+def get_best_hand_code_with_mask_finders(cards, is_wild_func, ace_low=False):
+    split_cards = split_wild_cards(cards, is_wild_func)
+    if split_cards is None:
+        return get_best_hand_code_with_finders(
+            cards,
+            is_wild_func,
+            ace_low=ace_low
+        )
+    num_wilds, natural_cards_mask = split_cards
+    suit_masks = get_suit_masks(natural_cards_mask)
+    count_masks = get_count_masks(suit_masks)
+    return get_best_hand_code_from_masks(
+        suit_masks,
+        count_masks,
+        num_wilds,
+        ace_low=ace_low
+    )
+
+def get_best_hand_code_from_masks(
+    suit_masks,
+    count_masks,
+    num_wilds,
+    ace_low=False
+):
+    hand_types = get_hand_types(ace_low)
+    for hand_type_index in range(len(hand_types) - 1, -1, -1):
+        hand_type_mask_finder = hand_types[hand_type_index]['mask_finder']
+        found_hand, tie_break_ranks = hand_type_mask_finder(
+            suit_masks,
+            count_masks,
+            num_wilds=num_wilds
+        )
+        if found_hand:
+            return _get_hand_code_from_ranks(hand_type_index, tie_break_ranks)
+
+def get_best_hand_with_mask_finders(cards, is_wild_func, ace_low=False):
+    return get_hand_from_code(
+        get_best_hand_code_with_mask_finders(
+            cards,
+            is_wild_func,
+            ace_low=ace_low
+        )
+    )
+
+"""
+Lookup Table
+
+Precompute the best non-suit hand (any hand_type but flush and straight_flush)
+as a hand_code, so that every hand needs at most a single lookup for it, and
+layer the flush and straight_flush on top from the suit masks, for hands with
+a suit that has enough cards for one.
+
+A table keyed by the full rank counts would have 5^13 entries, too many to
+build or load, but most of them are settled by a few bit operations instead:
+- a rank with at least 4 cards, counting the wilds, is a four of a kind
+- 3 or more wilds with no four of a kind have no natural cards
+- a natural triplet without wilds is a full house, a straight, or a three of a
+    kind
+so the table only needs hands with at most 2 wilds, fewer than 4 - num_wilds
+of each natural rank, and no natural triplet. With 0 or 1 wilds, it's keyed by
+the rank counts as a 13-digit base-3 number, which is the sum of
+RANK_MASK_BASE_3_VALUES for count_masks[1] and count_masks[2], and with 2 wilds
+by count_masks[1] alone, each part starting at its LOOKUP_TABLE_OFFSETS.
+
+Build it and save it to LOOKUP_TABLE_PATH with lookup_table.py, which needs
+numpy. Until then, the lookup engine builds it in memory each time it starts,
+which takes a few seconds. The file name has LOOKUP_TABLE_VERSION in it, which
+goes up whenever its layout changes, so that a table saved before then is
+never read as the new one.
+"""
+
+LOOKUP_TABLE_VERSION = 2
+LOOKUP_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'lookup_table_v{}.bin'.format(LOOKUP_TABLE_VERSION)
+)
+LOOKUP_TABLE_MAX_WILDS = 2
+RANK_COUNTS_TABLE_SIZE = 3 ** RANKS_PER_SUIT
+LOOKUP_TABLE_OFFSETS = [0, RANK_COUNTS_TABLE_SIZE, 2 * RANK_COUNTS_TABLE_SIZE]
+LOOKUP_TABLE_SIZE = 2 * RANK_COUNTS_TABLE_SIZE + ALL_RANKS_MASK + 1
+
+NON_SUIT_HAND_TYPES = [
+    hand_type_obj['hand_type']
+    for hand_type_obj in HAND_TYPES
+    if hand_type_obj['hand_type'] not in ('flush', 'straight_flush')
+]
+
+RANK_MASK_BASE_3_VALUES = [0] * (ALL_RANKS_MASK + 1)
+for rank_mask in range(1, ALL_RANKS_MASK + 1):
+    low_bit = rank_mask & -rank_mask
+    RANK_MASK_BASE_3_VALUES[rank_mask] = (
+        RANK_MASK_BASE_3_VALUES[rank_mask ^ low_bit] +
+        3 ** (low_bit.bit_length() - 1)
+    )
+
+_lookup_tables = {}
+
+def load_lookup_table(path=LOOKUP_TABLE_PATH):
+    if path not in _lookup_tables:
+        if os.path.exists(path):
+            table = array.array('H')
+            with open(path, 'rb') as f:
+                table.fromfile(f, LOOKUP_TABLE_SIZE)
+        else:
+            import lookup_table
+            table = lookup_table.build_lookup_table()
+        _lookup_tables[path] = table
+    return _lookup_tables[path]
+
+def _find_hand_code(
+    hand_types,
+    hand_type,
+    suit_masks,
+    count_masks,
+    num_wilds
+):
+    # the hand_code of the best hand of hand_type, or None. the mask_finders
+    # are looked up in hand_types, so that a finder profile sees them
+    hand_type_index = HAND_TYPE_INDEXES[hand_type]
+    found_hand, tie_break_ranks = hand_types[hand_type_index]['mask_finder'](
+        suit_masks,
+        count_masks,
+        num_wilds=num_wilds
+    )
+    if found_hand:
+        return _get_hand_code_from_ranks(hand_type_index, tie_break_ranks)
+    return None
+
+def get_best_hand_code_with_lookup_table(
+    cards,
+    is_wild_func,
+    lookup_table=None,
+    ace_low=False
+):
+    if lookup_table is None:
+        lookup_table = load_lookup_table()
+
+    split_cards = split_wild_cards(cards, is_wild_func)
+    if split_cards is None:
+        return get_best_hand_code_with_finders(
+            cards,
+            is_wild_func,
+            ace_low=ace_low
+        )
+    num_wilds, natural_cards_mask = split_cards
+    suit_masks = get_suit_masks(natural_cards_mask)
+    count_masks = get_count_masks(suit_masks)
+    hand_types = get_hand_types(ace_low)
+
+    clubs, diamonds, hearts, spades = suit_masks
+    has_flush_suit = num_wilds + max(
+        POPCOUNTS[clubs],
+        POPCOUNTS[diamonds],
+        POPCOUNTS[hearts],
+        POPCOUNTS[spades]
+    ) >= 5
+    if has_flush_suit:
+        hand_code = _find_hand_code(
+            hand_types,
+            'straight_flush',
+            suit_masks,
+            count_masks,
+            num_wilds
+        )
+        if hand_code is not None:
+            return hand_code
+
+    hand_code = _find_hand_code(
+        hand_types,
+        'four_of_a_kind',
+        suit_masks,
+        count_masks,
+        num_wilds
+    )
+    if hand_code is not None:
+        return hand_code
+
+    if num_wilds > LOOKUP_TABLE_MAX_WILDS or count_masks[3]:
+        for hand_type in ['full_house', 'straight', 'three_of_a_kind']:
+            hand_code = _find_hand_code(
+                hand_types,
+                hand_type,
+                suit_masks,
+                count_masks,
+                num_wilds
+            )
+            if hand_code is not None:
+                break
+    else:
+        if num_wilds == 2:
+            table_key = count_masks[1]
+        else:
+            table_key = (
+                RANK_MASK_BASE_3_VALUES[count_masks[1]] +
+                RANK_MASK_BASE_3_VALUES[count_masks[2]]
+            )
+        hand_code = lookup_table[LOOKUP_TABLE_OFFSETS[num_wilds] + table_key]
+        # the table plays aces high, and aces low only add 5-high straights,
+        # which matter only when there's no straight or better already
+        if ace_low and hand_code >> 8 < HAND_TYPE_INDEXES['straight']:
+            hand_code = _find_hand_code(
+                hand_types,
+                'straight',
+                suit_masks,
+                count_masks,
+                num_wilds
+            ) or hand_code
+
+    if has_flush_suit and hand_code >> 8 < HAND_TYPE_INDEXES['flush']:
+        hand_code = _find_hand_code(
+            hand_types,
+            'flush',
+            suit_masks,
+            count_masks,
+            num_wilds
+        ) or hand_code
+
+    return hand_code
+
+def get_best_hand_with_lookup_table(cards, is_wild_func, ace_low=False):
+    return get_hand_from_code(
+        get_best_hand_code_with_lookup_table(
+            cards,
+            is_wild_func,
+            ace_low=ace_low
+        )
+    )
+
+"""
+Engines
+
+Each engine has a best_hand_func, which takes in a list of cards and an
+is_wild_func and returns the best poker hand as a Hand, and a
+best_hand_code_func, which returns it as a hand_code instead. Both take
+ace_low=True to play aces low too. They all give the same answer, and differ
+only in how fast they get there.
+
+- finders: run each hand_type's finder on the list of natural cards
+- bitmask: summarize the natural cards as card masks in a single pass, then run
+    each hand_type's mask_finder on the masks, building the hand_code directly
+- lookup: summarize the natural cards as card masks, then look up the best
+    non-suit hand in the lookup table and check the suit masks for flushes
+"""
+
+ENGINES = {
+    'finders': {
+        'best_hand_func': get_best_hand_with_finders,
+        'best_hand_code_func': get_best_hand_code_with_finders,
+    },
+    'bitmask': {
+        'best_hand_func': get_best_hand_with_mask_finders,
+        'best_hand_code_func': get_best_hand_code_with_mask_finders,
+    },
+    'lookup': {
+        'best_hand_func': get_best_hand_with_lookup_table,
+        'best_hand_code_func': get_best_hand_code_with_lookup_table,
+    },
+}
+
+"""
+Hand Cache
+
+Remember best hands by a signature of the cards that only keeps what decides
+the best hand: the is_wild_func, whether aces play low, the number of wilds,
+and each suit's mask of natural ranks, sorted so that the order of the cards
+and which suit is which don't matter. Hands with the same signature have the
+same best hand, so a hit skips the engine entirely.
+
+Represent a hand cache with a dict of its max_size, an OrderedDict of signature
+to hand_code in order of least recently used, and counters for its hits, misses
+and evictions. Pass one to get_best_hand or get_best_hand_code to use it.
+"""
+
+HAND_CACHE_MAX_SIZE = 100000
+
+def make_hand_cache(max_size=HAND_CACHE_MAX_SIZE):
+    return {
+        'max_size': max_size,
+        'hand_codes': OrderedDict(),
+        'num_hits': 0,
+        'num_misses': 0,
+        'num_evictions': 0,
+    }
+
+def get_hand_signature(cards, is_wild_func, ace_low=False):
+    # None for cards from several decks with a card more than once, which
+    # aren't cached
+    split_cards = split_wild_cards(cards, is_wild_func)
+    if split_cards is None:
+        return None
+    num_wilds, natural_cards_mask = split_cards
+    return (
+        is_wild_func,
+        ace_low,
+        num_wilds,
+        tuple(sorted(get_suit_masks(natural_cards_mask))),
+    )
+
+def get_cached_best_hand_code(
+    cards,
+    is_wild_func,
+    engine,
+    hand_cache,
+    ace_low=False
+):
+    hand_codes = hand_cache['hand_codes']
+    best_hand_code_func = ENGINES[engine]['best_hand_code_func']
+    signature = get_hand_signature(cards, is_wild_func, ace_low=ace_low)
+    if signature is None:
+        hand_cache['num_misses'] += 1
+        return best_hand_code_func(cards, is_wild_func, ace_low=ace_low)
+    hand_code = hand_codes.pop(signature, None)
+    if hand_code is None:
+        hand_cache['num_misses'] += 1
+        hand_code = best_hand_code_func(cards, is_wild_func, ace_low=ace_low)
+        if len(hand_codes) >= hand_cache['max_size']:
+            hand_codes.popitem(last=False)
+            hand_cache['num_evictions'] += 1
+    else:
+        hand_cache['num_hits'] += 1
+    hand_codes[signature] = hand_code
+    return hand_code
+
+def get_hand_cache_stats(hand_cache):
+    num_lookups = hand_cache['num_hits'] + hand_cache['num_misses']
+    return {
+        'size': len(hand_cache['hand_codes']),
+        'max_size': hand_cache['max_size'],
+        'num_hits': hand_cache['num_hits'],
+        'num_misses': hand_cache['num_misses'],
+        'num_evictions': hand_cache['num_evictions'],
+        'hit_rate': (
+            float(hand_cache['num_hits']) / num_lookups
+            if num_lookups else 0.0
+        ),
+    }
+
+"""
+Finder Profiles
+
+Count how often each hand_type's finder and mask_finder gets called, how often
+it finds its hand, and how long it takes, by hand size and number of wilds, to
+see where the time in get_best_hand goes and how far down the top-down scan
+hands get.
+
+Represent a finder profile with a dict of stats, keyed by a tuple of
+(finder_key, hand_type, hand_size, num_wilds), where finder_key is 'finder' or
+'mask_finder', each a list of [num_calls, num_hits, seconds], and the original
+(finder, mask_finder) of each hand_type while it's running.
+
+start_finder_profile swaps every finder in HAND_TYPES for one that records its
+calls, and stop_finder_profile puts the originals back, so there's no cost at
+all when no profile is running. Only one runs at a time, and it only sees calls
+in its own process.
+"""
+
+_running_finder_profiles = []
+
+def make_finder_profile():
+    return {
+        'stats': defaultdict(lambda: [0, 0, 0.0]),
+        'original_finders': None,
+    }
+
+def _record_finder_call(stats, stats_key, found_hand, seconds):
+    finder_stats = stats[stats_key]
+    finder_stats[0] += 1
+    finder_stats[1] += bool(found_hand)
+    finder_stats[2] += seconds
+
+def _profile_finder(finder_profile, hand_type, finder):
+    stats = finder_profile['stats']
+    timer = timeit.default_timer
+
+    def profiled_finder(natural_cards, num_wilds=0, **kwargs):
+        # passes on any other options of the finder, like ace_low
+        start = timer()
+        found_hand, tie_break_dict = finder(
+            natural_cards,
+            num_wilds=num_wilds,
+            **kwargs
+        )
+        seconds = timer() - start
+        hand_size = len(natural_cards) + num_wilds
+        stats_key = ('finder', hand_type, hand_size, num_wilds)
+        _record_finder_call(stats, stats_key, found_hand, seconds)
+        return found_hand, tie_break_dict
+
+    return profiled_finder
+
+def _profile_mask_finder(finder_profile, hand_type, mask_finder):
+    stats = finder_profile['stats']
+    timer = timeit.default_timer
+
+    def profiled_mask_finder(suit_masks, count_masks, num_wilds=0, **kwargs):
+        start = timer()
+        found_hand, tie_break_ranks = mask_finder(
+            suit_masks,
+            count_masks,
+            num_wilds=num_wilds,
+            **kwargs
+        )
+        seconds = timer() - start
+        hand_size = sum(POPCOUNTS[suit_mask] for suit_mask in suit_masks)
+        hand_size += num_wilds
+        stats_key = ('mask_finder', hand_type, hand_size, num_wilds)
+        _record_finder_call(stats, stats_key, found_hand, seconds)
+        return found_hand, tie_break_ranks
+
+    return profiled_mask_finder
+
+def start_finder_profile(finder_profile):
+    if _running_finder_profiles:
+        raise ValueError('a finder profile is already running')
+    _running_finder_profiles.append(finder_profile)
+    finder_profile['original_finders'] = [
+        (hand_type_obj['finder'], hand_type_obj['mask_finder'])
+        for hand_type_obj in HAND_TYPES
+    ]
+    for hand_type_obj in HAND_TYPES:
+        hand_type = hand_type_obj['hand_type']
+        hand_type_obj['finder'] = _profile_finder(
+            finder_profile,
+            hand_type,
+            hand_type_obj['finder']
+        )
+        hand_type_obj['mask_finder'] = _profile_mask_finder(
+            finder_profile,
+            hand_type,
+            hand_type_obj['mask_finder']
+        )
+
+def stop_finder_profile(finder_profile):
+    if finder_profile not in _running_finder_profiles:
+        raise ValueError('the finder profile is not running')
+    _running_finder_profiles.remove(finder_profile)
+    for hand_type_obj, (finder, mask_finder) in zip(
+        HAND_TYPES,
+        finder_profile['original_finders']
+    ):
+        hand_type_obj['finder'] = finder
+        hand_type_obj['mask_finder'] = mask_finder
+    finder_profile['original_finders'] = None
+
+def get_finder_profile_report(finder_profile):
+    # a list of a dict for each finder, hand size and number of wilds, with
+    # the most total seconds first
+    report = []
+    for (finder_key, hand_type, hand_size, num_wilds), (
+        num_calls,
+        num_hits,
+        seconds
+    ) in finder_profile['stats'].items():
+        report.append({
+            'finder_key': finder_key,
+            'hand_type': hand_type,
+            'hand_size': hand_size,
+            'num_wilds': num_wilds,
+            'num_calls': num_calls,
+            'num_hits': num_hits,
+            'hit_rate': float(num_hits) / num_calls,
+            'seconds': seconds,
+            'seconds_per_call': seconds / num_calls,
+        })
+    report.sort(key=lambda row: row['seconds'], reverse=True)
+    return report
+
+"""
+Hand States
+
+Keep the card masks of a hand that changes one card at a time, so that adding
+or removing a card updates them directly instead of rebuilding them from the
+whole list of cards. A rank's count moves it between neighboring count masks,
+so each update touches one suit mask and one or two count masks. The best hand
+is run through the mask finders only when it's asked for after a change.
+
+Represent a hand state with a dict of its wild_mask, cards_mask (every card,
+natural or wild), suit_masks, rank_counts (indexed by rank), count_masks,
+num_wilds, and the hand_code of its best hand (None until it's asked for).
+"""
+
+def make_hand_state(is_wild_func, cards=()):
+    hand_state = {
+        'wild_mask': get_wild_mask(is_wild_func),
+        'cards_mask': 0,
+        'suit_masks': [0] * NUM_SUITS,
+        'rank_counts': [0] * 15,
+        'count_masks': [ALL_RANKS_MASK, 0, 0, 0, 0, 0],
+        'num_wilds': 0,
+        'hand_code': None,
+    }
+    for card in cards:
+        add_card(hand_state, card)
+    return hand_state
+
+def add_card(hand_state, card):
+    card_bit = 1 << card
+    if hand_state['cards_mask'] & card_bit:
+        raise ValueError('card {} is already in the hand'.format(card))
+    hand_state['cards_mask'] |= card_bit
+    hand_state['hand_code'] = None
+
+    if card_bit & hand_state['wild_mask']:
+        hand_state['num_wilds'] += 1
+    else:
+        rank = get_card_rank(card)
+        rank_bit = get_rank_bit(rank)
+        hand_state['suit_masks'][get_card_suit(card)] |= rank_bit
+        rank_counts = hand_state['rank_counts']
+        rank_counts[rank] += 1
+        hand_state['count_masks'][rank_counts[rank]] |= rank_bit
+
+def remove_card(hand_state, card):
+    card_bit = 1 << card
+    if not hand_state['cards_mask'] & card_bit:
+        raise ValueError('card {} is not in the hand'.format(card))
+    hand_state['cards_mask'] ^= card_bit
+    hand_state['hand_code'] = None
+
+    if card_bit & hand_state['wild_mask']:
+        hand_state['num_wilds'] -= 1
+    else:
+        rank = get_card_rank(card)
+        rank_bit = get_rank_bit(rank)
+        hand_state['suit_masks'][get_card_suit(card)] ^= rank_bit
+        rank_counts = hand_state['rank_counts']
+        hand_state['count_masks'][rank_counts[rank]] ^= rank_bit
+        rank_counts[rank] -= 1
+
+def get_hand_state_best_hand_code(hand_state):
+    if hand_state['hand_code'] is None:
+        hand_state['hand_code'] = get_best_hand_code_from_masks(
+            hand_state['suit_masks'],
+            hand_state['count_masks'],
+            hand_state['num_wilds']
+        )
+    return hand_state['hand_code']
+
+def get_hand_state_best_hand(hand_state):
+    return get_hand_from_code(get_hand_state_best_hand_code(hand_state))
+
+def get_best_hand(
+    cards,
+    is_wild_func,
+    engine='finders',
+    hand_cache=None,
+    ace_low=False
+):
+    if hand_cache is not None:
+        return get_hand_from_code(
+            get_cached_best_hand_code(
+                cards,
+                is_wild_func,
+                engine,
+                hand_cache,
+                ace_low=ace_low
+            )
+        )
+    return ENGINES[engine]['best_hand_func'](
+        cards,
+        is_wild_func,
+        ace_low=ace_low
+    )
+
+def get_best_hand_code(
+    cards,
+    is_wild_func,
+    engine='finders',
+    hand_cache=None,
+    ace_low=False
+):
+    if hand_cache is not None:
+        return get_cached_best_hand_code(
+            cards,
+            is_wild_func,
+            engine,
+            hand_cache,
+            ace_low=ace_low
+        )
+    return ENGINES[engine]['best_hand_code_func'](
+        cards,
+        is_wild_func,
+        ace_low=ace_low
+    )
+
+def hand_exists(cards, hand_type, tie_break_dict, is_wild_func, ace_low=False):
+    split_cards = split_wild_cards(cards, is_wild_func)
+    if split_cards is None:
+        raise ValueError('hand_exists takes cards with no card more than once')
+    num_wilds, natural_cards_mask = split_cards
+    hand_type_obj = get_hand_types(ace_low)[HAND_TYPE_INDEXES[hand_type]]
+    return hand_type_obj['exists_func'](
+        get_suit_masks(natural_cards_mask),
+        [tie_break_dict[key] for key in hand_type_obj['tie_break_keys']],
+        num_wilds=num_wilds
+    )
 
 def get_hand_sortkey(hand_type, tie_break_dict):
     hand_type_obj = [o for o in HAND_TYPES if o['hand_type'] == hand_type][0]
@@ -1,10 +1,120 @@
 import poker
 import card_names as cn
+import misc_helpers as mh
 
+from collections import Counter, defaultdict
+import itertools
+import pickle
+import random
 import unittest
 
 
+def recursive_full_house_finder(natural_cards, num_wilds=0):
+    """
+    The original full_house_finder, which tries every rank for each of 1 or 2
+    wilds. Kept as the reference for full_house_finder's direct version.
+    """
+    rank_counts = Counter(poker.get_card_rank(card) for card in natural_cards)
+    triplet_rank_counts = defaultdict(int)
+    pair_rank_counts = defaultdict(int)
+    solo_rank_counts = defaultdict(int)
+    for rank, count in rank_counts.items():
+        if count >= 3:
+            triplet_rank_counts[rank] = count / 3
+        if count % 3 == 2:
+            pair_rank_counts[rank] = 1
+        if count % 3 == 1:
+            solo_rank_counts[rank] = 1
+
+    if num_wilds == 0:
+        enough_triplets = len(triplet_rank_counts) >= 1
+        enough_pairs = len(triplet_rank_counts) + len(pair_rank_counts) >= 2
+        if not enough_triplets or not enough_pairs:
+            return False, {}
+        else:
+            triplet_rank = max(triplet_rank_counts.keys())
+            mh.decrementCounter(triplet_rank_counts, triplet_rank, 1)
+            pair_rank = max(
+                triplet_rank_counts.keys() + pair_rank_counts.keys()
+            )
+            return True, {
+                'triplet_rank': triplet_rank,
+                'pair_rank': pair_rank,
+            }
+    elif num_wilds == 1 or num_wilds == 2:
+        candidates = [
+            recursive_full_house_finder(
+                natural_cards + [card],
+                num_wilds=num_wilds-1
+            )
+            for card in range(13)
+        ]
+        candidate_tie_break_dicts = [
+            tie_break_dict
+            for found_full_house, tie_break_dict in candidates
+            if found_full_house
+        ]
+        if len(candidate_tie_break_dicts) == 0:
+            return False, {}
+        else:
+            return True, max(
+                candidate_tie_break_dicts,
+                key=lambda d: (d['triplet_rank'], d['pair_rank'])
+            )
+    elif num_wilds == 3:
+        if len(triplet_rank_counts) + len(pair_rank_counts) == 0:
+            return False, {}
+        else:
+            pair_rank = max(
+                triplet_rank_counts.keys() + pair_rank_counts.keys()
+            )
+            return True, { 'triplet_rank': 14, 'pair_rank': pair_rank }
+    elif num_wilds == 4:
+        if len(natural_cards) == 0:
+            return False, {}
+        else:
+            pair_rank = max(rank_counts.keys())
+            return True, { 'triplet_rank': 14, 'pair_rank': pair_rank }
+    elif num_wilds >= 5:
+        return True, { 'triplet_rank': 14, 'pair_rank': 14 }
+
+
+def set_straight_finder(natural_cards, num_wilds=0, ace_low=False):
+    """
+    The original straight_finder, which takes set differences of every range of
+    ranks, with the ace as a rank 1 too if aces play low. Kept as the reference
+    for the straight tables.
+    """
+    ranks = set(poker.get_card_rank(card) for card in natural_cards)
+    if ace_low and 14 in ranks:
+        ranks.add(1)
+
+    straight_top_ranks = []
+    for top_rank in range(14, 4, -1):
+        missing_ranks = set(range(top_rank-4, top_rank+1)) - ranks
+        if len(missing_ranks) <= num_wilds:
+            straight_top_ranks.append(top_rank)
+
+    if len(straight_top_ranks) == 0:
+        return False, {}
+    else:
+        top_rank = max(straight_top_ranks)
+        return True, { 'top_rank': top_rank }
+
+
 class TestPoker(unittest.TestCase):
+    def assertMaskFinderResultEqual(self, hand_type, mask_result, result):
+        tie_break_keys = [
+            hand_type_obj['tie_break_keys']
+            for hand_type_obj in poker.HAND_TYPES
+            if hand_type_obj['hand_type'] == hand_type
+        ][0]
+        found_hand, tie_break_ranks = mask_result
+        self.assertEqual(
+            (found_hand, dict(zip(tie_break_keys, tie_break_ranks))),
+            result
+        )
+
     def test_high_card_finder(self):
         six_high_hand = [
             cn.THREE_OF_CLUBS,
@@ -908,6 +1018,768 @@ class TestPoker(unittest.TestCase):
             (True, { 'top_rank': 14 })
         )
 
+    def test_full_house_finder_matches_recursive(self):
+        # every count from 0 through 4 for a low rank, a middle rank, and the
+        # two highest ranks (which wilds fill in when nothing else is better)
+        ranks = [3, 9, 13, 14]
+        for counts in itertools.product(range(5), repeat=len(ranks)):
+            natural_cards = [
+                (suit * 13) + (rank - 2)
+                for rank, count in zip(ranks, counts)
+                for suit in range(count)
+            ]
+            suit_masks = poker.get_suit_masks(
+                poker.get_cards_mask(natural_cards)
+            )
+            count_masks = poker.get_count_masks(suit_masks)
+            for num_wilds in range(6):
+                expected = recursive_full_house_finder(
+                    natural_cards,
+                    num_wilds=num_wilds
+                )
+                self.assertEqual(
+                    poker.full_house_finder(
+                        natural_cards,
+                        num_wilds=num_wilds
+                    ),
+                    expected
+                )
+                self.assertMaskFinderResultEqual(
+                    'full_house',
+                    poker.full_house_mask_finder(
+                        suit_masks,
+                        count_masks,
+                        num_wilds=num_wilds
+                    ),
+                    expected
+                )
+
+    def test_straight_tables_match_sets(self):
+        # every rank mask, in one suit and spread over the suits
+        for rank_mask in range(poker.ALL_RANKS_MASK + 1):
+            one_suit_cards = [
+                rank_index
+                for rank_index in range(13)
+                if (rank_mask >> rank_index) & 1
+            ]
+            spread_cards = [
+                ((rank_index % 4) * 13) + rank_index
+                for rank_index in one_suit_cards
+            ]
+            for num_wilds in range(7):
+                for ace_low in [False, True]:
+                    expected = set_straight_finder(
+                        one_suit_cards,
+                        num_wilds=num_wilds,
+                        ace_low=ace_low
+                    )
+                    self.assertEqual(
+                        poker.straight_finder(
+                            spread_cards,
+                            num_wilds=num_wilds,
+                            ace_low=ace_low
+                        ),
+                        expected
+                    )
+                    self.assertEqual(
+                        poker.straight_flush_finder(
+                            one_suit_cards,
+                            num_wilds=num_wilds,
+                            ace_low=ace_low
+                        ),
+                        expected
+                    )
+
+    def test_ace_low_straights(self):
+        wheel = [
+            cn.ACE_OF_CLUBS,
+            cn.TWO_OF_CLUBS,
+            cn.THREE_OF_CLUBS,
+            cn.FOUR_OF_CLUBS,
+            cn.FIVE_OF_CLUBS,
+        ]
+        spread_wheel = [cn.ACE_OF_SPADES] + wheel[1:]
+        for finder in [poker.straight_finder, poker.straight_flush_finder]:
+            self.assertEqual(finder(wheel), (False, {}))
+            self.assertEqual(
+                finder(wheel, ace_low=True),
+                (True, { 'top_rank': 5 })
+            )
+        self.assertEqual(
+            poker.straight_finder(spread_wheel, ace_low=True),
+            (True, { 'top_rank': 5 })
+        )
+        self.assertEqual(
+            poker.straight_flush_finder(spread_wheel, ace_low=True),
+            (False, {})
+        )
+        # a wild still makes a 6-high straight over the wheel
+        self.assertEqual(
+            poker.straight_finder(wheel[1:], num_wilds=1, ace_low=True),
+            (True, { 'top_rank': 6 })
+        )
+
+        suit_masks = poker.get_suit_masks(poker.get_cards_mask(wheel))
+        count_masks = poker.get_count_masks(suit_masks)
+        for hand_type in ['straight', 'straight_flush']:
+            hand_type_obj = poker.HAND_TYPES[poker.HAND_TYPE_INDEXES[hand_type]]
+            self.assertEqual(
+                hand_type_obj['mask_finder'](suit_masks, count_masks),
+                (False, ())
+            )
+            self.assertEqual(
+                hand_type_obj['mask_finder'](
+                    suit_masks,
+                    count_masks,
+                    ace_low=True
+                ),
+                (True, (5,))
+            )
+            self.assertFalse(hand_type_obj['exists_func'](suit_masks, [5]))
+            self.assertTrue(
+                hand_type_obj['exists_func'](suit_masks, [5], ace_low=True)
+            )
+
+        # every engine plays aces low, with or without a hand cache
+        spread_wheel_code = poker.get_hand_code('straight', {'top_rank': 5})
+        hand_cache = poker.make_hand_cache()
+        for engine in poker.ENGINES:
+            self.assertEqual(
+                poker.get_best_hand_code(
+                    spread_wheel,
+                    poker.one_eyed_jacks_are_wild,
+                    engine=engine
+                ),
+                poker.get_hand_code('high_card', {'rank': 14})
+            )
+            for cache in [None, hand_cache]:
+                self.assertEqual(
+                    poker.get_best_hand_code(
+                        spread_wheel,
+                        poker.one_eyed_jacks_are_wild,
+                        engine=engine,
+                        hand_cache=cache,
+                        ace_low=True
+                    ),
+                    spread_wheel_code
+                )
+        self.assertTrue(poker.hand_exists(
+            spread_wheel,
+            'straight',
+            {'top_rank': 5},
+            poker.one_eyed_jacks_are_wild,
+            ace_low=True
+        ))
+        self.assertFalse(poker.hand_exists(
+            spread_wheel,
+            'straight',
+            {'top_rank': 5},
+            poker.one_eyed_jacks_are_wild
+        ))
+
+        # mostly low cards, for plenty of wheels
+        rand = random.Random(0)
+        low_cards = [
+            card
+            for card in range(52)
+            if poker.get_card_rank(card) in (14, 2, 3, 4, 5, 6)
+        ]
+        for hand_size in range(2, 12):
+            for _ in range(50):
+                cards = rand.sample(low_cards, hand_size - 1)
+                cards.append(rand.choice([
+                    card for card in range(52) if card not in cards
+                ]))
+                for is_wild_func in [
+                    poker.twos_are_wild,
+                    poker.one_eyed_jacks_are_wild,
+                ]:
+                    best_hand_code = poker.get_best_hand_code(
+                        cards,
+                        is_wild_func,
+                        ace_low=True
+                    )
+                    self.assertTrue(
+                        best_hand_code >=
+                        poker.get_best_hand_code(cards, is_wild_func)
+                    )
+                    for engine in ['bitmask', 'lookup']:
+                        self.assertEqual(
+                            poker.get_best_hand_code(
+                                cards,
+                                is_wild_func,
+                                engine=engine,
+                                ace_low=True
+                            ),
+                            best_hand_code
+                        )
+
+    def test_mask_finders(self):
+        rand = random.Random(0)
+        for _ in range(200):
+            hand_size = rand.randint(1, 28)
+            natural_cards = rand.sample(range(52), hand_size)
+            suit_masks = poker.get_suit_masks(
+                poker.get_cards_mask(natural_cards)
+            )
+            count_masks = poker.get_count_masks(suit_masks)
+            for num_wilds in range(7):
+                for hand_type_obj in poker.HAND_TYPES:
+                    self.assertMaskFinderResultEqual(
+                        hand_type_obj['hand_type'],
+                        hand_type_obj['mask_finder'](
+                            suit_masks,
+                            count_masks,
+                            num_wilds=num_wilds
+                        ),
+                        hand_type_obj['finder'](
+                            natural_cards,
+                            num_wilds=num_wilds
+                        )
+                    )
+
+    def test_get_best_hand_engines(self):
+        rand = random.Random(0)
+        for hand_size in range(2, 29):
+            for _ in range(20):
+                cards = rand.sample(range(52), hand_size)
+                self.assertEqual(
+                    poker.get_best_hand(
+                        cards,
+                        poker.twos_are_wild,
+                        engine='bitmask'
+                    ),
+                    poker.get_best_hand(
+                        cards,
+                        poker.twos_are_wild,
+                        engine='finders'
+                    )
+                )
+
+    def test_hand_codes(self):
+        hands = []
+        for hand_type_obj in poker.HAND_TYPES:
+            tie_break_keys = hand_type_obj['tie_break_keys']
+            for tie_break_ranks in itertools.product(
+                range(2, 15),
+                repeat=len(tie_break_keys)
+            ):
+                hands.append((
+                    hand_type_obj['hand_type'],
+                    dict(zip(tie_break_keys, tie_break_ranks)),
+                ))
+
+        hand_codes = [poker.get_hand_code(*hand) for hand in hands]
+        for hand, hand_code in zip(hands, hand_codes):
+            self.assertTrue(0 <= hand_code < poker.NUM_HAND_CODES)
+            self.assertEqual(poker.get_hand_from_code(hand_code), hand)
+        self.assertEqual(len(set(hand_codes)), len(hands))
+        self.assertEqual(
+            sorted(hands, key=lambda hand: poker.get_hand_sortkey(*hand)),
+            sorted(hands, key=lambda hand: poker.get_hand_code(*hand))
+        )
+        self.assertEqual(
+            poker.get_hand_code(
+                'full_house',
+                { 'triplet_rank': 9, 'pair_rank': 4 }
+            ),
+            0x694
+        )
+
+    def test_get_best_hand_code(self):
+        rand = random.Random(0)
+        for hand_size in range(2, 29):
+            for _ in range(20):
+                cards = rand.sample(range(52), hand_size)
+                best_hand = poker.get_best_hand(cards, poker.twos_are_wild)
+                for engine in poker.ENGINES:
+                    self.assertEqual(
+                        poker.get_best_hand_code(
+                            cards,
+                            poker.twos_are_wild,
+                            engine=engine
+                        ),
+                        poker.get_hand_code(*best_hand)
+                    )
+
+    def test_hands(self):
+        hand = poker.get_best_hand(
+            [cn.NINE_OF_CLUBS, cn.NINE_OF_HEARTS, cn.FOUR_OF_SPADES],
+            poker.twos_are_wild
+        )
+        self.assertIsInstance(hand, poker.Hand)
+        self.assertIs(hand, poker.get_hand_from_code(hand.hand_code))
+        self.assertIs(pickle.loads(pickle.dumps(hand)), hand)
+
+        # the same as the tuple it replaces
+        hand_type, tie_break_dict = hand
+        self.assertEqual((hand_type, tie_break_dict), ('one_pair', {'rank': 9}))
+        self.assertEqual(hand, ('one_pair', {'rank': 9}))
+        self.assertEqual(hand[1]['rank'], 9)
+        self.assertEqual(repr(hand), repr(('one_pair', {'rank': 9})))
+        self.assertNotEqual(hand, ('one_pair', {'rank': 10}))
+
+        hand.tie_break_dict['rank'] = 10
+        self.assertEqual(hand.tie_break_dict, {'rank': 9})
+        with self.assertRaises(AttributeError):
+            hand.hand_code = 0
+
+        # ordering and hashing go by hand_code
+        rand = random.Random(0)
+        hands = [
+            poker.get_best_hand(
+                rand.sample(range(52), rand.randint(2, 28)),
+                poker.twos_are_wild,
+                engine='bitmask'
+            )
+            for _ in range(200)
+        ]
+        self.assertEqual(
+            sorted(hands),
+            sorted(hands, key=lambda hand: poker.get_hand_sortkey(*hand))
+        )
+        self.assertEqual(
+            Counter(hands),
+            Counter(poker.get_hand_from_code(hand.hand_code) for hand in hands)
+        )
+
+    def test_wild_rules(self):
+        for wild_rule in poker.WILD_RULES.values():
+            deck = wild_rule['deck']
+            self.assertEqual(len(deck), 52 + wild_rule['num_jokers'])
+            self.assertEqual(
+                [card for card in deck if (wild_rule['wild_mask'] >> card) & 1],
+                [card for card in deck if wild_rule['is_wild_func'](card)]
+            )
+        self.assertEqual(
+            [
+                poker.card_repr(card)
+                for card in poker.WILD_RULES['one_eyed_jacks']['deck']
+                if poker.one_eyed_jacks_are_wild(card)
+            ],
+            ['jack of hearts', 'jack of spades']
+        )
+        self.assertEqual(poker.card_repr(52), 'joker')
+
+        # a new is_wild_func per call doesn't grow the wild_mask's past their
+        # max size
+        for rank in range(2, 15) * 5:
+            self.assertEqual(
+                poker.get_wild_mask(
+                    lambda card: (
+                        not poker.is_joker(card) and
+                        poker.get_card_rank(card) == rank
+                    )
+                ),
+                sum(1 << (suit * 13 + rank - 2) for suit in range(4))
+            )
+        self.assertEqual(
+            len(poker._wild_masks),
+            poker.WILD_MASKS_MAX_SIZE
+        )
+
+        rand = random.Random(0)
+        for wild_rule in poker.WILD_RULES.values():
+            for hand_size in range(2, 29):
+                cards = rand.sample(wild_rule['deck'], hand_size)
+                best_hand = poker.get_best_hand(
+                    cards,
+                    wild_rule['is_wild_func']
+                )
+                for engine in poker.ENGINES:
+                    self.assertEqual(
+                        poker.get_best_hand(
+                            cards,
+                            wild_rule['is_wild_func'],
+                            engine=engine
+                        ),
+                        best_hand
+                    )
+
+        # jokers fill in for any card
+        self.assertEqual(
+            poker.get_best_hand(
+                [cn.TWO_OF_CLUBS, cn.TWO_OF_HEARTS, 52, 53],
+                poker.is_joker
+            ),
+            ('four_of_a_kind', {'rank': 2})
+        )
+
+    def test_make_deck(self):
+        self.assertEqual(poker.make_deck(), range(52))
+        self.assertEqual(poker.make_deck(num_decks=2), range(52) * 2)
+        self.assertEqual(
+            len(poker.make_deck(wild_rule='jokers', num_decks=2)),
+            2 * 54
+        )
+        stripped_deck = poker.make_deck(
+            wild_rule='jokers',
+            stripped_ranks=range(2, 7)
+        )
+        self.assertEqual(len(stripped_deck), 52 - 5 * 4 + 2)
+        self.assertEqual(
+            sorted(set(
+                poker.get_card_rank(card)
+                for card in stripped_deck
+                if not poker.is_joker(card)
+            )),
+            range(7, 15)
+        )
+
+    def test_multiple_decks(self):
+        # copies of a card count toward a flush
+        self.assertEqual(
+            poker.get_best_hand(
+                [
+                    cn.ACE_OF_HEARTS,
+                    cn.ACE_OF_HEARTS,
+                    cn.KING_OF_HEARTS,
+                    cn.QUEEN_OF_HEARTS,
+                    cn.NINE_OF_HEARTS,
+                ],
+                poker.twos_are_wild
+            ),
+            ('flush', {'top_rank': 14})
+        )
+        # but not toward a straight flush, which takes 5 different ranks
+        cards = [
+            cn.TEN_OF_HEARTS,
+            cn.TEN_OF_HEARTS,
+            cn.JACK_OF_HEARTS,
+            cn.QUEEN_OF_HEARTS,
+            cn.KING_OF_HEARTS,
+        ]
+        self.assertEqual(
+            poker.get_best_hand(cards, poker.twos_are_wild),
+            ('flush', {'top_rank': 13})
+        )
+        self.assertEqual(
+            poker.get_best_hand(
+                cards + [cn.ACE_OF_HEARTS],
+                poker.twos_are_wild
+            ),
+            ('straight_flush', {'top_rank': 14})
+        )
+
+        rand = random.Random(0)
+        hand_cache = poker.make_hand_cache()
+        for wild_rule in ['twos', 'jokers']:
+            deck = poker.make_deck(wild_rule=wild_rule, num_decks=2)
+            is_wild_func = poker.WILD_RULES[wild_rule]['is_wild_func']
+            for hand_size in range(2, 29):
+                cards = rand.sample(deck, hand_size)
+                best_hand = poker.get_best_hand(cards, is_wild_func)
+                for engine in poker.ENGINES:
+                    self.assertEqual(
+                        poker.get_best_hand(
+                            cards,
+                            is_wild_func,
+                            engine=engine,
+                            hand_cache=hand_cache
+                        ),
+                        best_hand
+                    )
+
+        with self.assertRaises(ValueError):
+            poker.hand_exists(
+                [cn.ACE_OF_HEARTS, cn.ACE_OF_HEARTS],
+                'one_pair',
+                {'rank': 14},
+                poker.twos_are_wild
+            )
+
+    def test_hand_cache(self):
+        hand_cache = poker.make_hand_cache()
+        rand = random.Random(0)
+        for hand_size in range(2, 29):
+            for _ in range(20):
+                cards = rand.sample(range(52), hand_size)
+                self.assertEqual(
+                    poker.get_best_hand(
+                        cards,
+                        poker.twos_are_wild,
+                        hand_cache=hand_cache
+                    ),
+                    poker.get_best_hand(cards, poker.twos_are_wild)
+                )
+        stats = poker.get_hand_cache_stats(hand_cache)
+        self.assertEqual(stats['num_hits'] + stats['num_misses'], 27 * 20)
+        self.assertEqual(stats['size'], stats['num_misses'])
+
+        # the same hand with its suits swapped and its cards shuffled hits
+        cards = [
+            cn.TWO_OF_CLUBS,
+            cn.SIX_OF_HEARTS,
+            cn.SEVEN_OF_HEARTS,
+            cn.KING_OF_SPADES,
+        ]
+        swapped_cards = [
+            cn.KING_OF_CLUBS,
+            cn.SEVEN_OF_DIAMONDS,
+            cn.TWO_OF_HEARTS,
+            cn.SIX_OF_DIAMONDS,
+        ]
+        hand_cache = poker.make_hand_cache()
+        for hand in [cards, swapped_cards]:
+            self.assertEqual(
+                poker.get_best_hand_code(
+                    hand,
+                    poker.twos_are_wild,
+                    engine='bitmask',
+                    hand_cache=hand_cache
+                ),
+                poker.get_hand_code('one_pair', {'rank': 13})
+            )
+        stats = poker.get_hand_cache_stats(hand_cache)
+        self.assertEqual((stats['num_hits'], stats['num_misses']), (1, 1))
+
+        # the least recently used signature is evicted
+        hand_cache = poker.make_hand_cache(max_size=2)
+        for hand in [[0], [1], [0], [2], [1]]:
+            poker.get_best_hand_code(
+                hand,
+                poker.twos_are_wild,
+                hand_cache=hand_cache
+            )
+        stats = poker.get_hand_cache_stats(hand_cache)
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(
+            (stats['num_hits'], stats['num_misses'], stats['num_evictions']),
+            (1, 4, 2)
+        )
+
+    def test_hand_exists(self):
+        cards = [
+            cn.NINE_OF_CLUBS,
+            cn.NINE_OF_HEARTS,
+            cn.QUEEN_OF_HEARTS,
+            cn.EIGHT_OF_HEARTS,
+            cn.FIVE_OF_HEARTS,
+            cn.THREE_OF_HEARTS,
+            cn.TWO_OF_SPADES,
+        ]
+        for hand_type, tie_break_dict, exists in [
+            ('high_card', {'rank': 12}, True),
+            ('high_card', {'rank': 14}, True),
+            ('one_pair', {'rank': 9}, True),
+            ('one_pair', {'rank': 12}, True),
+            ('one_pair', {'rank': 2}, False),
+            ('two_pair', {'high_rank': 12, 'low_rank': 9}, True),
+            ('two_pair', {'high_rank': 9, 'low_rank': 9}, False),
+            ('three_of_a_kind', {'rank': 9}, True),
+            ('three_of_a_kind', {'rank': 8}, False),
+            ('straight', {'top_rank': 9}, False),
+            ('flush', {'top_rank': 12}, True),
+            ('flush', {'top_rank': 9}, True),
+            ('flush', {'top_rank': 8}, False),
+            ('flush', {'top_rank': 14}, True),
+            ('flush', {'top_rank': 5}, False),
+            ('full_house', {'triplet_rank': 9, 'pair_rank': 12}, False),
+            ('four_of_a_kind', {'rank': 9}, False),
+            ('straight_flush', {'top_rank': 9}, False),
+        ]:
+            self.assertEqual(
+                poker.hand_exists(
+                    cards,
+                    hand_type,
+                    tie_break_dict,
+                    poker.twos_are_wild
+                ),
+                exists
+            )
+
+        # the best hand is the highest hand that exists
+        all_hands = [
+            (hand_type_obj['hand_type'], dict(zip(
+                hand_type_obj['tie_break_keys'],
+                tie_break_ranks
+            )))
+            for hand_type_obj in poker.HAND_TYPES
+            for tie_break_ranks in itertools.product(
+                range(2, 15),
+                repeat=len(hand_type_obj['tie_break_keys'])
+            )
+        ]
+        rand = random.Random(0)
+        for hand_size in range(1, 29):
+            for _ in range(5):
+                cards = rand.sample(range(52), hand_size)
+                self.assertEqual(
+                    max(
+                        poker.get_hand_code(*hand)
+                        for hand in all_hands
+                        if poker.hand_exists(
+                            cards,
+                            hand[0],
+                            hand[1],
+                            poker.twos_are_wild
+                        )
+                    ),
+                    poker.get_best_hand_code(
+                        cards,
+                        poker.twos_are_wild,
+                        engine='bitmask'
+                    )
+                )
+
+    def test_finder_profile(self):
+        rand = random.Random(0)
+        hands = [
+            rand.sample(range(52), hand_size)
+            for hand_size in range(2, 29)
+        ]
+        best_hands = [
+            poker.get_best_hand(cards, poker.twos_are_wild)
+            for cards in hands
+        ]
+        original_finders = [
+            (hand_type_obj['finder'], hand_type_obj['mask_finder'])
+            for hand_type_obj in poker.HAND_TYPES
+        ]
+
+        finder_profile = poker.make_finder_profile()
+        poker.start_finder_profile(finder_profile)
+        self.assertRaises(
+            ValueError,
+            poker.start_finder_profile,
+            poker.make_finder_profile()
+        )
+        try:
+            for engine in poker.ENGINES:
+                self.assertEqual(
+                    [
+                        poker.get_best_hand(
+                            cards,
+                            poker.twos_are_wild,
+                            engine=engine
+                        )
+                        for cards in hands
+                    ],
+                    best_hands
+                )
+        finally:
+            poker.stop_finder_profile(finder_profile)
+
+        self.assertEqual(
+            [
+                (hand_type_obj['finder'], hand_type_obj['mask_finder'])
+                for hand_type_obj in poker.HAND_TYPES
+            ],
+            original_finders
+        )
+        self.assertRaises(
+            ValueError,
+            poker.stop_finder_profile,
+            finder_profile
+        )
+
+        # the finders engine scans from the top down and stops at the first
+        # hit, so every hand hits exactly once, at its best hand's hand_type
+        report = poker.get_finder_profile_report(finder_profile)
+        finder_rows = [row for row in report if row['finder_key'] == 'finder']
+        self.assertEqual(
+            sum(
+                row['num_calls']
+                for row in finder_rows
+                if row['hand_type'] == 'straight_flush'
+            ),
+            len(hands)
+        )
+        self.assertEqual(
+            Counter(
+                (row['hand_type'], row['hand_size'])
+                for row in finder_rows
+                for _ in range(row['num_hits'])
+            ),
+            Counter(
+                (best_hand.hand_type, len(cards))
+                for cards, best_hand in zip(hands, best_hands)
+            )
+        )
+        self.assertTrue(all(
+            row['seconds'] >= 0 and 0 <= row['hit_rate'] <= 1
+            for row in report
+        ))
+        self.assertEqual(
+            [row['seconds'] for row in report],
+            sorted([row['seconds'] for row in report], reverse=True)
+        )
+
+        # the profiled finders pass ace_low on to the straight finders
+        wheel = [
+            cn.ACE_OF_CLUBS,
+            cn.THREE_OF_CLUBS,
+            cn.FOUR_OF_CLUBS,
+            cn.FIVE_OF_CLUBS,
+        ]
+        suit_masks = poker.get_suit_masks(poker.get_cards_mask(wheel))
+        count_masks = poker.get_count_masks(suit_masks)
+        finder_profile = poker.make_finder_profile()
+        poker.start_finder_profile(finder_profile)
+        try:
+            for hand_type in ['straight', 'straight_flush']:
+                hand_type_obj = poker.HAND_TYPES[
+                    poker.HAND_TYPE_INDEXES[hand_type]
+                ]
+                self.assertEqual(
+                    hand_type_obj['finder'](wheel, 1, ace_low=True),
+                    (True, { 'top_rank': 5 })
+                )
+                self.assertEqual(
+                    hand_type_obj['mask_finder'](
+                        suit_masks,
+                        count_masks,
+                        1,
+                        ace_low=True
+                    ),
+                    (True, (5,))
+                )
+        finally:
+            poker.stop_finder_profile(finder_profile)
+        self.assertEqual(
+            sum(
+                row['num_hits']
+                for row in poker.get_finder_profile_report(finder_profile)
+            ),
+            4
+        )
+
+    def test_hand_state(self):
+        rand = random.Random(0)
+        deck = range(52)
+        rand.shuffle(deck)
+        cards = []
+        hand_state = poker.make_hand_state(poker.twos_are_wild)
+        # deal the whole deck in, then take it back out in another order
+        for card in deck:
+            poker.add_card(hand_state, card)
+            cards.append(card)
+            self.assertEqual(
+                poker.get_hand_state_best_hand_code(hand_state),
+                poker.get_best_hand_code(
+                    cards,
+                    poker.twos_are_wild,
+                    engine='bitmask'
+                )
+            )
+        rand.shuffle(cards)
+        while len(cards) > 1:
+            poker.remove_card(hand_state, cards.pop())
+            self.assertEqual(
+                poker.get_hand_state_best_hand(hand_state),
+                poker.get_best_hand(cards, poker.twos_are_wild)
+            )
+
+        new_hand_state = poker.make_hand_state(poker.twos_are_wild, cards=cards)
+        poker.get_hand_state_best_hand_code(new_hand_state)
+        self.assertEqual(new_hand_state, hand_state)
+        self.assertRaises(ValueError, poker.add_card, hand_state, cards[0])
+        self.assertRaises(
+            ValueError,
+            poker.remove_card,
+            hand_state,
+            (cards[0] + 1) % 52
+        )
 
 if __name__ == '__main__':
     unittest.main()
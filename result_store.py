@@ -0,0 +1,256 @@
+from collections import Counter
+import os
+import random
+import struct
+
+import numpy as np
+
+import batch
+from dealing import deal_hands, make_random_state, split_seed
+from poker import NUM_HAND_CODES, WILD_RULES
+
+
+"""
+Result Store
+
+Keep simulated hands in a binary file instead of Python objects, so a big
+simulation runs once and gets queried many times.
+
+Represent the results with a numpy structured array of one record per hand,
+with fields:
+- hand_size: uint8
+- trial_index: uint64, the hand's index among the hands of its hand_size
+- hand_code: uint16, the same as get_best_hand_code gives
+- num_wilds: uint8
+- cards_mask: uint64, the dealt cards as a card mask (only in a store made with
+    has_cards, since it's more than half of each record)
+
+The file is a 16-byte header (RESULT_STORE_MAGIC, the format version, and
+whether it has cards_mask) followed by the records, packed and little-endian.
+Appending writes more records to the end, so a store grows across runs, and
+loading memory-maps the records, so a query reads only what it touches.
+
+The hands are dealt with dealing.deal_hands, so the same seed always stores the
+same hands. Version 1 stores dealt them another way, so loading or appending to
+one is a ValueError instead of continuing it with hands from a different
+dealer.
+"""
+
+RESULT_STORE_MAGIC = b'BSRESULT'
+RESULT_STORE_VERSION = 2
+RESULT_STORE_HEADER_FORMAT = '<8sII'
+RESULT_STORE_HEADER_SIZE = struct.calcsize(RESULT_STORE_HEADER_FORMAT)
+
+RESULT_FIELDS = [
+    ('hand_size', '<u1'),
+    ('trial_index', '<u8'),
+    ('hand_code', '<u2'),
+    ('num_wilds', '<u1'),
+]
+CARDS_MASK_FIELD = ('cards_mask', '<u8')
+
+def get_result_dtype(has_cards=False):
+    fields = RESULT_FIELDS + ([CARDS_MASK_FIELD] if has_cards else [])
+    return np.dtype(fields)
+
+def has_cards_mask(results):
+    return 'cards_mask' in results.dtype.names
+
+## SIMULATING
+
+def get_cards_masks(cards):
+    return np.bitwise_or.reduce(
+        np.left_shift(np.uint64(1), cards.astype(np.uint64)),
+        axis=1
+    )
+
+def make_results(
+    cards,
+    first_trial_index=0,
+    has_cards=False,
+    wild_rule='twos'
+):
+    # the results for a batch of dealt cards, as from dealing.deal_hands
+    num_hands, hand_size = cards.shape
+    hand_type_codes, tie_break_ranks, _ = batch.get_best_hands(
+        cards,
+        wild_rule=wild_rule
+    )
+
+    results = np.empty(num_hands, dtype=get_result_dtype(has_cards))
+    results['hand_size'] = hand_size
+    results['trial_index'] = np.arange(
+        first_trial_index,
+        first_trial_index + num_hands
+    )
+    results['hand_code'] = batch.get_hand_codes(
+        hand_type_codes,
+        tie_break_ranks
+    )
+    wild_cards = batch.get_wild_cards(wild_rule)
+    results['num_wilds'] = wild_cards[cards].sum(axis=1)
+    if has_cards:
+        results['cards_mask'] = get_cards_masks(cards)
+    return results
+
+def generate_results(
+    hand_size,
+    num_trials,
+    seed,
+    first_trial_index=0,
+    has_cards=False,
+    wild_rule='twos',
+    chunk_size=100000
+):
+    # chunks of results, each dealt from its own seed, derived from the seed,
+    # the hand size and the chunk's first trial_index, so appending more trials
+    # later deals new hands
+    for chunk_start in range(0, num_trials, chunk_size):
+        num_hands = min(chunk_size, num_trials - chunk_start)
+        chunk_seed = split_seed(
+            seed,
+            hand_size,
+            first_trial_index + chunk_start
+        )
+        yield make_results(
+            deal_hands(
+                WILD_RULES[wild_rule]['deck'],
+                hand_size,
+                num_hands,
+                make_random_state(chunk_seed)
+            ),
+            first_trial_index=first_trial_index + chunk_start,
+            has_cards=has_cards,
+            wild_rule=wild_rule
+        )
+
+## FILES
+
+def write_header(f, has_cards):
+    f.write(struct.pack(
+        RESULT_STORE_HEADER_FORMAT,
+        RESULT_STORE_MAGIC,
+        RESULT_STORE_VERSION,
+        int(has_cards)
+    ))
+
+def read_header(path):
+    # returns has_cards
+    with open(path, 'rb') as f:
+        header = f.read(RESULT_STORE_HEADER_SIZE)
+    if len(header) < RESULT_STORE_HEADER_SIZE:
+        raise ValueError('{} is not a result store'.format(path))
+    magic, version, has_cards = struct.unpack(
+        RESULT_STORE_HEADER_FORMAT,
+        header
+    )
+    if magic != RESULT_STORE_MAGIC:
+        raise ValueError('{} is not a result store'.format(path))
+    if version != RESULT_STORE_VERSION:
+        raise ValueError(
+            '{} has result store version {}, not {}'.format(
+                path,
+                version,
+                RESULT_STORE_VERSION
+            )
+        )
+    return bool(has_cards)
+
+def save_results(results, path):
+    with open(path, 'wb') as f:
+        write_header(f, has_cards_mask(results))
+        results.tofile(f)
+
+def append_results(results, path):
+    if not os.path.exists(path):
+        save_results(results, path)
+        return
+    if read_header(path) != has_cards_mask(results):
+        raise ValueError(
+            'results and {} disagree on having cards_mask'.format(path)
+        )
+    with open(path, 'ab') as f:
+        results.astype(get_result_dtype(has_cards_mask(results))).tofile(f)
+
+def load_results(path, mmap=True):
+    dtype = get_result_dtype(read_header(path))
+    num_records = (
+        (os.path.getsize(path) - RESULT_STORE_HEADER_SIZE) / dtype.itemsize
+    )
+    if num_records == 0:
+        return np.empty(0, dtype=dtype)
+    if mmap:
+        return np.memmap(
+            path,
+            dtype=dtype,
+            mode='r',
+            offset=RESULT_STORE_HEADER_SIZE,
+            shape=(num_records,)
+        )
+    with open(path, 'rb') as f:
+        f.seek(RESULT_STORE_HEADER_SIZE)
+        return np.fromfile(f, dtype=dtype, count=num_records)
+
+def simulate_to_store(
+    path,
+    hand_sizes,
+    num_trials,
+    seed=None,
+    has_cards=False,
+    wild_rule='twos',
+    chunk_size=100000
+):
+    # append num_trials more hands of each hand size to the store at path,
+    # continuing each hand size's trial_index's from what's already there
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    num_trials_stored = Counter()
+    if os.path.exists(path):
+        if read_header(path) != has_cards:
+            raise ValueError(
+                'has_cards and {} disagree on having cards_mask'.format(path)
+            )
+        num_trials_stored = count_results_hand_sizes(load_results(path))
+
+    for hand_size in hand_sizes:
+        for results in generate_results(
+            hand_size,
+            num_trials,
+            seed,
+            first_trial_index=num_trials_stored[hand_size],
+            has_cards=has_cards,
+            wild_rule=wild_rule,
+            chunk_size=chunk_size
+        ):
+            append_results(results, path)
+
+## QUERYING
+
+def count_results_hand_sizes(results):
+    # a Counter of hand_size to its number of results
+    hand_size_counts = np.bincount(results['hand_size'])
+    return Counter(dict(
+        (hand_size, int(count))
+        for hand_size, count in enumerate(hand_size_counts)
+        if count
+    ))
+
+def count_results_hands(results, hand_size=None, num_wilds=None):
+    # a Counter of hand_code's, the same as simulation.count_hands gives, of
+    # the results with the given hand_size and num_wilds if there are any
+    hand_codes = results['hand_code']
+    selected = np.ones(len(results), dtype=bool)
+    if hand_size is not None:
+        selected &= results['hand_size'] == hand_size
+    if num_wilds is not None:
+        selected &= results['num_wilds'] == num_wilds
+    hand_code_counts = np.bincount(
+        hand_codes[selected],
+        minlength=NUM_HAND_CODES
+    )
+    return Counter(dict(
+        (hand_code, int(count))
+        for hand_code, count in enumerate(hand_code_counts)
+        if count
+    ))
@@ -0,0 +1,166 @@
+import poker
+import result_store
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'results.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_simulate_to_store(self):
+        result_store.simulate_to_store(
+            self.path,
+            [3, 12],
+            250,
+            seed=0,
+            has_cards=True,
+            chunk_size=100
+        )
+        results = result_store.load_results(self.path)
+        self.assertIsInstance(results, np.memmap)
+        self.assertEqual(
+            result_store.count_results_hand_sizes(results),
+            {3: 250, 12: 250}
+        )
+
+        for result in results[::25]:
+            cards = [
+                card
+                for card in range(52)
+                if (int(result['cards_mask']) >> card) & 1
+            ]
+            self.assertEqual(len(cards), result['hand_size'])
+            self.assertEqual(
+                result['hand_code'],
+                poker.get_best_hand_code(
+                    cards,
+                    poker.twos_are_wild,
+                    engine='bitmask'
+                )
+            )
+            self.assertEqual(
+                result['num_wilds'],
+                len([card for card in cards if poker.twos_are_wild(card)])
+            )
+
+        # appending continues the trial_index's and deals new hands
+        result_store.simulate_to_store(
+            self.path,
+            [12],
+            150,
+            seed=0,
+            has_cards=True,
+            chunk_size=100
+        )
+        results = result_store.load_results(self.path, mmap=False)
+        self.assertEqual(
+            result_store.count_results_hand_sizes(results),
+            {3: 250, 12: 400}
+        )
+        twelves = results[results['hand_size'] == 12]
+        self.assertEqual(list(twelves['trial_index']), range(400))
+        self.assertEqual(len(np.unique(twelves['cards_mask'])), 400)
+
+        hand_counts = result_store.count_results_hands(results, hand_size=12)
+        self.assertEqual(sum(hand_counts.values()), 400)
+        self.assertEqual(
+            sum(
+                sum(result_store.count_results_hands(
+                    results,
+                    hand_size=12,
+                    num_wilds=num_wilds
+                ).values())
+                for num_wilds in range(5)
+            ),
+            400
+        )
+
+    def test_wild_rules(self):
+        result_store.simulate_to_store(
+            self.path,
+            [20],
+            200,
+            seed=0,
+            has_cards=True,
+            wild_rule='jokers'
+        )
+        results = result_store.load_results(self.path)
+        num_jokers = 0
+        for result in results:
+            cards = [
+                card
+                for card in poker.WILD_RULES['jokers']['deck']
+                if (int(result['cards_mask']) >> card) & 1
+            ]
+            num_jokers += len([card for card in cards if poker.is_joker(card)])
+            self.assertEqual(
+                result['hand_code'],
+                poker.get_best_hand_code(
+                    cards,
+                    poker.is_joker,
+                    engine='bitmask'
+                )
+            )
+            self.assertEqual(
+                result['num_wilds'],
+                len([card for card in cards if poker.is_joker(card)])
+            )
+        self.assertGreater(num_jokers, 0)
+
+    def test_save_and_append_results(self):
+        cards = np.array([[0, 1, 2], [10, 20, 30]])
+        results = result_store.make_results(cards)
+        result_store.save_results(results, self.path)
+        result_store.append_results(
+            result_store.make_results(cards, first_trial_index=2),
+            self.path
+        )
+        loaded_results = result_store.load_results(self.path)
+        self.assertEqual(list(loaded_results['trial_index']), [0, 1, 2, 3])
+        self.assertEqual(
+            list(loaded_results['hand_code']),
+            list(results['hand_code']) * 2
+        )
+
+        # a store with cards_mask can't take results without it
+        self.assertRaises(
+            ValueError,
+            result_store.append_results,
+            result_store.make_results(cards, has_cards=True),
+            self.path
+        )
+
+        with open(self.path, 'wb') as f:
+            f.write(b'not a result store')
+        self.assertRaises(ValueError, result_store.load_results, self.path)
+
+        # a version 1 store dealt its hands another way
+        with open(self.path, 'wb') as f:
+            f.write(struct.pack(
+                result_store.RESULT_STORE_HEADER_FORMAT,
+                result_store.RESULT_STORE_MAGIC,
+                1,
+                0
+            ))
+        self.assertRaises(ValueError, result_store.load_results, self.path)
+        self.assertRaises(
+            ValueError,
+            result_store.append_results,
+            results,
+            self.path
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
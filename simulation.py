@@ -1,34 +1,818 @@
+from collections import Counter
+import json
+import math
+import multiprocessing
 import random
 
+from dealing import generate_deals, split_seed
+from exact import count_hand_sizes
 from poker import (
     get_card_rank,
     print_card,
-    twos_are_wild,
+    WILD_RULES,
     get_best_hand,
-    get_hand_sortkey
+    get_best_hand_code,
+    get_hand_code,
+    get_hand_from_code,
+    get_hand_sortkey,
+    get_hand_state_best_hand_code,
+    add_card,
+    get_finder_profile_report,
+    make_deck,
+    make_finder_profile,
+    make_hand_state,
+    remove_card,
+    start_finder_profile,
+    stop_finder_profile
 )
 
 
-def simulate_hands(hand_size, num_trials):
-    deck = range(52)
+HAND_SIZES = range(2, 29)
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+TOP_HAND_CODE = get_hand_code('straight_flush', {'top_rank': 14})
 
-    best_hands = []
-    for _ in range(num_trials):
-        cards = random.sample(deck, hand_size)
-        best_hand = get_best_hand(cards, is_wild_func=twos_are_wild)
-        best_hands.append(best_hand)
 
-    return best_hands
+"""
+Each of these takes in the name of its wild rule in WILD_RULES, which decides
+which cards are wild and which cards are in the deck, and the number of decks
+shuffled together to deal from, as from make_deck
 
-def generate_hand_size_median_hands_csv(num_trials):
-    for hand_size in range(2, 29):
-        best_hands = simulate_hands(hand_size, num_trials)
-        sorted_best_hands = sorted(
-            best_hands,
-            key=lambda hand: get_hand_sortkey(*hand)
+They deal each hand with rand.sample, or with a seed, deal the hands in chunks
+with dealing.generate_deals instead, which is faster and always deals the same
+hands for the same seed
+"""
+
+def generate_dealt_cards(deck, hand_size, num_trials, rand=random, seed=None):
+    if seed is None:
+        for _ in range(num_trials):
+            yield rand.sample(deck, hand_size)
+    else:
+        for cards_chunk in generate_deals(deck, hand_size, num_trials, seed):
+            for cards in cards_chunk.tolist():
+                yield cards
+
+def generate_best_hands(
+    hand_size,
+    num_trials,
+    engine='finders',
+    rand=random,
+    hand_cache=None,
+    wild_rule='twos',
+    num_decks=1,
+    seed=None
+):
+    deck = make_deck(wild_rule, num_decks=num_decks)
+    is_wild_func = WILD_RULES[wild_rule]['is_wild_func']
+
+    for cards in generate_dealt_cards(
+        deck,
+        hand_size,
+        num_trials,
+        rand=rand,
+        seed=seed
+    ):
+        yield get_best_hand(
+            cards,
+            is_wild_func=is_wild_func,
+            engine=engine,
+            hand_cache=hand_cache
+        )
+
+def simulate_hands(
+    hand_size,
+    num_trials,
+    engine='finders',
+    rand=random,
+    hand_cache=None,
+    wild_rule='twos',
+    num_decks=1,
+    seed=None
+):
+    return list(
+        generate_best_hands(
+            hand_size,
+            num_trials,
+            engine=engine,
+            rand=rand,
+            hand_cache=hand_cache,
+            wild_rule=wild_rule,
+            num_decks=num_decks,
+            seed=seed
+        )
+    )
+
+"""
+Hand Counts
+
+Count how many times each best hand comes up instead of keeping every best
+hand, since there are only a few hundred distinct hands. A Counter of
+hand_code's takes the same memory for any number of trials, merges with other
+Counters, and answers quantiles with one sort of its distinct hands.
+"""
+
+def count_hands(
+    hand_size,
+    num_trials,
+    engine='finders',
+    rand=random,
+    hand_cache=None,
+    wild_rule='twos',
+    num_decks=1,
+    seed=None
+):
+    deck = make_deck(wild_rule, num_decks=num_decks)
+    is_wild_func = WILD_RULES[wild_rule]['is_wild_func']
+
+    hand_counts = Counter()
+    for cards in generate_dealt_cards(
+        deck,
+        hand_size,
+        num_trials,
+        rand=rand,
+        seed=seed
+    ):
+        hand_code = get_best_hand_code(
+            cards,
+            is_wild_func=is_wild_func,
+            engine=engine,
+            hand_cache=hand_cache
+        )
+        hand_counts[hand_code] += 1
+
+    return hand_counts
+
+"""
+Known Cards
+
+Count the best hands of hand_size cards that include some known cards, such as
+your own hand when you know how many cards are in play. Only the other cards
+are dealt, from the rest of the deck, and the known cards stay in a hand state
+that each trial adds its dealt cards to and takes them back out of, so a trial
+only pays for the cards it deals. The known cards are different cards of the
+wild rule's deck, and anything else is a ValueError.
+"""
+
+def count_hands_given_cards(
+    known_cards,
+    hand_size,
+    num_trials,
+    rand=random,
+    wild_rule='twos',
+    seed=None
+):
+    num_unknown_cards = hand_size - len(known_cards)
+    if num_unknown_cards < 0:
+        raise ValueError(
+            'hand_size {} is less than the {} known cards'.format(
+                hand_size,
+                len(known_cards)
+            )
+        )
+    known_cards_set = set(known_cards)
+    if len(known_cards_set) < len(known_cards):
+        raise ValueError(
+            'known_cards {} has a card more than once'.format(known_cards)
+        )
+    missing_cards = known_cards_set - set(WILD_RULES[wild_rule]['deck'])
+    if missing_cards:
+        raise ValueError(
+            'known_cards {} are not in the {} deck'.format(
+                sorted(missing_cards),
+                wild_rule
+            )
+        )
+    deck = [
+        card
+        for card in WILD_RULES[wild_rule]['deck']
+        if card not in known_cards_set
+    ]
+
+    hand_state = make_hand_state(
+        WILD_RULES[wild_rule]['is_wild_func'],
+        cards=known_cards
+    )
+    hand_counts = Counter()
+    for unknown_cards in generate_dealt_cards(
+        deck,
+        num_unknown_cards,
+        num_trials,
+        rand=rand,
+        seed=seed
+    ):
+        for card in unknown_cards:
+            add_card(hand_state, card)
+        hand_counts[get_hand_state_best_hand_code(hand_state)] += 1
+        for card in unknown_cards:
+            remove_card(hand_state, card)
+
+    return hand_counts
+
+def get_hand_quantiles(hand_counts, quantiles):
+    # the hand at index int(quantile * num_hands) of all the hands sorted
+    sorted_hand_codes = sorted(hand_counts.keys())
+    num_hands = sum(hand_counts.values())
+
+    quantile_hands = []
+    for quantile in quantiles:
+        hand_index = min(int(quantile * num_hands), num_hands - 1)
+        num_hands_so_far = 0
+        for hand_code in sorted_hand_codes:
+            num_hands_so_far += hand_counts[hand_code]
+            if num_hands_so_far > hand_index:
+                quantile_hands.append(get_hand_from_code(hand_code))
+                break
+
+    return quantile_hands
+
+"""
+Shards
+
+Split the trials for each hand size into shards of a fixed size, so that the
+same seed always gives the same shards no matter how many worker processes run
+them. Each shard gets its own random seed, split from the master seed with the
+hand size and the shard's index, deals its hands from it with
+dealing.generate_deals, and the shards' results are put back together in shard
+order.
+
+Represent a shard with a tuple of
+(hand_size, num_trials, shard_seed, engine, wild_rule, num_decks)
+"""
+
+def get_shard_seed(seed, hand_size, shard_index):
+    return split_seed(seed, hand_size, shard_index)
+
+def get_shards(
+    hand_sizes,
+    num_trials,
+    seed,
+    engine,
+    wild_rule,
+    shard_size,
+    num_decks=1
+):
+    shards = []
+    for hand_size in hand_sizes:
+        for shard_index, shard_start in enumerate(
+            range(0, num_trials, shard_size)
+        ):
+            shards.append((
+                hand_size,
+                min(shard_size, num_trials - shard_start),
+                get_shard_seed(seed, hand_size, shard_index),
+                engine,
+                wild_rule,
+                num_decks,
+            ))
+    return shards
+
+def simulate_shard(shard):
+    hand_size, num_trials, shard_seed, engine, wild_rule, num_decks = shard
+    return count_hands(
+        hand_size,
+        num_trials,
+        engine=engine,
+        wild_rule=wild_rule,
+        num_decks=num_decks,
+        seed=shard_seed
+    )
+
+def simulate_hand_sizes(
+    hand_sizes,
+    num_trials,
+    seed,
+    engine='finders',
+    num_workers=1,
+    shard_size=1000,
+    wild_rule='twos',
+    num_decks=1
+):
+    shards = get_shards(
+        hand_sizes,
+        num_trials,
+        seed,
+        engine,
+        wild_rule,
+        shard_size,
+        num_decks=num_decks
+    )
+
+    if num_workers == 1:
+        shard_results = map(simulate_shard, shards)
+    else:
+        pool = multiprocessing.Pool(num_workers)
+        try:
+            shard_results = pool.map(simulate_shard, shards, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    hand_counts_by_hand_size = dict(
+        (hand_size, Counter())
+        for hand_size in hand_sizes
+    )
+    for shard, hand_counts in zip(shards, shard_results):
+        hand_size = shard[0]
+        hand_counts_by_hand_size[hand_size].update(hand_counts)
+    return hand_counts_by_hand_size
+
+"""
+Sweeps
+
+Deal one hand of the biggest hand size per trial, and count the best hand of
+each of its first hand_size cards for every hand size, adding one card at a
+time to a hand state, instead of dealing every hand size separately. Each trial
+deals once instead of once per hand size, each hand size picks up from the
+previous one's masks, and the first hand_size cards of a random deal are a
+random hand of that size. Since the hand sizes share their cards (common random
+numbers), differences between hand sizes, like the median hand from one hand
+size to the next, are less noisy than from independent deals. Hand states take
+a single deck's cards, so sweeps deal from one deck.
+
+Sweep shards are split from the seed the same way as the shards above, and each
+deals for every hand size at once.
+
+Represent a sweep shard with a tuple of
+(hand_sizes, num_trials, shard_seed, wild_rule)
+"""
+
+def sweep_hands(
+    hand_sizes,
+    num_trials,
+    rand=random,
+    seed=None,
+    wild_rule='twos'
+):
+    # returns a dict of hand_size to a Counter of hand_code's, the same as
+    # count_hands gives for each hand size
+    deck = WILD_RULES[wild_rule]['deck']
+    is_wild_func = WILD_RULES[wild_rule]['is_wild_func']
+
+    hand_counts_by_hand_size = dict(
+        (hand_size, Counter())
+        for hand_size in hand_sizes
+    )
+    for cards in generate_dealt_cards(
+        deck,
+        max(hand_sizes),
+        num_trials,
+        rand=rand,
+        seed=seed
+    ):
+        # more cards never make a worse hand, so once a hand size has the top
+        # hand, so do all the bigger ones
+        hand_state = make_hand_state(is_wild_func)
+        hand_code = None
+        for num_cards, card in enumerate(cards, 1):
+            if hand_code != TOP_HAND_CODE:
+                add_card(hand_state, card)
+            hand_counts = hand_counts_by_hand_size.get(num_cards)
+            if hand_counts is not None:
+                hand_code = get_hand_state_best_hand_code(hand_state)
+                hand_counts[hand_code] += 1
+
+    return hand_counts_by_hand_size
+
+def get_sweep_shards(hand_sizes, num_trials, seed, wild_rule, shard_size):
+    return [
+        (
+            tuple(hand_sizes),
+            min(shard_size, num_trials - shard_start),
+            split_seed(seed, 'sweep', shard_index),
+            wild_rule,
+        )
+        for shard_index, shard_start in enumerate(
+            range(0, num_trials, shard_size)
+        )
+    ]
+
+def sweep_shard(shard):
+    hand_sizes, num_trials, shard_seed, wild_rule = shard
+    return sweep_hands(
+        hand_sizes,
+        num_trials,
+        seed=shard_seed,
+        wild_rule=wild_rule
+    )
+
+def sweep_hand_sizes(
+    hand_sizes,
+    num_trials,
+    seed,
+    num_workers=1,
+    shard_size=1000,
+    wild_rule='twos'
+):
+    sweep_shards = get_sweep_shards(
+        hand_sizes,
+        num_trials,
+        seed,
+        wild_rule,
+        shard_size
+    )
+
+    if num_workers == 1:
+        shard_results = map(sweep_shard, sweep_shards)
+    else:
+        pool = multiprocessing.Pool(num_workers)
+        try:
+            shard_results = pool.map(sweep_shard, sweep_shards, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    hand_counts_by_hand_size = dict(
+        (hand_size, Counter())
+        for hand_size in hand_sizes
+    )
+    for shard_hand_counts_by_hand_size in shard_results:
+        for hand_size, hand_counts in shard_hand_counts_by_hand_size.items():
+            hand_counts_by_hand_size[hand_size].update(hand_counts)
+    return hand_counts_by_hand_size
+
+"""
+Tables
+
+Print the quantile hands of every hand size, from simulate_hand_sizes, or with
+sweep, from sweep_hand_sizes, which ignores the engine and deals from one deck
+"""
+
+def generate_hand_size_quantile_hands_csv(
+    num_trials,
+    quantiles=QUANTILES,
+    engine='finders',
+    seed=None,
+    num_workers=1,
+    wild_rule='twos',
+    num_decks=1,
+    sweep=False
+):
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    if sweep:
+        if num_decks != 1:
+            raise ValueError('sweeps deal from a single deck')
+        hand_counts_by_hand_size = sweep_hand_sizes(
+            HAND_SIZES,
+            num_trials,
+            seed,
+            num_workers=num_workers,
+            wild_rule=wild_rule
+        )
+    else:
+        hand_counts_by_hand_size = simulate_hand_sizes(
+            HAND_SIZES,
+            num_trials,
+            seed,
+            engine=engine,
+            num_workers=num_workers,
+            wild_rule=wild_rule,
+            num_decks=num_decks
         )
-        print(hand_size, sorted_best_hands[len(sorted_best_hands)/2])
+    print_hand_size_quantile_hands(hand_counts_by_hand_size, quantiles)
+
+def print_hand_size_quantile_hands(hand_counts_by_hand_size, quantiles):
+    for hand_size in HAND_SIZES:
+        quantile_hands = get_hand_quantiles(
+            hand_counts_by_hand_size[hand_size],
+            quantiles
+        )
+        print((hand_size,) + tuple(quantile_hands))
+
+def generate_hand_size_median_hands_csv(
+    num_trials,
+    engine='finders',
+    seed=None,
+    num_workers=1,
+    wild_rule='twos',
+    num_decks=1,
+    sweep=False
+):
+    generate_hand_size_quantile_hands_csv(
+        num_trials,
+        quantiles=[0.5],
+        engine=engine,
+        seed=seed,
+        num_workers=num_workers,
+        wild_rule=wild_rule,
+        num_decks=num_decks,
+        sweep=sweep
+    )
+
+
+"""
+Adaptive Tables
+
+Spend a budget of trials where the quantile hands are still unsettled, instead
+of the same number of trials on every hand size. Trials run in batches, which
+are the same shards simulate_hand_sizes runs with a shard_size of batch_size,
+and after each round of batches, a hand size is settled once every quantile's
+hand holds with the target confidence. Each round gives a batch to every
+unsettled hand size, the least settled first when the budget can't cover them
+all, and the last batches are dropped if they'd go over max_num_trials. A budget
+without a batch for every hand size is a ValueError.
+
+The confidence that a quantile's hand is right comes from the normal
+approximation to the fraction of hands below a point. The quantile's hand is
+right as long as the true fraction of hands below it is at most the quantile,
+and the true fraction at or below it is more. For each of the two, the
+confidence is the chance that the true fraction isn't further from its estimate
+than the estimate is from the quantile, with the standard error of the
+estimate, and the quantile's confidence is the lower of the two. An estimate of
+0 or 1 is taken as half a hand from it, since no hand past it was dealt, not
+that there aren't any.
+
+Checking after every batch is a look at the hand counts, and stopping at the
+first look that clears the target would clear it by chance more often than the
+target allows. So adapt_hand_sizes splits the target's error evenly across the
+most looks a hand size could get out of the budget (a Bonferroni correction),
+and the confidence it gives is a quantile's confidence at one look, with the
+error of every look added up. That's conservative, the more so the bigger the
+budget is next to batch_size.
+"""
+
+def get_fraction_confidence(fraction, margin, num_hands):
+    # the chance that the true fraction is within margin of fraction, which is
+    # estimated from num_hands hands
+    if margin <= 0:
+        return 0.0
+    fraction = min(max(fraction, 0.5 / num_hands), 1 - 0.5 / num_hands)
+    standard_error = math.sqrt(fraction * (1 - fraction) / num_hands)
+    return math.erf(margin / standard_error / math.sqrt(2))
+
+def get_quantile_confidences(hand_counts, quantiles):
+    # the confidence that each of get_hand_quantiles's hands is right
+    sorted_hand_codes = sorted(hand_counts.keys())
+    num_hands = sum(hand_counts.values())
+
+    confidences = []
+    for quantile in quantiles:
+        hand_index = min(int(quantile * num_hands), num_hands - 1)
+        num_hands_below = 0
+        for hand_code in sorted_hand_codes:
+            num_hands_at_or_below = num_hands_below + hand_counts[hand_code]
+            if num_hands_at_or_below > hand_index:
+                break
+            num_hands_below = num_hands_at_or_below
+
+        fraction_below = float(num_hands_below) / num_hands
+        fraction_at_or_below = float(num_hands_at_or_below) / num_hands
+        confidences.append(min(
+            get_fraction_confidence(
+                fraction_below,
+                quantile - fraction_below,
+                num_hands
+            ),
+            get_fraction_confidence(
+                fraction_at_or_below,
+                fraction_at_or_below - quantile,
+                num_hands
+            )
+        ))
+
+    return confidences
+
+def adapt_hand_sizes(
+    hand_sizes,
+    max_num_trials,
+    seed,
+    quantiles=QUANTILES,
+    confidence=0.95,
+    batch_size=1000,
+    engine='finders',
+    num_workers=1,
+    wild_rule='twos',
+    num_decks=1
+):
+    # returns a tuple of (hand_counts_by_hand_size, confidences_by_hand_size),
+    # with the confidence of each quantile's hand across every look
+    if max_num_trials < batch_size * len(hand_sizes):
+        raise ValueError(
+            'max_num_trials {} is less than a batch of {} for each of {} '
+            'hand sizes'.format(max_num_trials, batch_size, len(hand_sizes))
+        )
+    # every other hand size gets at least one batch
+    max_num_looks = max_num_trials // batch_size - (len(hand_sizes) - 1)
+
+    hand_counts_by_hand_size = dict(
+        (hand_size, Counter())
+        for hand_size in hand_sizes
+    )
+    confidences_by_hand_size = dict(
+        (hand_size, [0.0] * len(quantiles))
+        for hand_size in hand_sizes
+    )
+    num_batches = Counter()
+
+    pool = None
+    if num_workers != 1:
+        pool = multiprocessing.Pool(num_workers)
+    try:
+        num_trials_left = max_num_trials
+        while True:
+            unsettled_hand_sizes = sorted(
+                [
+                    hand_size
+                    for hand_size in hand_sizes
+                    if min(confidences_by_hand_size[hand_size]) < confidence
+                ],
+                key=lambda hand_size: min(confidences_by_hand_size[hand_size])
+            )[:num_trials_left // batch_size]
+            if not unsettled_hand_sizes:
+                break
+
+            shards = [
+                (
+                    hand_size,
+                    batch_size,
+                    get_shard_seed(seed, hand_size, num_batches[hand_size]),
+                    engine,
+                    wild_rule,
+                    num_decks,
+                )
+                for hand_size in unsettled_hand_sizes
+            ]
+            if pool is None:
+                shard_results = map(simulate_shard, shards)
+            else:
+                shard_results = pool.map(simulate_shard, shards, chunksize=1)
+
+            for hand_size, hand_counts in zip(
+                unsettled_hand_sizes,
+                shard_results
+            ):
+                hand_counts_by_hand_size[hand_size].update(hand_counts)
+                confidences_by_hand_size[hand_size] = [
+                    max(1 - max_num_looks * (1 - look_confidence), 0.0)
+                    for look_confidence in get_quantile_confidences(
+                        hand_counts_by_hand_size[hand_size],
+                        quantiles
+                    )
+                ]
+                num_batches[hand_size] += 1
+            num_trials_left -= batch_size * len(shards)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return hand_counts_by_hand_size, confidences_by_hand_size
+
+def generate_adaptive_hand_size_quantile_hands_csv(
+    max_num_trials,
+    quantiles=QUANTILES,
+    confidence=0.95,
+    engine='finders',
+    seed=None,
+    num_workers=1,
+    wild_rule='twos',
+    num_decks=1
+):
+    # each row is the hand size, its number of trials, the quantile hands, and
+    # the confidence of each
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    hand_counts_by_hand_size, confidences_by_hand_size = adapt_hand_sizes(
+        HAND_SIZES,
+        max_num_trials,
+        seed,
+        quantiles=quantiles,
+        confidence=confidence,
+        engine=engine,
+        num_workers=num_workers,
+        wild_rule=wild_rule,
+        num_decks=num_decks
+    )
+    for hand_size in HAND_SIZES:
+        hand_counts = hand_counts_by_hand_size[hand_size]
+        print(
+            (hand_size, sum(hand_counts.values())) +
+            tuple(get_hand_quantiles(hand_counts, quantiles)) +
+            tuple(
+                round(quantile_confidence, 3)
+                for quantile_confidence in confidences_by_hand_size[hand_size]
+            )
+        )
+
+def generate_adaptive_hand_size_median_hands_csv(
+    max_num_trials,
+    confidence=0.95,
+    engine='finders',
+    seed=None,
+    num_workers=1,
+    wild_rule='twos',
+    num_decks=1
+):
+    generate_adaptive_hand_size_quantile_hands_csv(
+        max_num_trials,
+        quantiles=[0.5],
+        confidence=confidence,
+        engine=engine,
+        seed=seed,
+        num_workers=num_workers,
+        wild_rule=wild_rule,
+        num_decks=num_decks
+    )
+
+
+"""
+Finder Profiles
+
+Simulate hand sizes with a finder profile running, to see which finders the
+time goes to. The shards all run in this process, since a finder profile only
+sees calls in its own process, and the report, from
+poker.get_finder_profile_report, can be printed or saved as JSON.
+"""
+
+def profile_hand_sizes(
+    hand_sizes,
+    num_trials,
+    seed,
+    engine='finders',
+    wild_rule='twos',
+    num_decks=1
+):
+    # returns a tuple of (hand_counts_by_hand_size, finder_profile_report)
+    finder_profile = make_finder_profile()
+    start_finder_profile(finder_profile)
+    try:
+        hand_counts_by_hand_size = simulate_hand_sizes(
+            hand_sizes,
+            num_trials,
+            seed,
+            engine=engine,
+            wild_rule=wild_rule,
+            num_decks=num_decks
+        )
+    finally:
+        stop_finder_profile(finder_profile)
+    return hand_counts_by_hand_size, get_finder_profile_report(finder_profile)
+
+FINDER_PROFILE_COLUMNS_FORMAT = (
+    '{:<12} {:<16} {:>5} {:>6} {:>9} {:>9} {:>10} {:>10}'
+)
+FINDER_PROFILE_ROW_FORMAT = (
+    '{:<12} {:<16} {:>5} {:>6} {:>9} {:>9.3f} {:>10.4f} {:>10.2f}'
+)
+
+def print_finder_profile_report(finder_profile_report, max_rows=None):
+    print(FINDER_PROFILE_COLUMNS_FORMAT.format(
+        'finder_key',
+        'hand_type',
+        'size',
+        'wilds',
+        'calls',
+        'hit_rate',
+        'seconds',
+        'us/call'
+    ))
+    for row in finder_profile_report[:max_rows]:
+        print(FINDER_PROFILE_ROW_FORMAT.format(
+            row['finder_key'],
+            row['hand_type'],
+            row['hand_size'],
+            row['num_wilds'],
+            row['num_calls'],
+            row['hit_rate'],
+            row['seconds'],
+            row['seconds_per_call'] * 1e6
+        ))
+
+def save_finder_profile_report(finder_profile_report, path):
+    with open(path, 'w') as f:
+        json.dump(finder_profile_report, f, indent=2, sort_keys=True)
+
+
+"""
+Exact Tables
+
+The same tables, from exact.count_hand_sizes instead of random trials, so the
+quantiles are the true ones instead of estimates. It takes a few minutes for all
+the hand sizes, with no num_trials to pick.
+"""
+
+def generate_exact_hand_size_quantile_hands_csv(
+    quantiles=QUANTILES,
+    wild_rule='twos'
+):
+    hand_counts_by_hand_size = count_hand_sizes(
+        HAND_SIZES,
+        is_wild_func=WILD_RULES[wild_rule]['is_wild_func'],
+        deck=WILD_RULES[wild_rule]['deck']
+    )
+    print_hand_size_quantile_hands(hand_counts_by_hand_size, quantiles)
+
+def generate_exact_hand_size_median_hands_csv(wild_rule='twos'):
+    generate_exact_hand_size_quantile_hands_csv(
+        quantiles=[0.5],
+        wild_rule=wild_rule
+    )
 
 
 if __name__ == '__main__':
-    generate_hand_size_median_hands_csv(10000)
+    generate_hand_size_median_hands_csv(
+        10000,
+        engine='bitmask',
+        num_workers=multiprocessing.cpu_count()
+    )
@@ -0,0 +1,395 @@
+import card_names as cn
+import dealing
+import poker
+import simulation
+
+from collections import Counter
+import math
+import random
+import unittest
+
+
+class TestSimulation(unittest.TestCase):
+    def test_simulate_hand_sizes(self):
+        hand_counts_by_hand_size = simulation.simulate_hand_sizes(
+            [2, 7, 16],
+            250,
+            seed=0,
+            engine='bitmask',
+            shard_size=100
+        )
+        self.assertEqual(sorted(hand_counts_by_hand_size.keys()), [2, 7, 16])
+        for hand_counts in hand_counts_by_hand_size.values():
+            self.assertEqual(sum(hand_counts.values()), 250)
+
+        # the same seed gives the same hands, no matter the number of workers
+        self.assertEqual(
+            simulation.simulate_hand_sizes(
+                [2, 7, 16],
+                250,
+                seed=0,
+                engine='bitmask',
+                num_workers=3,
+                shard_size=100
+            ),
+            hand_counts_by_hand_size
+        )
+
+        self.assertNotEqual(
+            simulation.simulate_hand_sizes(
+                [2, 7, 16],
+                250,
+                seed=1,
+                engine='bitmask',
+                shard_size=100
+            ),
+            hand_counts_by_hand_size
+        )
+
+    def test_count_hands_given_cards(self):
+        known_cards = [cn.ACE_OF_CLUBS, cn.ACE_OF_HEARTS, cn.TWO_OF_SPADES]
+        hand_counts = simulation.count_hands_given_cards(
+            known_cards,
+            9,
+            300,
+            rand=random.Random(0)
+        )
+        self.assertEqual(sum(hand_counts.values()), 300)
+        self.assertTrue(all(
+            hand_code >= poker.get_hand_code('three_of_a_kind', {'rank': 14})
+            for hand_code in hand_counts
+        ))
+
+        # with no other cards, it's always the known cards' hand
+        self.assertEqual(
+            simulation.count_hands_given_cards(
+                known_cards,
+                3,
+                10,
+                rand=random.Random(0)
+            ),
+            Counter({
+                poker.get_hand_code('three_of_a_kind', {'rank': 14}): 10
+            })
+        )
+
+        # the same hands as dealing the other cards from the rest of the deck
+        deck = [card for card in range(52) if card not in known_cards]
+        rand = random.Random(0)
+        self.assertEqual(
+            simulation.count_hands_given_cards(
+                known_cards,
+                7,
+                20,
+                rand=random.Random(0)
+            ),
+            Counter(
+                poker.get_best_hand_code(
+                    known_cards + rand.sample(deck, 4),
+                    poker.twos_are_wild
+                )
+                for _ in range(20)
+            )
+        )
+
+        # with a seed, the same hands as dealing the other cards from it
+        seed_hand_counts = simulation.count_hands_given_cards(
+            known_cards,
+            7,
+            20,
+            seed=0
+        )
+        self.assertEqual(
+            seed_hand_counts,
+            Counter(
+                poker.get_best_hand_code(
+                    known_cards + cards,
+                    poker.twos_are_wild
+                )
+                for cards in simulation.generate_dealt_cards(
+                    deck,
+                    4,
+                    20,
+                    seed=0
+                )
+            )
+        )
+        self.assertEqual(
+            simulation.count_hands_given_cards(
+                known_cards,
+                7,
+                20,
+                seed=0
+            ),
+            seed_hand_counts
+        )
+
+        # too many known cards, a card twice, and a joker without jokers
+        for bad_known_cards, hand_size in [
+            (known_cards, 2),
+            (known_cards + [cn.ACE_OF_CLUBS], 9),
+            (known_cards + [52], 9),
+        ]:
+            self.assertRaises(
+                ValueError,
+                simulation.count_hands_given_cards,
+                bad_known_cards,
+                hand_size,
+                10
+            )
+        self.assertEqual(
+            sum(simulation.count_hands_given_cards(
+                known_cards + [52],
+                9,
+                10,
+                wild_rule='jokers'
+            ).values()),
+            10
+        )
+
+    def test_wild_rules(self):
+        for wild_rule in poker.WILD_RULES:
+            hand_counts = simulation.simulate_hand_sizes(
+                [5, 20],
+                100,
+                seed=0,
+                engine='bitmask',
+                wild_rule=wild_rule
+            )
+            for hand_size in [5, 20]:
+                self.assertEqual(sum(hand_counts[hand_size].values()), 100)
+
+        # with no wilds, 2 cards never make more than a pair
+        hand_counts = simulation.count_hands(2, 200, wild_rule='none')
+        self.assertTrue(all(
+            hand_code <= poker.get_hand_code('one_pair', {'rank': 14})
+            for hand_code in hand_counts
+        ))
+
+    def test_multiple_decks(self):
+        hand_counts = simulation.simulate_hand_sizes(
+            [5, 20],
+            100,
+            seed=0,
+            engine='bitmask',
+            num_decks=2
+        )
+        for hand_size in [5, 20]:
+            self.assertEqual(sum(hand_counts[hand_size].values()), 100)
+        self.assertEqual(
+            simulation.count_hands(20, 100, rand=random.Random(0), num_decks=2),
+            simulation.count_hands(
+                20,
+                100,
+                engine='lookup',
+                rand=random.Random(0),
+                num_decks=2
+            )
+        )
+
+    def test_seed(self):
+        best_hands = simulation.simulate_hands(7, 300, engine='bitmask', seed=0)
+        self.assertEqual(len(best_hands), 300)
+        self.assertEqual(
+            simulation.simulate_hands(7, 300, engine='lookup', seed=0),
+            best_hands
+        )
+        self.assertNotEqual(
+            simulation.simulate_hands(7, 300, engine='bitmask', seed=1),
+            best_hands
+        )
+        self.assertEqual(
+            simulation.count_hands(7, 300, seed=0),
+            Counter(poker.get_hand_code(*best_hand) for best_hand in best_hands)
+        )
+
+    def test_sweep_hands(self):
+        for wild_rule in ['twos', 'jokers']:
+            hand_counts_by_hand_size = simulation.sweep_hands(
+                [2, 5, 20, 28],
+                200,
+                seed=0,
+                wild_rule=wild_rule
+            )
+
+            # the same as each hand size of the same deals on its own
+            deck = poker.WILD_RULES[wild_rule]['deck']
+            deals = [
+                cards
+                for cards_chunk in dealing.generate_deals(deck, 28, 200, 0)
+                for cards in cards_chunk.tolist()
+            ]
+            for hand_size in [2, 5, 20, 28]:
+                self.assertEqual(
+                    hand_counts_by_hand_size[hand_size],
+                    Counter(
+                        poker.get_best_hand_code(
+                            cards[:hand_size],
+                            poker.WILD_RULES[wild_rule]['is_wild_func'],
+                            engine='bitmask'
+                        )
+                        for cards in deals
+                    )
+                )
+
+    def test_sweep_hand_sizes(self):
+        hand_counts_by_hand_size = simulation.sweep_hand_sizes(
+            [2, 7, 16],
+            250,
+            seed=0,
+            shard_size=100
+        )
+        self.assertEqual(sorted(hand_counts_by_hand_size.keys()), [2, 7, 16])
+        for hand_counts in hand_counts_by_hand_size.values():
+            self.assertEqual(sum(hand_counts.values()), 250)
+
+        self.assertEqual(
+            simulation.sweep_hand_sizes(
+                [2, 7, 16],
+                250,
+                seed=0,
+                num_workers=3,
+                shard_size=100
+            ),
+            hand_counts_by_hand_size
+        )
+
+    def test_get_quantile_confidences(self):
+        one_pair_hand_code = poker.get_hand_code('one_pair', {'rank': 2})
+        two_pair_hand_code = poker.get_hand_code(
+            'two_pair',
+            {'high_rank': 3, 'low_rank': 2}
+        )
+        for hand_counts, expected_confidence in [
+            # the median is right at the boundary between the two hands
+            (Counter({one_pair_hand_code: 500, two_pair_hand_code: 500}), 0),
+            # one standard error of the fraction below it from it
+            (
+                Counter({one_pair_hand_code: 45, two_pair_hand_code: 55}),
+                math.erf(0.05 / math.sqrt(0.45 * 0.55 / 100) / math.sqrt(2))
+            ),
+            # many standard errors from it
+            (Counter({one_pair_hand_code: 100, two_pair_hand_code: 900}), 1),
+        ]:
+            self.assertAlmostEqual(
+                simulation.get_quantile_confidences(hand_counts, [0.5])[0],
+                expected_confidence,
+                places=4
+            )
+
+    def test_adapt_hand_sizes(self):
+        hand_counts_by_hand_size, confidences_by_hand_size = (
+            simulation.adapt_hand_sizes(
+                [2, 6],
+                20000,
+                seed=0,
+                quantiles=[0.5],
+                batch_size=500,
+                engine='bitmask'
+            )
+        )
+        num_trials = dict(
+            (hand_size, sum(hand_counts.values()))
+            for hand_size, hand_counts in hand_counts_by_hand_size.items()
+        )
+        self.assertTrue(sum(num_trials.values()) <= 20000)
+        # 2 cards settle quickly and the rest of the budget goes to 6 cards,
+        # whose median is close to a boundary
+        self.assertTrue(confidences_by_hand_size[2][0] >= 0.95)
+        self.assertTrue(num_trials[2] < num_trials[6])
+
+        # the confidence covers every look the budget allows
+        self.assertEqual(
+            confidences_by_hand_size[6],
+            [
+                max(1 - 39 * (1 - look_confidence), 0.0)
+                for look_confidence in simulation.get_quantile_confidences(
+                    hand_counts_by_hand_size[6],
+                    [0.5]
+                )
+            ]
+        )
+
+        # the batches are simulate_hand_sizes's shards
+        for hand_size in [2, 6]:
+            self.assertEqual(
+                simulation.simulate_hand_sizes(
+                    [hand_size],
+                    num_trials[hand_size],
+                    seed=0,
+                    engine='bitmask',
+                    shard_size=500
+                )[hand_size],
+                hand_counts_by_hand_size[hand_size]
+            )
+
+        self.assertEqual(
+            simulation.adapt_hand_sizes(
+                [2, 6],
+                20000,
+                seed=0,
+                quantiles=[0.5],
+                batch_size=500,
+                engine='bitmask',
+                num_workers=3
+            ),
+            (hand_counts_by_hand_size, confidences_by_hand_size)
+        )
+
+        # a budget without a batch for every hand size
+        self.assertRaises(
+            ValueError,
+            simulation.adapt_hand_sizes,
+            [2, 6],
+            999,
+            0,
+            batch_size=500
+        )
+
+    def test_profile_hand_sizes(self):
+        hand_counts_by_hand_size, report = simulation.profile_hand_sizes(
+            [5, 20],
+            100,
+            seed=0,
+            engine='bitmask'
+        )
+        self.assertEqual(
+            hand_counts_by_hand_size,
+            simulation.simulate_hand_sizes(
+                [5, 20],
+                100,
+                seed=0,
+                engine='bitmask'
+            )
+        )
+        self.assertEqual(
+            set(row['finder_key'] for row in report),
+            set(['mask_finder'])
+        )
+        self.assertEqual(sum(row['num_hits'] for row in report), 200)
+
+    def test_get_hand_quantiles(self):
+        best_hands = simulation.simulate_hands(9, 501, engine='bitmask')
+        hand_counts = Counter(
+            poker.get_hand_code(*best_hand)
+            for best_hand in best_hands
+        )
+
+        sorted_best_hands = sorted(
+            best_hands,
+            key=lambda hand: poker.get_hand_sortkey(*hand)
+        )
+        self.assertEqual(
+            simulation.get_hand_quantiles(hand_counts, [0, 0.1, 0.5, 0.9, 1]),
+            [
+                sorted_best_hands[0],
+                sorted_best_hands[50],
+                sorted_best_hands[250],
+                sorted_best_hands[450],
+                sorted_best_hands[500],
+            ]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import array
+import os
+import random
+
+from exact import count_hand_sizes
+from poker import NUM_HAND_CODES, WILD_RULES, get_hand_code
+from simulation import HAND_SIZES, simulate_hand_sizes
+
+
+"""
+Survival Table
+
+For every hand size and every hand, the probability that the best hand of that
+many cards is at least that hand, which is the chance that a call of that hand
+holds up. Build it in one pass over hand counts, exact from
+exact.count_hand_sizes by default or estimated from simulated hands, then look
+up any call with a single index.
+
+Represent the table with an array of doubles, with the probability for
+hand_size and hand_code at index hand_size * NUM_HAND_CODES + hand_code, for
+hand sizes 0 through MAX_HAND_SIZE. Hand sizes that weren't counted are all 0,
+and so is a hand_code no hand has, past the top hand.
+
+A table is for one wild rule, and each wild rule's exact table has its own
+file, at get_survival_table_path(wild_rule). Build the one for twos with
+survival_table.py. load_survival_table builds a wild rule's table there the
+first time if it doesn't exist, which takes a few minutes. The file name has
+SURVIVAL_TABLE_VERSION in it, which goes up whenever the counts behind the
+table change, so that a table saved before then gets rebuilt instead of loaded.
+Version 2 stopped counting an ace as the rank 1 of a 5-high straight.
+"""
+
+SURVIVAL_TABLE_VERSION = 2
+
+def get_survival_table_path(wild_rule='twos'):
+    return os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        'survival_table_{}_v{}.bin'.format(wild_rule, SURVIVAL_TABLE_VERSION)
+    )
+
+SURVIVAL_TABLE_PATH = get_survival_table_path()
+MAX_HAND_SIZE = max(HAND_SIZES)
+SURVIVAL_TABLE_SIZE = (MAX_HAND_SIZE + 1) * NUM_HAND_CODES
+
+def get_survival_probabilities(hand_counts):
+    # survival_probabilities[hand_code] is the fraction of the counted hands
+    # that are at least hand_code
+    num_hands = float(sum(hand_counts.values()))
+    survival_probabilities = [0.0] * NUM_HAND_CODES
+    num_hands_at_least = 0
+    for hand_code in range(NUM_HAND_CODES - 1, -1, -1):
+        num_hands_at_least += hand_counts.get(hand_code, 0)
+        survival_probabilities[hand_code] = num_hands_at_least / num_hands
+    return survival_probabilities
+
+def build_survival_table(hand_counts_by_hand_size):
+    survival_table = array.array('d', [0.0]) * SURVIVAL_TABLE_SIZE
+    for hand_size, hand_counts in hand_counts_by_hand_size.items():
+        start = hand_size * NUM_HAND_CODES
+        survival_table[start:start + NUM_HAND_CODES] = array.array(
+            'd',
+            get_survival_probabilities(hand_counts)
+        )
+    return survival_table
+
+def generate_survival_table(
+    hand_sizes=HAND_SIZES,
+    num_trials=None,
+    seed=None,
+    engine='bitmask',
+    num_workers=1,
+    wild_rule='twos'
+):
+    # exact without num_trials, otherwise estimated from that many trials of
+    # each hand size
+    if num_trials is None:
+        hand_counts_by_hand_size = count_hand_sizes(
+            hand_sizes,
+            is_wild_func=WILD_RULES[wild_rule]['is_wild_func'],
+            deck=WILD_RULES[wild_rule]['deck']
+        )
+    else:
+        if seed is None:
+            seed = random.getrandbits(64)
+        hand_counts_by_hand_size = simulate_hand_sizes(
+            hand_sizes,
+            num_trials,
+            seed,
+            engine=engine,
+            num_workers=num_workers,
+            wild_rule=wild_rule
+        )
+    return build_survival_table(hand_counts_by_hand_size)
+
+def save_survival_table(survival_table, path=SURVIVAL_TABLE_PATH):
+    with open(path, 'wb') as f:
+        survival_table.tofile(f)
+
+def load_survival_table(path=None, wild_rule='twos'):
+    # the table at path, which has to be for wild_rule if it's built here, or
+    # by default the exact table for wild_rule
+    if path is None:
+        path = get_survival_table_path(wild_rule)
+    if not os.path.exists(path):
+        save_survival_table(
+            generate_survival_table(wild_rule=wild_rule),
+            path=path
+        )
+    survival_table = array.array('d')
+    with open(path, 'rb') as f:
+        survival_table.fromfile(f, SURVIVAL_TABLE_SIZE)
+    return survival_table
+
+def get_call_probability_from_code(survival_table, hand_size, hand_code):
+    return survival_table[hand_size * NUM_HAND_CODES + hand_code]
+
+def get_call_probability(survival_table, hand_size, hand_type, tie_break_dict):
+    return get_call_probability_from_code(
+        survival_table,
+        hand_size,
+        get_hand_code(hand_type, tie_break_dict)
+    )
+
+
+if __name__ == '__main__':
+    save_survival_table(generate_survival_table())
@@ -0,0 +1,137 @@
+import exact
+import poker
+import survival_table
+
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestSurvivalTable(unittest.TestCase):
+    def test_build_survival_table(self):
+        hand_counts_by_hand_size = exact.count_hand_sizes([2, 3])
+        table = survival_table.build_survival_table(hand_counts_by_hand_size)
+
+        for hand_size in [2, 3]:
+            hand_codes = [
+                poker.get_best_hand_code(
+                    list(cards),
+                    poker.twos_are_wild,
+                    engine='bitmask'
+                )
+                for cards in itertools.combinations(range(52), hand_size)
+            ]
+            for hand_code in sorted(set(hand_codes)) + [0, 0x8e0, 0x8f0]:
+                self.assertAlmostEqual(
+                    survival_table.get_call_probability_from_code(
+                        table,
+                        hand_size,
+                        hand_code
+                    ),
+                    float(len([
+                        best_hand_code
+                        for best_hand_code in hand_codes
+                        if best_hand_code >= hand_code
+                    ])) / len(hand_codes)
+                )
+
+        self.assertEqual(
+            survival_table.get_call_probability(
+                table,
+                2,
+                'high_card',
+                {'rank': 2}
+            ),
+            1.0
+        )
+        self.assertAlmostEqual(
+            survival_table.get_call_probability(
+                table,
+                2,
+                'one_pair',
+                {'rank': 2}
+            ),
+            (
+                # a natural pair of any rank, or a wild with anything
+                12 * 6 +
+                exact.choose(4, 2) +
+                4 * 48
+            ) / float(exact.choose(52, 2))
+        )
+        # hand sizes that weren't counted are left at 0
+        self.assertEqual(
+            survival_table.get_call_probability_from_code(table, 4, 0),
+            0.0
+        )
+
+    def test_exact_matches_simulated(self):
+        # at 5 and 8 cards, where there are straights and straight flushes,
+        # each best hand comes up about as often in simulated hands as the
+        # exact counts say
+        num_trials = 20000
+        tables = [
+            survival_table.generate_survival_table(hand_sizes=[5, 8]),
+            survival_table.generate_survival_table(
+                hand_sizes=[5, 8],
+                num_trials=num_trials,
+                seed=0
+            ),
+        ]
+        for hand_size in [5, 8]:
+            exact_probabilities, simulated_probabilities = [
+                [
+                    survival_table.get_call_probability_from_code(
+                        table,
+                        hand_size,
+                        hand_code
+                    ) - (
+                        survival_table.get_call_probability_from_code(
+                            table,
+                            hand_size,
+                            hand_code + 1
+                        )
+                        if hand_code + 1 < poker.NUM_HAND_CODES else 0.0
+                    )
+                    for hand_code in range(poker.NUM_HAND_CODES)
+                ]
+                for table in tables
+            ]
+            for probability, simulated_probability in zip(
+                exact_probabilities,
+                simulated_probabilities
+            ):
+                standard_error = (
+                    probability * (1 - probability) / num_trials
+                ) ** 0.5
+                self.assertAlmostEqual(
+                    simulated_probability,
+                    probability,
+                    delta=5 * standard_error + 0.0005
+                )
+
+    def test_save_and_load_survival_table(self):
+        table = survival_table.generate_survival_table(
+            hand_sizes=[5, 20],
+            num_trials=100,
+            seed=0
+        )
+        self.assertEqual(
+            survival_table.get_call_probability_from_code(table, 20, 0),
+            1.0
+        )
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'survival_table.bin')
+            survival_table.save_survival_table(table, path=path)
+            self.assertEqual(
+                survival_table.load_survival_table(path=path),
+                table
+            )
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
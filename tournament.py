@@ -0,0 +1,255 @@
+import json
+import math
+import multiprocessing
+
+from dealing import split_seed
+from game import make_survival_policy, play_games
+from survival_table import load_survival_table
+
+
+"""
+Tournaments
+
+Play two bots against each other heads up, in matches, until a sequential
+probability ratio test (SPRT) decides which one is better, or max_matches runs
+out. A match plays match_size games with bot a in the first seat and the same
+number with the seats swapped, both from the match's seed, so both seat orders
+get the same first player and the same deals for as long as the games go the
+same way, and luck of the deal mostly cancels out between them.
+
+Represent a bot with a bot spec, which is a tuple of (bot_name, kwargs), where
+bot_name is in BOT_MAKERS, so that worker processes can make their own copy.
+Every bot maker takes a wild_rule too, which the tournament adds to both bot
+specs, so that each bot plays by the tournament's wild rule. A bot spec that
+already has a different wild_rule is a ValueError.
+
+Represent a match with a tuple of
+(match_index, match_seed, bot_a_spec, bot_b_spec, match_size, max_cards,
+wild_rule, engine)
+
+Matches run across a process pool, and their results come back in match order,
+so the same seed stops at the same match for any number of workers. Each
+match's result is a dict, written as a line of JSON to results_path as soon as
+it's in, instead of kept in memory.
+
+The SPRT treats every game as a win or loss for bot a, and weighs the chance
+that bot a wins each game with probability 0.5 + delta against 0.5 - delta,
+stopping once the log likelihood ratio passes either bound from alpha and beta.
+Paired games aren't quite independent, which this ignores.
+"""
+
+DEFAULT_MATCH_SIZE = 100
+DEFAULT_MAX_MATCHES = 1000
+DEFAULT_DELTA = 0.05
+DEFAULT_ALPHA = 0.05
+DEFAULT_BETA = 0.05
+
+def make_survival_bot(
+    call_threshold=0.5,
+    survival_table_path=None,
+    wild_rule='twos'
+):
+    # by default the exact survival table for wild_rule. a survival_table_path
+    # has to be a table for wild_rule
+    return make_survival_policy(
+        load_survival_table(path=survival_table_path, wild_rule=wild_rule),
+        call_threshold=call_threshold,
+        wild_rule=wild_rule
+    )
+
+BOT_MAKERS = {
+    'survival': make_survival_bot,
+}
+
+_bots = {}
+
+def get_wild_rule_bot_spec(bot_spec, wild_rule):
+    bot_name, bot_kwargs = bot_spec
+    bot_wild_rule = bot_kwargs.get('wild_rule', wild_rule)
+    if bot_wild_rule != wild_rule:
+        raise ValueError(
+            'a {} bot for wild rule {} can\'t play by wild rule {}'.format(
+                bot_name,
+                bot_wild_rule,
+                wild_rule
+            )
+        )
+    return bot_name, dict(bot_kwargs, wild_rule=wild_rule)
+
+def get_bot(bot_spec):
+    # each process makes each bot once
+    bot_name, bot_kwargs = bot_spec
+    bot_key = (bot_name, tuple(sorted(bot_kwargs.items())))
+    if bot_key not in _bots:
+        _bots[bot_key] = BOT_MAKERS[bot_name](**bot_kwargs)
+    return _bots[bot_key]
+
+## MATCHES
+
+def generate_matches(
+    bot_a_spec,
+    bot_b_spec,
+    seed,
+    match_size,
+    max_matches,
+    max_cards,
+    wild_rule,
+    engine
+):
+    for match_index in range(max_matches):
+        yield (
+            match_index,
+            split_seed(seed, 'match', match_index),
+            bot_a_spec,
+            bot_b_spec,
+            match_size,
+            max_cards,
+            wild_rule,
+            engine,
+        )
+
+def play_match(match):
+    (
+        match_index,
+        match_seed,
+        bot_a_spec,
+        bot_b_spec,
+        match_size,
+        max_cards,
+        wild_rule,
+        engine,
+    ) = match
+    bot_a = get_bot(bot_a_spec)
+    bot_b = get_bot(bot_b_spec)
+
+    a_first_games, b_first_games = [
+        play_games(
+            match_size,
+            policies,
+            match_seed,
+            max_cards=max_cards,
+            wild_rule=wild_rule,
+            engine=engine
+        )
+        for policies in [[bot_a, bot_b], [bot_b, bot_a]]
+    ]
+    num_a_wins = int(
+        (a_first_games['winners'] == 0).sum() +
+        (b_first_games['winners'] == 1).sum()
+    )
+    return {
+        'match_index': match_index,
+        'match_seed': match_seed,
+        'num_games': 2 * match_size,
+        'num_a_wins': num_a_wins,
+        'num_b_wins': 2 * match_size - num_a_wins,
+        'num_rounds': int(
+            a_first_games['num_rounds'].sum() +
+            b_first_games['num_rounds'].sum()
+        ),
+    }
+
+def load_match_results(results_path):
+    with open(results_path) as f:
+        for line in f:
+            yield json.loads(line)
+
+## SPRT
+
+def get_sprt_bounds(alpha, beta):
+    # returns a tuple of (lower_bound, upper_bound)
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+def get_sprt_llr(num_a_wins, num_b_wins, delta):
+    better_win_prob = 0.5 + delta
+    worse_win_prob = 0.5 - delta
+    return (
+        num_a_wins * math.log(better_win_prob / worse_win_prob) +
+        num_b_wins * math.log((1 - better_win_prob) / (1 - worse_win_prob))
+    )
+
+def get_sprt_decision(llr, alpha, beta):
+    # 'a' or 'b' for the better bot, or None if it's not decided yet
+    lower_bound, upper_bound = get_sprt_bounds(alpha, beta)
+    if llr >= upper_bound:
+        return 'a'
+    if llr <= lower_bound:
+        return 'b'
+    return None
+
+## RUNNING
+
+def run_tournament(
+    bot_a_spec,
+    bot_b_spec,
+    seed,
+    results_path,
+    match_size=DEFAULT_MATCH_SIZE,
+    max_matches=DEFAULT_MAX_MATCHES,
+    num_workers=1,
+    delta=DEFAULT_DELTA,
+    alpha=DEFAULT_ALPHA,
+    beta=DEFAULT_BETA,
+    max_cards=5,
+    wild_rule='twos',
+    engine='batch'
+):
+    matches = generate_matches(
+        get_wild_rule_bot_spec(bot_a_spec, wild_rule),
+        get_wild_rule_bot_spec(bot_b_spec, wild_rule),
+        seed,
+        match_size,
+        max_matches,
+        max_cards,
+        wild_rule,
+        engine
+    )
+
+    pool = None
+    if num_workers == 1:
+        match_results = (play_match(match) for match in matches)
+    else:
+        pool = multiprocessing.Pool(num_workers)
+        match_results = pool.imap(play_match, matches, chunksize=1)
+
+    num_matches = num_a_wins = num_b_wins = 0
+    llr = 0.0
+    decision = None
+    try:
+        with open(results_path, 'w') as f:
+            for match_result in match_results:
+                f.write(json.dumps(match_result, sort_keys=True) + '\n')
+                f.flush()
+                num_matches += 1
+                num_a_wins += match_result['num_a_wins']
+                num_b_wins += match_result['num_b_wins']
+                llr = get_sprt_llr(num_a_wins, num_b_wins, delta)
+                decision = get_sprt_decision(llr, alpha, beta)
+                if decision is not None:
+                    break
+    finally:
+        # the pool may have matches past the decision still running
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    num_games = num_a_wins + num_b_wins
+    return {
+        'num_matches': num_matches,
+        'num_games': num_games,
+        'num_a_wins': num_a_wins,
+        'num_b_wins': num_b_wins,
+        'a_win_rate': float(num_a_wins) / num_games if num_games else 0.0,
+        'llr': llr,
+        'decision': decision,
+    }
+
+
+if __name__ == '__main__':
+    print(run_tournament(
+        ('survival', {'call_threshold': 0.5}),
+        ('survival', {'call_threshold': 0.3}),
+        0,
+        'tournament.jsonl',
+        num_workers=multiprocessing.cpu_count()
+    ))
@@ -0,0 +1,162 @@
+import survival_table
+import tournament
+
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.results_path = os.path.join(self.temp_dir, 'tournament.jsonl')
+        self.survival_table_path = os.path.join(self.temp_dir, 'survival.bin')
+        survival_table.save_survival_table(
+            survival_table.generate_survival_table(
+                hand_sizes=range(2, 11),
+                num_trials=200,
+                seed=0
+            ),
+            path=self.survival_table_path
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def get_bot_spec(self, call_threshold):
+        return ('survival', {
+            'call_threshold': call_threshold,
+            'survival_table_path': self.survival_table_path,
+        })
+
+    def test_play_match(self):
+        match = (
+            0,
+            0,
+            self.get_bot_spec(0.5),
+            self.get_bot_spec(0.5),
+            50,
+            5,
+            'twos',
+            'batch',
+        )
+        match_result = tournament.play_match(match)
+        self.assertEqual(match_result['num_games'], 100)
+        self.assertEqual(
+            match_result['num_a_wins'] + match_result['num_b_wins'],
+            100
+        )
+        # the same bot in both seats of the same games wins each pair once
+        self.assertEqual(match_result['num_a_wins'], 50)
+
+    def test_sprt(self):
+        lower_bound, upper_bound = tournament.get_sprt_bounds(0.05, 0.05)
+        self.assertAlmostEqual(lower_bound, -upper_bound)
+        self.assertAlmostEqual(tournament.get_sprt_llr(10, 10, 0.05), 0)
+        self.assertEqual(
+            tournament.get_sprt_decision(
+                tournament.get_sprt_llr(100, 50, 0.05),
+                0.05,
+                0.05
+            ),
+            'a'
+        )
+        self.assertEqual(
+            tournament.get_sprt_decision(
+                tournament.get_sprt_llr(50, 100, 0.05),
+                0.05,
+                0.05
+            ),
+            'b'
+        )
+        self.assertEqual(
+            tournament.get_sprt_decision(
+                tournament.get_sprt_llr(52, 50, 0.05),
+                0.05,
+                0.05
+            ),
+            None
+        )
+
+    def test_run_tournament(self):
+        # a bot that never calls BS below a 0.05 chance loses to one that
+        # calls below 0.5, quickly
+        summary = tournament.run_tournament(
+            self.get_bot_spec(0.5),
+            self.get_bot_spec(0.05),
+            0,
+            self.results_path,
+            match_size=20,
+            max_matches=50,
+            max_cards=3
+        )
+        self.assertEqual(summary['decision'], 'a')
+        self.assertTrue(summary['num_matches'] < 50)
+
+        match_results = list(tournament.load_match_results(self.results_path))
+        self.assertEqual(len(match_results), summary['num_matches'])
+        self.assertEqual(
+            [match_result['match_index'] for match_result in match_results],
+            range(summary['num_matches'])
+        )
+        self.assertEqual(
+            sum(match_result['num_a_wins'] for match_result in match_results),
+            summary['num_a_wins']
+        )
+
+        # the same matches, and the same stop, with a pool of workers
+        self.assertEqual(
+            tournament.run_tournament(
+                self.get_bot_spec(0.5),
+                self.get_bot_spec(0.05),
+                0,
+                self.results_path,
+                match_size=20,
+                max_matches=50,
+                num_workers=3,
+                max_cards=3
+            ),
+            summary
+        )
+
+    def test_wild_rules(self):
+        self.assertEqual(
+            tournament.get_wild_rule_bot_spec(
+                self.get_bot_spec(0.5),
+                'jokers'
+            )[1]['wild_rule'],
+            'jokers'
+        )
+        # a bot made for one wild rule doesn't play by another
+        bot_name, bot_kwargs = self.get_bot_spec(0.5)
+        jokers_bot_spec = (bot_name, dict(bot_kwargs, wild_rule='jokers'))
+        self.assertRaises(
+            ValueError,
+            tournament.run_tournament,
+            jokers_bot_spec,
+            self.get_bot_spec(0.5),
+            0,
+            self.results_path,
+            max_matches=1
+        )
+        self.assertNotEqual(
+            survival_table.get_survival_table_path('twos'),
+            survival_table.get_survival_table_path('jokers')
+        )
+
+    def test_no_matches(self):
+        summary = tournament.run_tournament(
+            self.get_bot_spec(0.5),
+            self.get_bot_spec(0.05),
+            0,
+            self.results_path,
+            max_matches=0
+        )
+        self.assertEqual(summary['num_matches'], 0)
+        self.assertEqual(summary['a_win_rate'], 0.0)
+        self.assertEqual(summary['decision'], None)
+
+
+if __name__ == '__main__':
+    unittest.main()